@@ -0,0 +1,323 @@
+"""
+Analytics Module
+In-memory columnar copy of transactions with vectorized group-by queries,
+so interactive drill-downs are answered without a database round trip
+
+Requires NumPy (optional dependency: pip install numpy).
+"""
+
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from conversions import as_date, from_cents, to_cents
+from db_config import DatabaseConfig, execute_query
+from models import Category
+
+# Transactions after a given ID, in ID order, for loading and refresh()
+_FETCH_QUERY = """
+    SELECT transaction_id, user_id, category_id, amount, transaction_date, payment_method
+    FROM transactions
+    WHERE transaction_id > %s {user_filter}
+    ORDER BY transaction_id
+    LIMIT %s
+"""
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("analytics requires NumPy; install it with 'pip install numpy'")
+
+
+class TransactionFrame:
+    """
+    Column arrays of transactions with group-by queries
+
+    Amounts are int64 cents, so totals are exact and match the DECIMAL sums
+    computed by the database. Categories and payment methods are stored as
+    dense integer codes. Arrays grow geometrically, so append() and
+    refresh() cost time proportional to the new rows only.
+
+    The frame is a snapshot: refresh() picks up transactions inserted since
+    the last load (by transaction ID), while updates and deletes of loaded
+    transactions need reload().
+    """
+
+    _COLUMNS = (
+        ('transaction_id', 'int64'),
+        ('user_id', 'int64'),
+        ('category', 'int32'),
+        ('cents', 'int64'),
+        ('day', 'int32'),
+        ('month', 'int32'),
+        ('payment_method', 'int32'),
+    )
+
+    def __init__(self, user_id: Optional[int] = None, capacity: int = 1024):
+        """
+        Create an empty frame
+
+        Args:
+            user_id: Restrict load()/refresh() to one user (None for all users)
+            capacity: Initial number of rows allocated
+        """
+        _require_numpy()
+        self.user_id = user_id
+        self._lock = threading.RLock()
+        self._size = 0
+        self._arrays = {name: np.empty(capacity, dtype) for name, dtype in self._COLUMNS}
+        self._category_codes: Dict[int, int] = {}
+        self._category_ids: List[int] = []
+        self._categories: Dict[int, Dict] = {}
+        self._method_codes: Dict[Optional[str], int] = {}
+        self._methods: List[Optional[str]] = []
+        self._last_id = 0
+
+    @classmethod
+    def load(cls, user_id: Optional[int] = None,
+             chunk_size: Optional[int] = None) -> "TransactionFrame":
+        """
+        Load one user's or every transaction from the database
+
+        Args:
+            user_id: Only this user's transactions (None for the whole table)
+            chunk_size: Rows per query (defaults to DatabaseConfig.STREAM_BATCH_SIZE)
+
+        Returns:
+            The populated frame
+        """
+        frame = cls(user_id)
+        frame.refresh(chunk_size)
+        return frame
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = len(self._arrays['cents'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype in self._COLUMNS:
+            grown = np.empty(capacity, dtype)
+            grown[:self._size] = self._arrays[name][:self._size]
+            self._arrays[name] = grown
+
+    def _category_code(self, category_id: int) -> int:
+        code = self._category_codes.get(category_id)
+        if code is None:
+            code = self._category_codes[category_id] = len(self._category_ids)
+            self._category_ids.append(category_id)
+        return code
+
+    def _method_code(self, method: Optional[str]) -> int:
+        code = self._method_codes.get(method)
+        if code is None:
+            code = self._method_codes[method] = len(self._methods)
+            self._methods.append(method)
+        return code
+
+    def append(self, rows: Iterable) -> int:
+        """
+        Add transactions to the frame
+
+        Args:
+            rows: Rows (dictionaries or records) with transaction_id, user_id,
+                  category_id, amount, transaction_date and payment_method
+
+        Returns:
+            Number of rows added
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self._lock:
+            self._reserve(len(rows))
+            start, end = self._size, self._size + len(rows)
+            days = [as_date(row['transaction_date']) for row in rows]
+            columns = self._arrays
+            columns['transaction_id'][start:end] = [row['transaction_id'] for row in rows]
+            columns['user_id'][start:end] = [row['user_id'] for row in rows]
+            columns['category'][start:end] = [self._category_code(row['category_id'])
+                                              for row in rows]
+            columns['cents'][start:end] = [to_cents(row['amount']) for row in rows]
+            columns['day'][start:end] = [day.toordinal() for day in days]
+            columns['month'][start:end] = [day.year * 12 + day.month - 1 for day in days]
+            columns['payment_method'][start:end] = [self._method_code(row['payment_method'])
+                                                    for row in rows]
+            self._size = end
+            self._last_id = max(self._last_id, max(row['transaction_id'] for row in rows))
+        return len(rows)
+
+    def refresh(self, chunk_size: Optional[int] = None) -> int:
+        """
+        Append transactions inserted since the last load, in bounded chunks
+
+        Returns:
+            Number of rows added
+        """
+        chunk_size = chunk_size or DatabaseConfig.STREAM_BATCH_SIZE
+        query = _FETCH_QUERY.format(user_filter="AND user_id = %s" if self.user_id else "")
+        extra = (self.user_id,) if self.user_id else ()
+        added = 0
+        while True:
+            # A bulk read of rows the frame has not seen, so never cached
+            rows = execute_query(query, (self._last_id,) + extra + (chunk_size,),
+                                 fetch=True, compact=True, cache=False)
+            added += self.append(rows)
+            if len(rows) < chunk_size:
+                break
+        self._load_categories()
+        return added
+
+    def reload(self, chunk_size: Optional[int] = None) -> int:
+        """Discard every row and load again (picks up updates and deletes)"""
+        with self._lock:
+            self._size = 0
+            self._last_id = 0
+            self._categories = {}
+        return self.refresh(chunk_size)
+
+    def _load_categories(self):
+        if any(category_id not in self._categories for category_id in self._category_ids):
+            self._categories = {category['category_id']: category
+                                for category in Category.get_all()}
+
+    def _mask(self, start_date, end_date, user_id: Optional[int]):
+        """Row positions matching the filters, as a boolean array over the loaded rows"""
+        size = self._size
+        mask = np.ones(size, dtype=bool)
+        if start_date is not None:
+            mask &= self._arrays['day'][:size] >= as_date(start_date).toordinal()
+        if end_date is not None:
+            mask &= self._arrays['day'][:size] <= as_date(end_date).toordinal()
+        if user_id is not None:
+            mask &= self._arrays['user_id'][:size] == user_id
+        return mask
+
+    def _group(self, key: str, groups: int, start_date, end_date, user_id):
+        """Per-code (total cents, count) over the filtered rows"""
+        mask = self._mask(start_date, end_date, user_id)
+        codes = self._arrays[key][:self._size][mask]
+        totals = np.zeros(groups, dtype=np.int64)
+        np.add.at(totals, codes, self._arrays['cents'][:self._size][mask])
+        counts = np.bincount(codes, minlength=groups)
+        return totals, counts
+
+    def spending_by_category(self, start_date=None, end_date=None,
+                             user_id: Optional[int] = None) -> List[Dict]:
+        """
+        Total spending by category, the same rows as
+        Transaction.get_spending_by_category
+
+        Args:
+            start_date: Earliest transaction date, inclusive (optional)
+            end_date: Latest transaction date, inclusive (optional)
+            user_id: Only this user (optional; a per-user frame is already filtered)
+
+        Returns:
+            List of dictionaries with category_id, category_name, icon,
+            total_spent and transaction_count, largest total first
+        """
+        with self._lock:
+            totals, counts = self._group('category', len(self._category_ids),
+                                         start_date, end_date, user_id)
+            result = []
+            for code in np.flatnonzero(counts):
+                category_id = self._category_ids[code]
+                category = self._categories.get(category_id, {})
+                result.append({
+                    'category_id': category_id,
+                    'category_name': category.get('category_name'),
+                    'icon': category.get('icon'),
+                    'total_spent': from_cents(totals[code]),
+                    'transaction_count': int(counts[code]),
+                })
+        result.sort(key=lambda row: (-row['total_spent'], row['category_id']))
+        return result
+
+    def spending_by_month(self, start_date=None, end_date=None,
+                          user_id: Optional[int] = None) -> List[Dict]:
+        """
+        Total spending per calendar month
+
+        Returns:
+            List of dictionaries with month (first day), total_spent and
+            transaction_count, oldest month first
+        """
+        with self._lock:
+            mask = self._mask(start_date, end_date, user_id)
+            months = self._arrays['month'][:self._size][mask]
+            if not len(months):
+                return []
+            first = int(months.min())
+            codes = months - first
+            totals = np.zeros(int(codes.max()) + 1, dtype=np.int64)
+            np.add.at(totals, codes, self._arrays['cents'][:self._size][mask])
+            counts = np.bincount(codes)
+        return [{
+            'month': date((first + code) // 12, (first + code) % 12 + 1, 1),
+            'total_spent': from_cents(totals[code]),
+            'transaction_count': int(counts[code]),
+        } for code in np.flatnonzero(counts)]
+
+    def spending_by_payment_method(self, start_date=None, end_date=None,
+                                   user_id: Optional[int] = None) -> List[Dict]:
+        """
+        Total spending per payment method
+
+        Returns:
+            List of dictionaries with payment_method, total_spent and
+            transaction_count, largest total first
+        """
+        with self._lock:
+            totals, counts = self._group('payment_method', len(self._methods),
+                                         start_date, end_date, user_id)
+            result = [{
+                'payment_method': self._methods[code],
+                'total_spent': from_cents(totals[code]),
+                'transaction_count': int(counts[code]),
+            } for code in np.flatnonzero(counts)]
+        result.sort(key=lambda row: -row['total_spent'])
+        return result
+
+    def top_categories(self, n: int = 5, start_date=None, end_date=None,
+                       user_id: Optional[int] = None) -> List[Dict]:
+        """The n categories with the highest spending (see spending_by_category)"""
+        return self.spending_by_category(start_date, end_date, user_id)[:n]
+
+    def pivot(self, start_date=None, end_date=None, user_id: Optional[int] = None) -> Dict:
+        """
+        Spending by month x category
+
+        Returns:
+            Dictionary with months (first days, oldest first), categories
+            (names, in column order) and totals (one list of Decimal per
+            month, one value per category; zero where nothing was spent)
+        """
+        with self._lock:
+            mask = self._mask(start_date, end_date, user_id)
+            months = self._arrays['month'][:self._size][mask]
+            if not len(months):
+                return {'months': [], 'categories': [], 'totals': []}
+            categories = self._arrays['category'][:self._size][mask]
+            used = np.unique(categories)
+            columns = np.searchsorted(used, categories)
+            first = int(months.min())
+            grid = np.zeros((int(months.max()) - first + 1, len(used)), dtype=np.int64)
+            np.add.at(grid, (months - first, columns), self._arrays['cents'][:self._size][mask])
+            names = [self._categories.get(self._category_ids[code], {}).get('category_name')
+                     for code in used]
+        return {
+            'months': [date((first + row) // 12, (first + row) % 12 + 1, 1)
+                       for row in range(grid.shape[0])],
+            'categories': names,
+            'totals': [[from_cents(cents) for cents in row] for row in grid.tolist()],
+        }
@@ -0,0 +1,205 @@
+"""
+Archiver Module
+Moves transactions older than a cutoff out of the transactions table into
+compressed export files, recorded in transaction_archives
+
+Rows are moved in chunks by transaction ID, one archive file per chunk.
+Each chunk is read and locked in one session; its file is written, synced
+to disk and recorded in transaction_archives before its rows are deleted,
+and the catalog row, the delete and the monthly rollup and budget counter
+adjustments (as in Transaction.delete) commit together. If the process
+dies before that commit, the rows stay live and the file is not in the
+catalog, which is all history_archive.py reads. On a partitioned MySQL
+table the partitions emptied this way are then dropped.
+"""
+
+import os
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import budget_alerts
+import partitions
+from conversions import as_date
+from db_config import DatabaseConfig, execute_query
+from exporter import ExportWriter
+from models.monthly_spending import MonthlySpending
+from models.transaction import Transaction
+
+DEFAULT_DIRECTORY = "archives"
+DEFAULT_COMPRESSION = "xz"
+# Rows per archive file; one chunk is held in memory while it is written
+DEFAULT_CHUNK_SIZE = 50000
+
+_SUFFIXES = {None: "", 'gzip': ".gz", 'bz2': ".bz2", 'xz': ".xz"}
+
+# The export columns (exporter.COLUMNS), oldest ID first; LEFT JOINs so
+# rows whose user or category is gone are still archived
+_CHUNK_QUERY = """
+    SELECT t.transaction_id, t.user_id, u.username, t.category_id, c.category_name,
+           t.amount, t.transaction_date, t.description, t.payment_method, t.created_at
+    FROM transactions t
+    LEFT JOIN users u ON t.user_id = u.user_id
+    LEFT JOIN categories c ON t.category_id = c.category_id
+    WHERE t.transaction_date < %s AND t.transaction_id > %s
+    ORDER BY t.transaction_id
+    LIMIT %s
+"""
+
+
+def cutoff_for(older_than_years: int, today: Optional[date] = None) -> date:
+    """
+    First day of the month older_than_years before today
+
+    Cutoffs are month-aligned so each month of the rollup is either fully
+    archived or fully live.
+    """
+    today = today or date.today()
+    return date(today.year - older_than_years, today.month, 1)
+
+
+def _unindex(transaction_ids: List[int]):
+    for transaction_id in transaction_ids:
+        Transaction._unindex_search(transaction_id)
+
+
+def _sync(path: str):
+    """Flush a file or directory to disk"""
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _archive_chunk(rows: list, path: str, cutoff: date, file_format: str,
+                   compression: Optional[str]) -> Dict:
+    """
+    Write one chunk to its own archive file, then record it and delete its rows
+
+    Call inside the session that read and locked the rows; the catalog row
+    and the delete commit together.
+    """
+    writer = ExportWriter(path, file_format, compression)
+    with writer:
+        writer.write(rows)
+    result = writer.close()
+    _sync(path)
+    _sync(os.path.dirname(path) or ".")
+
+    days = [as_date(row.transaction_date) for row in rows]
+    archive_id = execute_query("""
+        INSERT INTO transaction_archives (path, file_format, compression, cutoff_date,
+                                          first_date, last_date, row_count, file_bytes)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, (path, file_format, compression, cutoff, min(days), max(days), result['rows'],
+          result['file_bytes']))
+
+    ids = [row.transaction_id for row in rows]
+    for start in range(0, len(ids), DatabaseConfig.BATCH_SIZE):
+        batch = ids[start:start + DatabaseConfig.BATCH_SIZE]
+        execute_query(f"DELETE FROM transactions WHERE transaction_id IN "
+                      f"({', '.join(['%s'] * len(batch))})", tuple(batch))
+    removed = [(row.user_id, row.category_id, row.amount, row.transaction_date,
+                row.transaction_id) for row in rows]
+    MonthlySpending.apply(MonthlySpending.deltas(removed=removed))
+    budget_alerts.apply_transactions(removed=removed)
+    DatabaseConfig.on_commit(lambda: _unindex(ids))
+    return {
+        'archive_id': archive_id,
+        'path': path,
+        'rows': result['rows'],
+        'first_date': min(days),
+        'last_date': max(days),
+        'file_bytes': result['file_bytes'],
+    }
+
+
+def archive_transactions(before=None, older_than_years: Optional[int] = None,
+                         directory: str = DEFAULT_DIRECTORY, file_format: str = 'columnar',
+                         compression: Optional[str] = DEFAULT_COMPRESSION,
+                         chunk_size: Optional[int] = None,
+                         drop_partitions: bool = True) -> Dict:
+    """
+    Move every transaction dated before a cutoff into archive files
+
+    A chunk's rows are deleted only in the commit that records its synced
+    file. If a chunk fails, its file is removed and its rows stay live;
+    the chunks committed before it stay archived.
+
+    Args:
+        before: Cutoff date; transactions dated before it are archived
+        older_than_years: Alternative to before: see cutoff_for
+        directory: Directory for the archive files (created if missing)
+        file_format: 'columnar' or 'csv' (see exporter.py)
+        compression: None, 'gzip', 'bz2' or 'xz'
+        chunk_size: Rows per archive file (defaults to DEFAULT_CHUNK_SIZE)
+        drop_partitions: On a partitioned table, drop the partitions emptied
+
+    Returns:
+        Dictionary with archives (archive_id, path, rows, first_date,
+        last_date and file_bytes of each file), cutoff, rows, first_date,
+        last_date, file_bytes, dropped_partitions and seconds
+    """
+    if (before is None) == (older_than_years is None):
+        raise ValueError("Give exactly one of before and older_than_years")
+    cutoff = as_date(before) if before is not None else cutoff_for(older_than_years)
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    started = time.perf_counter()
+
+    os.makedirs(directory, exist_ok=True)
+    extension = ".btxc" if file_format == 'columnar' else ".csv"
+    prefix = os.path.join(directory, f"transactions_before_{cutoff:%Y%m%d}_"
+                                     f"{datetime.now():%Y%m%d%H%M%S}")
+    query = _CHUNK_QUERY
+    if DatabaseConfig.backend().name == "mysql":
+        # Rows stay locked until their chunk commits, so the file, the
+        # rollup and the counter adjustments match the rows deleted
+        query += " FOR UPDATE"
+
+    archives: List[Dict] = []
+    last_id = 0
+    while True:
+        path = (f"{prefix}_{len(archives) + 1:04d}{extension}"
+                f"{_SUFFIXES.get(compression, '')}")
+        try:
+            with DatabaseConfig.session():
+                rows = execute_query(query, (cutoff, last_id, chunk_size), fetch=True,
+                                     compact=True, cache=False)
+                if not rows:
+                    break
+                archive = _archive_chunk(rows, path, cutoff, file_format, compression)
+        except BaseException:
+            # The chunk rolled back: its rows are live, so drop its file
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        archives.append(archive)
+        last_id = rows[-1].transaction_id
+
+    dropped: List[str] = []
+    if drop_partitions and partitions.is_partitioned():
+        dropped, _ = partitions.drop_partitions(cutoff)
+
+    return {
+        'archives': archives,
+        'cutoff': cutoff,
+        'rows': sum(archive['rows'] for archive in archives),
+        'first_date': min((archive['first_date'] for archive in archives), default=None),
+        'last_date': max((archive['last_date'] for archive in archives), default=None),
+        'file_bytes': sum(archive['file_bytes'] for archive in archives),
+        'dropped_partitions': dropped,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def list_archives() -> List[Dict]:
+    """
+    Archives recorded in transaction_archives, oldest first
+
+    Returns:
+        List of dictionaries with archive_id, path, file_format,
+        compression, cutoff_date, first_date, last_date, row_count,
+        file_bytes and created_at
+    """
+    return execute_query("SELECT * FROM transaction_archives ORDER BY archive_id", fetch=True)
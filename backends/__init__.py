@@ -0,0 +1,43 @@
+"""
+Backends Package
+Storage engines that sit under db_config.execute_query
+"""
+
+import importlib
+import sqlite3
+
+from backends.base import Backend, DatabaseError, PoolError
+
+# module, class name for each selectable DatabaseConfig.BACKEND
+BACKENDS = {
+    'mysql': ('backends.mysql_backend', 'MySQLBackend'),
+    'sqlite': ('backends.sqlite_backend', 'SQLiteBackend'),
+}
+
+# Every exception class a backend may raise, for use in except clauses
+DATABASE_ERRORS = (DatabaseError, sqlite3.Error)
+try:
+    from mysql.connector import Error as _MySQLError
+    DATABASE_ERRORS += (_MySQLError,)
+except ImportError:
+    pass
+
+
+def get_backend(name: str) -> type:
+    """
+    Look up a backend class by name
+
+    Args:
+        name: 'mysql' or 'sqlite'
+
+    Returns:
+        The Backend subclass
+    """
+    if name not in BACKENDS:
+        raise DatabaseError(f"Unknown database backend '{name}' "
+                            f"(expected one of {', '.join(BACKENDS)})")
+    module_name, class_name = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+__all__ = ['Backend', 'DatabaseError', 'PoolError', 'DATABASE_ERRORS', 'get_backend']
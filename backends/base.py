@@ -0,0 +1,60 @@
+"""
+Backend Interface
+Defines what a storage engine must provide to db_config
+"""
+
+from typing import List, Sequence
+
+
+class DatabaseError(Exception):
+    """Backend-independent database error"""
+
+
+class PoolError(DatabaseError):
+    """No connection could be checked out of the pool"""
+
+
+class Backend:
+    """
+    Storage engine behind execute_query
+
+    connect() returns a connection object with the mysql-connector
+    interface db_config relies on: cursor(dictionary=, buffered=, prepared=),
+    commit(), rollback(), close(), is_connected(), reconnect(),
+    reset_session(), consume_results() and the in_transaction property.
+    Cursors accept %s placeholders.
+    """
+
+    # Name used by DatabaseConfig.BACKEND and for dialect-specific SQL
+    name = ""
+
+    # Whether cursor(prepared=True) gives server-side prepared statements
+    supports_prepared = False
+
+    # Whether the application creates and owns the schema (bootstrap() plus
+    # migrations applied on pool initialization) rather than a DBA
+    manages_schema = False
+
+    # Prefix that turns a SELECT into a query plan request
+    explain_prefix = "EXPLAIN "
+
+    @classmethod
+    def from_config(cls, config) -> "Backend":
+        """Build the backend from DatabaseConfig settings"""
+        raise NotImplementedError
+
+    def bootstrap(self):
+        """Prepare the database before the pool opens (no-op by default)"""
+
+    def connect(self):
+        """Open a new connection"""
+        raise NotImplementedError
+
+    def insert_many(self, cursor, query: str, rows: Sequence[tuple]) -> List[int]:
+        """
+        Insert a batch of rows with one cursor
+
+        Returns:
+            Generated IDs in the same order as rows
+        """
+        raise NotImplementedError
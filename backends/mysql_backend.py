@@ -0,0 +1,36 @@
+"""
+MySQL Backend
+mysql-connector-python connections to a MySQL server
+"""
+
+from typing import Dict, List, Sequence
+
+import mysql.connector
+
+from backends.base import Backend
+
+
+class MySQLBackend(Backend):
+    """MySQL server reached over mysql-connector"""
+
+    name = "mysql"
+    supports_prepared = True
+    explain_prefix = "EXPLAIN "
+
+    def __init__(self, config: Dict):
+        self.config = config
+
+    @classmethod
+    def from_config(cls, config) -> "MySQLBackend":
+        return cls(config.DB_CONFIG)
+
+    def connect(self):
+        return mysql.connector.connect(**self.config)
+
+    def insert_many(self, cursor, query: str, rows: Sequence[tuple]) -> List[int]:
+        # mysql-connector rewrites executemany of an INSERT into one multi-row
+        # INSERT. That is a "simple insert" for InnoDB, so its AUTO_INCREMENT
+        # values are consecutive and lastrowid is the first of them.
+        cursor.executemany(query, rows)
+        first_id = cursor.lastrowid
+        return list(range(first_id, first_id + len(rows)))
@@ -0,0 +1,230 @@
+"""
+SQLite Backend
+Embedded, in-process storage engine using the standard library sqlite3 module
+
+Run as a script to create the database and optionally load test_data.sql:
+    python -m backends.sqlite_backend [path] [--test-data]
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from itertools import chain
+from typing import List, Sequence
+
+from backends.base import Backend
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(PROJECT_DIR, "schema_sqlite.sql")
+TEST_DATA_PATH = os.path.join(PROJECT_DIR, "test_data.sql")
+
+# Shared-cache URI used for ":memory:" so every pooled connection sees one database
+MEMORY_URI = "file:budget_tracker?mode=memory&cache=shared"
+
+_PLACEHOLDERS = re.compile(r"%s|%%")
+
+# Return the types mysql-connector returns for the same columns
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter(
+    "DECIMAL_REAL", lambda value: Decimal(value.decode()).quantize(Decimal("0.01")))
+
+_CENT = Decimal("0.01")
+
+
+def _to_decimal(value: float) -> Decimal:
+    """
+    DECIMAL value of a float computed over DECIMAL_REAL columns
+
+    Converters only apply to declared columns, so SUM(amount) and ratios
+    come back as floats where mysql-connector returns Decimal. Rounding to
+    six places drops the float error; sums of amounts come back in cents.
+    """
+    exact = Decimal(repr(round(value, 6)))
+    cents = exact.quantize(_CENT)
+    return cents if cents == exact else exact
+
+
+def _decimal_row(row: tuple) -> tuple:
+    return tuple(_to_decimal(value) if type(value) is float else value for value in row)
+
+
+@lru_cache(maxsize=512)
+def translate_placeholders(query: str) -> str:
+    """Rewrite mysql-connector %s placeholders (and %% escapes) for sqlite3"""
+    return _PLACEHOLDERS.sub(lambda match: "?" if match.group() == "%s" else "%", query)
+
+
+class SQLiteCursor:
+    """sqlite3 cursor with the subset of the mysql-connector cursor API db_config uses"""
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def column_names(self) -> tuple:
+        description = self._cursor.description
+        return tuple(column[0] for column in description) if description else ()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self, query: str, params: Sequence = ()):
+        self._cursor.execute(translate_placeholders(query), tuple(params or ()))
+
+    def executemany(self, query: str, params_seq):
+        self._cursor.executemany(translate_placeholders(query), params_seq)
+
+    def _convert(self, rows: list) -> list:
+        # Floats only come from expressions; the schema has no float columns
+        if rows and float in set(map(type, chain.from_iterable(rows))):
+            rows = [_decimal_row(row) for row in rows]
+        if not self._dictionary:
+            return rows
+        columns = self.column_names
+        return [dict(zip(columns, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._convert([row])[0] if row is not None else None
+
+    def fetchmany(self, size: int) -> list:
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self) -> list:
+        return self._convert(self._cursor.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection exposing the mysql-connector connection API the pool uses"""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._db = None
+        self.reconnect()
+
+    def reconnect(self):
+        uri = self._path.startswith("file:")
+        self._db = sqlite3.connect(self._path, uri=uri, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES, timeout=30)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if not uri:
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+
+    def cursor(self, dictionary: bool = False, buffered: bool = True,
+               prepared: bool = False) -> SQLiteCursor:
+        # sqlite3 always streams rows and caches compiled statements per
+        # connection, so buffered/prepared need no special handling
+        return SQLiteCursor(self._db.cursor(), dictionary)
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._db.in_transaction
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def is_connected(self) -> bool:
+        return self._db is not None
+
+    def reset_session(self):
+        self._db.rollback()
+
+    def consume_results(self):
+        pass
+
+    def executescript(self, script: str):
+        self._db.executescript(script)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class SQLiteBackend(Backend):
+    """In-process SQLite database file (or shared in-memory database)"""
+
+    name = "sqlite"
+    supports_prepared = False
+    manages_schema = True
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+    def __init__(self, path: str):
+        self.path = MEMORY_URI if path == ":memory:" else path
+        self._keepalive = None
+
+    @classmethod
+    def from_config(cls, config) -> "SQLiteBackend":
+        return cls(config.SQLITE_PATH)
+
+    def bootstrap(self):
+        """Create the schema (tables, indexes, triggers and views) if it is missing"""
+        connection = SQLiteConnection(self.path)
+        cursor = connection.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'users'")
+        if cursor.fetchone() is None:
+            with open(SCHEMA_PATH, encoding="utf-8") as schema:
+                connection.executescript(schema.read())
+        cursor.close()
+        if self.path == MEMORY_URI:
+            # A shared in-memory database lives only while a connection is open
+            self._keepalive = connection
+        else:
+            connection.close()
+
+    def connect(self) -> SQLiteConnection:
+        return SQLiteConnection(self.path)
+
+    def insert_many(self, cursor, query: str, rows: Sequence[tuple]) -> List[int]:
+        # Rows are inserted one by one (there is no network round trip), and
+        # lastrowid is only reported by execute()
+        ids = []
+        for row in rows:
+            cursor.execute(query, row)
+            ids.append(cursor.lastrowid)
+        return ids
+
+    def load_script(self, path: str):
+        """Run a MySQL data script such as test_data.sql, skipping USE statements"""
+        with open(path, encoding="utf-8") as script:
+            lines = [line for line in script if not line.lstrip().upper().startswith("USE ")]
+        connection = self.connect()
+        try:
+            connection.executescript("".join(lines))
+        finally:
+            connection.close()
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    backend = SQLiteBackend(args[0] if args else "budget_tracker.db")
+    backend.bootstrap()
+    print(f"SQLite database ready at {backend.path}")
+    if "--test-data" in sys.argv:
+        backend.load_script(TEST_DATA_PATH)
+        print("Test data loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+Standalone performance scripts, run with python -m benchmarks.<name>
+"""
@@ -0,0 +1,129 @@
+"""
+Composite Index Benchmark
+Times the hot date-range and rollup queries and prints their query plans
+before and after migration 001, using the embedded SQLite backend so it
+runs without a MySQL server
+
+    python -m benchmarks.bench_indexes [rows] [iterations]
+"""
+
+import sys
+import time
+from datetime import date, timedelta
+
+from backends.sqlite_backend import TEST_DATA_PATH
+from db_config import DatabaseConfig, execute_query, execute_many
+from migrations import migrate
+from models import BudgetRule, Transaction
+
+USER_ID = 1
+BUDGET_ID = 2  # user 1, February 2024
+START, END = '2024-02-01', '2024-02-29'
+
+LOOKUPS = {
+    'Transaction.get_by_date_range': (
+        lambda: Transaction.get_by_date_range(USER_ID, START, END),
+        """SELECT t.*, c.category_name, c.icon FROM transactions t
+           JOIN categories c ON t.category_id = c.category_id
+           WHERE t.user_id = %s AND t.transaction_date BETWEEN %s AND %s
+           ORDER BY t.transaction_date DESC""",
+        (USER_ID, START, END)),
+    'Transaction.get_spending_by_category': (
+        lambda: Transaction.get_spending_by_category(USER_ID, START, END),
+        """SELECT c.category_name, SUM(t.amount), COUNT(t.transaction_id)
+           FROM transactions t JOIN categories c ON t.category_id = c.category_id
+           WHERE t.user_id = %s AND t.transaction_date BETWEEN %s AND %s
+           GROUP BY c.category_id""",
+        (USER_ID, START, END)),
+    'Transaction.get_total_spending': (
+        lambda: Transaction.get_total_spending(USER_ID, START, END),
+        """SELECT COALESCE(SUM(amount), 0) FROM transactions
+           WHERE user_id = %s AND transaction_date BETWEEN %s AND %s""",
+        (USER_ID, START, END)),
+    'BudgetRule.get_rules_with_spending': (
+        lambda: BudgetRule.get_rules_with_spending(BUDGET_ID),
+        """SELECT br.rule_id, COALESCE(SUM(t.amount), 0)
+           FROM budget_rules br
+           JOIN categories c ON br.category_id = c.category_id
+           JOIN budgets b ON br.budget_id = b.budget_id
+           LEFT JOIN transactions t ON c.category_id = t.category_id
+               AND t.user_id = b.user_id
+               AND t.transaction_date BETWEEN b.start_date AND b.end_date
+           WHERE br.budget_id = %s
+           GROUP BY br.rule_id""",
+        (BUDGET_ID,)),
+    'Transaction.get_page_by_user': (
+        lambda: Transaction.get_page_by_user(USER_ID, page_size=50),
+        """SELECT * FROM transactions WHERE user_id = %s
+           ORDER BY transaction_date DESC, created_at DESC, transaction_id DESC
+           LIMIT 51""",
+        (USER_ID,)),
+}
+
+
+def populate(row_count: int):
+    """Create an in-memory database at schema.sql level with row_count transactions"""
+    DatabaseConfig.BACKEND = "sqlite"
+    DatabaseConfig.SQLITE_PATH = ":memory:"
+    DatabaseConfig.QUERY_STATS_ENABLED = False
+    DatabaseConfig.AUTO_MIGRATE = False
+    DatabaseConfig.initialize_pool(pool_size=1)
+    DatabaseConfig.backend().load_script(TEST_DATA_PATH)
+
+    start = date(2021, 1, 1)
+    rows = ((1 + i % 10, 1 + i % 12, round(1 + (i * 7919) % 50000 / 100, 2),
+             start + timedelta(days=i % 1500), f"Purchase {i % 5000}", "Debit Card")
+            for i in range(row_count))
+    execute_many("""
+        INSERT INTO transactions (user_id, category_id, amount, transaction_date,
+                                 description, payment_method)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, rows, chunk_size=50000)
+    execute_query("ANALYZE")
+
+
+def measure(iterations: int) -> dict:
+    """Average milliseconds per call and the query plan of each lookup"""
+    prefix = DatabaseConfig.backend().explain_prefix
+    results = {}
+    for name, (lookup, explain_sql, params) in LOOKUPS.items():
+        lookup()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            lookup()
+        elapsed_ms = (time.perf_counter() - started) / iterations * 1000
+        plan = execute_query(prefix + explain_sql, params, fetch=True)
+        results[name] = {'ms': elapsed_ms, 'plan': [row['detail'] for row in plan]}
+    return results
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"Populating {row_count:,} transactions...")
+    populate(row_count)
+
+    # Raw aggregation, and migration 001 only, so the indexes are the only
+    # difference between the two runs (bench_rollup.py times the rollup)
+    DatabaseConfig.USE_SPENDING_ROLLUP = False
+    before = measure(iterations)
+    migrate(target=1)
+    execute_query("ANALYZE")
+    after = measure(iterations)
+
+    print(f"\n{'Lookup':<38} {'Before ms':>10} {'After ms':>10} {'Speedup':>8}")
+    print("-" * 70)
+    for name in LOOKUPS:
+        print(f"{name:<38} {before[name]['ms']:>10.2f} {after[name]['ms']:>10.2f} "
+              f"{before[name]['ms'] / after[name]['ms']:>7.1f}x")
+
+    for name in LOOKUPS:
+        print(f"\n{name}")
+        print("  before: " + "; ".join(before[name]['plan']))
+        print("  after:  " + "; ".join(after[name]['plan']))
+
+    DatabaseConfig.close_pool()
+
+
+if __name__ == "__main__":
+    main()
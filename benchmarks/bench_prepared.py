@@ -0,0 +1,56 @@
+"""
+Prepared Statement Benchmark
+Compares the hot model lookups over the text protocol and over cached
+server-side prepared statements
+
+Run from the project root against a loaded budget_tracker database:
+    python -m benchmarks.bench_prepared [iterations]
+"""
+
+import sys
+import time
+
+from db_config import DatabaseConfig
+from models import User, BudgetRule, Transaction
+
+
+def run_lookups(iterations: int, user_id: int, budget_id: int) -> dict:
+    """Time each hot lookup for the given number of iterations"""
+    lookups = {
+        'Transaction.get_by_user': lambda: Transaction.get_by_user(user_id, limit=50),
+        'Transaction.get_by_date_range': lambda: Transaction.get_by_date_range(
+            user_id, '2024-01-01', '2024-12-31'),
+        'User.get_by_id': lambda: User.get_by_id(user_id),
+        'BudgetRule.get_rules_with_spending': lambda: BudgetRule.get_rules_with_spending(budget_id),
+    }
+    timings = {}
+    for name, lookup in lookups.items():
+        lookup()  # warm up (prepares the statement on the prepared run)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            lookup()
+        timings[name] = (time.perf_counter() - start) / iterations * 1_000_000
+    return timings
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    # A single pooled connection keeps the per-connection cache warm
+    DatabaseConfig.initialize_pool(pool_size=1)
+    
+    DatabaseConfig.USE_PREPARED_STATEMENTS = False
+    text = run_lookups(iterations, user_id=1, budget_id=2)
+    DatabaseConfig.USE_PREPARED_STATEMENTS = True
+    prepared = run_lookups(iterations, user_id=1, budget_id=2)
+    
+    print(f"\n{'Query':<38} {'Text (us)':>12} {'Prepared (us)':>14} {'Speedup':>9}")
+    print("-" * 76)
+    for name in text:
+        speedup = text[name] / prepared[name] if prepared[name] else 0
+        print(f"{name:<38} {text[name]:>12.1f} {prepared[name]:>14.1f} {speedup:>8.2f}x")
+    
+    DatabaseConfig.close_pool()
+
+
+if __name__ == "__main__":
+    main()
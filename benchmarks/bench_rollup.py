@@ -0,0 +1,66 @@
+"""
+Monthly Rollup Benchmark
+Times multi-year spending summaries read from the monthly_spending rollup
+against re-aggregating the transactions table, using the embedded SQLite
+backend so it runs without a MySQL server
+
+    python -m benchmarks.bench_rollup [rows] [iterations]
+"""
+
+import sys
+import time
+
+from benchmarks.bench_indexes import populate
+from db_config import DatabaseConfig
+from migrations import migrate
+from models import Category, Transaction
+
+USER_ID = 1
+
+LOOKUPS = {
+    'get_spending_by_category (4 years)': lambda: Transaction.get_spending_by_category(
+        USER_ID, '2021-01-01', '2024-12-31'),
+    'get_spending_by_category (mid-month)': lambda: Transaction.get_spending_by_category(
+        USER_ID, '2021-01-15', '2024-02-10'),
+    'get_total_spending (4 years)': lambda: Transaction.get_total_spending(
+        USER_ID, '2021-01-01', '2024-12-31'),
+    'get_spending_by_category (1 month)': lambda: Transaction.get_spending_by_category(
+        USER_ID, '2024-02-01', '2024-02-29'),
+    'Category.get_with_transaction_count': Category.get_with_transaction_count,
+}
+
+
+def measure(iterations: int, use_rollup: bool) -> dict:
+    """Average milliseconds per call of each lookup"""
+    DatabaseConfig.USE_SPENDING_ROLLUP = use_rollup
+    results = {}
+    for name, lookup in LOOKUPS.items():
+        lookup()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            lookup()
+        results[name] = (time.perf_counter() - started) / iterations * 1000
+    return results
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"Populating {row_count:,} transactions...")
+    populate(row_count)
+    migrate()
+
+    raw = measure(iterations, use_rollup=False)
+    rollup = measure(iterations, use_rollup=True)
+
+    print(f"\n{'Lookup':<40} {'Raw ms':>10} {'Rollup ms':>10} {'Speedup':>8}")
+    print("-" * 72)
+    for name in LOOKUPS:
+        print(f"{name:<40} {raw[name]:>10.2f} {rollup[name]:>10.2f} "
+              f"{raw[name] / rollup[name]:>7.1f}x")
+
+    DatabaseConfig.close_pool()
+
+
+if __name__ == "__main__":
+    main()
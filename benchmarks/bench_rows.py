@@ -0,0 +1,103 @@
+"""
+Row Representation Benchmark
+Compares memory and throughput of dictionary rows and compact records on a
+large transactions result, using the embedded SQLite backend so it runs
+without a MySQL server
+
+    python -m benchmarks.bench_rows [rows]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from backends.sqlite_backend import TEST_DATA_PATH
+from db_config import DatabaseConfig, execute_query, execute_many
+from records import as_records
+
+QUERY = "SELECT * FROM transactions"
+
+
+def populate(row_count: int):
+    """Create an in-memory database with row_count transactions"""
+    DatabaseConfig.BACKEND = "sqlite"
+    DatabaseConfig.SQLITE_PATH = ":memory:"
+    DatabaseConfig.QUERY_STATS_ENABLED = False
+    DatabaseConfig.initialize_pool(pool_size=1)
+    DatabaseConfig.backend().load_script(TEST_DATA_PATH)
+
+    start = date(2020, 1, 1)
+    rows = ((1 + i % 10, 1 + i % 12, round(1 + (i * 7919) % 50000 / 100, 2),
+             start + timedelta(days=i % 1500), f"Purchase {i % 5000}", "Debit Card")
+            for i in range(row_count))
+    execute_many("""
+        INSERT INTO transactions (user_id, category_id, amount, transaction_date,
+                                 description, payment_method)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, rows, chunk_size=50000)
+
+
+def measure(compact: bool) -> dict:
+    """Fetch the whole table once for timing and once under tracemalloc"""
+    gc.collect()
+    started = time.perf_counter()
+    rows = execute_query(QUERY, fetch=True, compact=compact)
+    elapsed = time.perf_counter() - started
+    count = len(rows)
+    del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = execute_query(QUERY, fetch=True, compact=compact)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return {'rows': count, 'seconds': elapsed, 'retained_mb': retained / 2**20,
+            'peak_mb': peak / 2**20}
+
+
+def measure_construction(row_count: int) -> dict:
+    """Time building rows from already-fetched tuples, isolating the row factory"""
+    cursor_columns = ('transaction_id', 'user_id', 'category_id', 'amount',
+                      'transaction_date', 'description', 'payment_method',
+                      'created_at', 'updated_at')
+    tuples = [(i, 1, 2, 10.5, None, "Purchase", "Debit Card", None, None)
+              for i in range(row_count)]
+    started = time.perf_counter()
+    dicts = [dict(zip(cursor_columns, row)) for row in tuples]
+    dict_seconds = time.perf_counter() - started
+    del dicts
+    started = time.perf_counter()
+    records = as_records(cursor_columns, tuples)
+    record_seconds = time.perf_counter() - started
+    del records
+    return {'dict': dict_seconds, 'record': record_seconds}
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Populating {row_count:,} transactions...")
+    populate(row_count)
+
+    results = {'dict': measure(compact=False), 'record': measure(compact=True)}
+
+    print(f"\n{'Rows':<8} {'Count':>10} {'Fetch s':>9} {'Rows/s':>12} "
+          f"{'Retained MB':>12} {'Peak MB':>9}")
+    print("-" * 66)
+    for name, result in results.items():
+        rate = result['rows'] / result['seconds']
+        print(f"{name:<8} {result['rows']:>10,} {result['seconds']:>9.2f} {rate:>12,.0f} "
+              f"{result['retained_mb']:>12.1f} {result['peak_mb']:>9.1f}")
+
+    construction = measure_construction(row_count)
+    print(f"\nRow construction only: dict {construction['dict']:.2f}s, "
+          f"record {construction['record']:.2f}s "
+          f"({construction['dict'] / construction['record']:.1f}x faster)")
+
+    DatabaseConfig.close_pool()
+
+
+if __name__ == "__main__":
+    main()
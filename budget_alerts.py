@@ -0,0 +1,239 @@
+"""
+Budget Alerts Module
+Incremental budget alert engine: keeps budget_rules.spent_amount current as
+transactions change and emits an event the moment a rule crosses its alert
+threshold or its limit
+"""
+
+import logging
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from conversions import as_date
+from db_config import DatabaseConfig, execute_query
+
+# Event types
+THRESHOLD_REACHED = "threshold_reached"
+LIMIT_EXCEEDED = "limit_exceeded"
+
+# Silent unless the application configures logging
+alert_logger = logging.getLogger("budget_tracker.alerts")
+alert_logger.addHandler(logging.NullHandler())
+
+# Rules of every budget owned by the given users, in the given categories,
+# whose period overlaps the changed dates
+_RULES_QUERY = """
+    SELECT br.rule_id, br.budget_id, br.category_id, br.limit_amount,
+           br.alert_threshold, br.spent_amount,
+           b.user_id, b.budget_name, b.start_date, b.end_date, b.is_active
+    FROM budgets b
+    JOIN budget_rules br ON br.budget_id = b.budget_id
+    WHERE b.user_id IN ({users}) AND br.category_id IN ({categories})
+        AND b.start_date <= %s AND b.end_date >= %s
+"""
+
+
+class AlertSink:
+    """Destination for alert events; subclasses implement emit()"""
+
+    def emit(self, event: Dict):
+        raise NotImplementedError
+
+
+class QueueSink(AlertSink):
+    """
+    Bounded in-memory FIFO of events (the default sink)
+
+    Consumers call get() to block for the next event or drain() to take
+    everything queued. When full, the oldest event is discarded.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def emit(self, event: Dict):
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(event)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next event, waiting up to timeout seconds (None if none arrived)"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[Dict]:
+        """Remove and return every queued event, oldest first"""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class LoggingSink(AlertSink):
+    """Writes each event to the budget_tracker.alerts logger"""
+
+    def emit(self, event: Dict):
+        alert_logger.warning("%s: user %s budget %s (%s) category %s at %.1f%% of %s",
+                             event['type'], event['user_id'], event['budget_id'],
+                             event['budget_name'], event['category_id'],
+                             event['percent_used'], event['limit_amount'])
+
+
+class CallbackSink(AlertSink):
+    """Passes each event to a function, e.g. a notification service client"""
+
+    def __init__(self, callback: Callable[[Dict], None]):
+        self._callback = callback
+
+    def emit(self, event: Dict):
+        self._callback(event)
+
+
+_sink: AlertSink = QueueSink()
+
+
+def set_sink(sink: AlertSink):
+    """Send future alert events to sink"""
+    global _sink
+    _sink = sink
+
+
+def get_sink() -> AlertSink:
+    """Current alert sink (a QueueSink unless set_sink was called)"""
+    return _sink
+
+
+def _crossings(rule: Dict, before: Decimal, after: Decimal, transaction_id) -> List[Dict]:
+    """Events for a rule whose spent amount rose from before to after"""
+    limit = Decimal(str(rule['limit_amount']))
+    threshold = limit * Decimal(str(rule['alert_threshold'])) / 100
+    crossed = []
+    if before < threshold <= after:
+        crossed.append(THRESHOLD_REACHED)
+    if before <= limit < after:
+        crossed.append(LIMIT_EXCEEDED)
+    return [{
+        'type': event_type,
+        'rule_id': rule['rule_id'],
+        'budget_id': rule['budget_id'],
+        'budget_name': rule['budget_name'],
+        'user_id': rule['user_id'],
+        'category_id': rule['category_id'],
+        'transaction_id': transaction_id,
+        'spent': after,
+        'limit_amount': limit,
+        'alert_threshold': Decimal(str(rule['alert_threshold'])),
+        'percent_used': float(after / limit * 100),
+        'occurred_at': datetime.now(),
+    } for event_type in crossed]
+
+
+def _emit(events: List[Dict]):
+    sink = _sink
+    for event in events:
+        try:
+            sink.emit(event)
+        except Exception as e:
+            print(f"Error delivering budget alert: {e}")
+
+
+def apply_transactions(added: Iterable[Sequence] = (),
+                       removed: Iterable[Sequence] = ()) -> List[Dict]:
+    """
+    Update the spent counters of the rules covering changed transactions
+
+    Rules match on user, category and a transaction date inside the budget's
+    start_date..end_date; only those rules are read and updated. Events for
+    active budgets whose rule crosses its alert threshold or limit are sent
+    to the sink after the enclosing session commits (and dropped if it rolls
+    back). Call inside the session that changes the transactions.
+
+    Args:
+        added: (user_id, category_id, amount, transaction_date, transaction_id)
+               tuples for new transactions (or the new state of updated ones)
+        removed: Tuples of the same shape for deleted transactions (or the
+                 old state of updated ones)
+
+    Returns:
+        Events that will be emitted on commit
+    """
+    changes = [(txn, -1) for txn in removed] + [(txn, 1) for txn in added]
+    if not changes:
+        return []
+    dates = [as_date(txn[3]) for txn, _ in changes]
+    users = sorted({txn[0] for txn, _ in changes})
+    categories = sorted({txn[1] for txn, _ in changes})
+
+    query = _RULES_QUERY.format(users=", ".join(["%s"] * len(users)),
+                                categories=", ".join(["%s"] * len(categories)))
+    if DatabaseConfig.backend().name == "mysql":
+        # Hold the counters until commit so concurrent writers see our total
+        query += " FOR UPDATE"
+    rules = execute_query(query, tuple(users) + tuple(categories) + (max(dates), min(dates)),
+                          fetch=True, compact=False)
+    if not rules:
+        return []
+
+    rules_by_key = defaultdict(list)
+    for rule in rules:
+        rules_by_key[(rule['user_id'], rule['category_id'])].append(rule)
+
+    # Net change per transaction, so an update is judged on its old and new
+    # state together rather than on the removal and re-insertion separately
+    per_transaction = {}
+    for position, ((txn, sign), txn_date) in enumerate(zip(changes, dates)):
+        key = txn[4] if len(txn) > 4 and txn[4] is not None else ("row", position)
+        amount = sign * Decimal(str(txn[2]))
+        for rule in rules_by_key.get((txn[0], txn[1]), ()):
+            if rule['start_date'] <= txn_date <= rule['end_date']:
+                deltas = per_transaction.setdefault(key, defaultdict(Decimal))
+                deltas[rule['rule_id']] += amount
+    if not per_transaction:
+        return []
+
+    rules_by_id = {rule['rule_id']: rule for rule in rules}
+    spent = {rule_id: Decimal(str(rule['spent_amount'])) for rule_id, rule in rules_by_id.items()}
+    totals = defaultdict(Decimal)
+    events = []
+    for key, deltas in per_transaction.items():
+        transaction_id = None if isinstance(key, tuple) else key
+        for rule_id, delta in deltas.items():
+            before = spent[rule_id]
+            spent[rule_id] = before + delta
+            totals[rule_id] += delta
+            rule = rules_by_id[rule_id]
+            if delta > 0 and rule['is_active']:
+                events.extend(_crossings(rule, before, spent[rule_id], transaction_id))
+
+    changed = [(rule_id, delta) for rule_id, delta in sorted(totals.items()) if delta]
+    if changed:
+        cases = " ".join(["WHEN %s THEN %s"] * len(changed))
+        placeholders = ", ".join(["%s"] * len(changed))
+        params = tuple(value for pair in changed for value in pair)
+        execute_query(f"""
+            UPDATE budget_rules
+            SET spent_amount = spent_amount + CASE rule_id {cases} END
+            WHERE rule_id IN ({placeholders})
+        """, params + tuple(rule_id for rule_id, _ in changed))
+
+    if events:
+        DatabaseConfig.on_commit(lambda: _emit(events))
+    return events
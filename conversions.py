@@ -0,0 +1,30 @@
+"""
+Conversions Module
+Date and amount coercions shared by the models, importers, exporters and
+columnar engines
+"""
+
+from datetime import date
+from decimal import Decimal
+
+# Day 0 of the day counts stored by the columnar export and history archive
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def as_date(value) -> date:
+    """Accept a date, datetime or 'YYYY-MM-DD' string"""
+    if isinstance(value, date):
+        return value if type(value) is date else value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def to_cents(amount) -> int:
+    """Decimal (or float / string) amount as integer cents"""
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int(amount.scaleb(2))
+
+
+def from_cents(cents) -> Decimal:
+    """Integer cents as a two-place Decimal"""
+    return Decimal(int(cents)).scaleb(-2)
@@ -1,20 +1,310 @@
 """
 Database Configuration Module
-Handles MySQL database connection settings and connection pooling
+Handles database connection settings, backend selection and connection pooling
 """
 from dotenv import load_dotenv
-import mysql.connector
-from mysql.connector import Error, pooling
-from typing import Optional
-import os 
+from backends import Backend, DATABASE_ERRORS as Error, PoolError, get_backend
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+from query_cache import query_cache, tables_read, tables_written
+from query_stats import find_caller, query_stats
+from records import as_records
 
 load_dotenv()
 
 SQLPASS = os.getenv("SQLPASS")
 
+# (owner, connection, after-commit callbacks) of the session active in the
+# current thread or task
+_session_state: ContextVar = ContextVar("session_state", default=None)
+
+def _current_owner():
+    """Identify the running asyncio task, or the current thread outside asyncio"""
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return threading.get_ident()
+
+def _session_connection():
+    """Return the connection pinned by an enclosing session, if any"""
+    state = _session_state.get()
+    # Threads and tasks spawned inside a session inherit its context, but
+    # must not share the connection, so check who opened the session
+    if state is not None and state[0] == _current_owner():
+        return state[1]
+    return None
+
+class PooledConnection:
+    """Connection checked out of a ConnectionPool; close() returns it to the pool"""
+    
+    def __init__(self, pool: "ConnectionPool", cnx):
+        self._pool = pool
+        self._cnx = cnx
+        self._checked_out_at = time.perf_counter()
+    
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+    
+    def close(self):
+        """Return the connection to the pool"""
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool._release(cnx, time.perf_counter() - self._checked_out_at)
+
+class _Waiter:
+    """A caller queued for a connection, woken in FIFO order"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.cnx = None
+        self.may_create = False
+
+class ConnectionPool:
+    """
+    Bounded connection pool with FIFO back-pressure and usage metrics
+    
+    When every connection is in use, callers queue and wait up to timeout
+    seconds instead of failing immediately. With auto_size enabled the pool
+    grows one connection at a time (up to max_size) once grow_threshold
+    callers have had to wait within grow_window seconds, and shrinks back
+    to pool_size when connections are returned without contention.
+    """
+    
+    def __init__(self, connect, pool_name: str = "budget_pool", pool_size: int = 5,
+                 max_size: Optional[int] = None, timeout: float = 10.0,
+                 reset_session: bool = True, auto_size: bool = False,
+                 grow_threshold: int = 3, grow_window: float = 5.0):
+        self._connect = connect
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.max_size = max(max_size or pool_size, pool_size)
+        self.timeout = timeout
+        self.reset_session = reset_session
+        self.auto_size = auto_size
+        self.grow_threshold = grow_threshold
+        self.grow_window = grow_window
+        
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._waiters = deque()
+        self._recent_waits = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._metrics = {
+            'checkouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'hold_time_total': 0.0,
+            'hold_time_max': 0.0,
+            'high_water': 0,
+            'exhausted_events': 0,
+            'timeouts': 0,
+            'grown': 0,
+            'shrunk': 0,
+        }
+        
+        for _ in range(pool_size):
+            self._idle.append(self._connect())
+            self._size += 1
+    
+    def _contended(self, now: float) -> bool:
+        """Whether at least grow_threshold callers had to wait in the last grow_window"""
+        while self._recent_waits and now - self._recent_waits[0] > self.grow_window:
+            self._recent_waits.popleft()
+        return len(self._recent_waits) >= self.grow_threshold
+    
+    def _checked_out(self, cnx, waited: float) -> PooledConnection:
+        """Record a checkout (lock held) and wrap the connection"""
+        self._in_use += 1
+        metrics = self._metrics
+        metrics['checkouts'] += 1
+        metrics['wait_time_total'] += waited
+        metrics['wait_time_max'] = max(metrics['wait_time_max'], waited)
+        metrics['high_water'] = max(metrics['high_water'], self._in_use)
+        return PooledConnection(self, cnx)
+    
+    def _drop(self, in_use: bool):
+        """Forget a lost connection (lock held) and let the next waiter open a new one"""
+        self._size -= 1
+        if in_use:
+            self._in_use -= 1
+        if self._waiters and self._size < self.pool_size and not self._closed:
+            waiter = self._waiters.popleft()
+            waiter.may_create = True
+            self._size += 1
+            waiter.event.set()
+    
+    def _open(self):
+        """Create a connection for a reserved slot, giving the slot back on failure"""
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._drop(in_use=True)
+            raise
+    
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Check out a connection, waiting in line while the pool is exhausted
+        
+        Args:
+            timeout: Seconds to wait before giving up (defaults to the pool timeout)
+        
+        Returns:
+            A PooledConnection; close() it to return it to the pool
+        
+        Raises:
+            PoolError: If no connection became available within the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        pooled = None
+        fresh = False
+        
+        with self._lock:
+            if self._closed:
+                raise PoolError(f"Pool '{self.pool_name}' is closed")
+            
+            if self._idle and not self._waiters:
+                pooled = self._checked_out(self._idle.pop(), 0.0)
+            elif self._size < self.pool_size:
+                # Replace a connection that was lost earlier
+                self._size += 1
+                pooled = self._checked_out(None, 0.0)
+                fresh = True
+            else:
+                self._metrics['exhausted_events'] += 1
+                self._recent_waits.append(start)
+                if (self.auto_size and self._size < self.max_size
+                        and self._contended(start)):
+                    self._size += 1
+                    self._metrics['grown'] += 1
+                    pooled = self._checked_out(None, 0.0)
+                    fresh = True
+                else:
+                    waiter = _Waiter()
+                    self._waiters.append(waiter)
+        
+        if pooled is None:
+            waiter.event.wait(timeout)
+            with self._lock:
+                if waiter.cnx is None and not waiter.may_create:
+                    if self._closed:
+                        raise PoolError(f"Pool '{self.pool_name}' is closed")
+                    self._waiters.remove(waiter)
+                    self._metrics['timeouts'] += 1
+                    raise PoolError(
+                        f"Timed out after {timeout:.1f}s waiting for a connection "
+                        f"from pool '{self.pool_name}'")
+                pooled = self._checked_out(waiter.cnx, time.perf_counter() - start)
+                fresh = waiter.may_create
+        
+        if fresh:
+            pooled._cnx = self._open()
+        elif not pooled._cnx.is_connected():
+            # The server dropped the connection while it sat idle
+            pooled._cnx.reconnect()
+        return pooled
+    
+    def _release(self, cnx, held: float):
+        """Return a connection, handing it straight to the longest waiter"""
+        try:
+            if self.reset_session:
+                cnx.reset_session()
+            elif cnx.in_transaction:
+                cnx.rollback()
+        except Error:
+            with self._lock:
+                self._drop(in_use=True)
+            return
+        
+        with self._lock:
+            self._in_use -= 1
+            metrics = self._metrics
+            metrics['hold_time_total'] += held
+            metrics['hold_time_max'] = max(metrics['hold_time_max'], held)
+            
+            if self._closed:
+                self._size -= 1
+                cnx.close()
+            elif self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.cnx = cnx
+                waiter.event.set()
+            elif self._size > self.pool_size and not self._contended(time.perf_counter()):
+                # Contention has passed: shrink back toward the base size
+                self._size -= 1
+                metrics['shrunk'] += 1
+                cnx.close()
+            else:
+                self._idle.append(cnx)
+    
+    def stats(self) -> Dict:
+        """
+        Snapshot of pool usage
+        
+        Returns:
+            Dictionary with sizes, in-use and waiting counts, high-water mark,
+            exhaustion/timeout counts and checkout wait / hold times in ms
+        """
+        with self._lock:
+            metrics = self._metrics
+            checkouts = metrics['checkouts'] or 1
+            return {
+                'pool_name': self.pool_name,
+                'size': self._size,
+                'base_size': self.pool_size,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': len(self._waiters),
+                'high_water': metrics['high_water'],
+                'checkouts': metrics['checkouts'],
+                'exhausted_events': metrics['exhausted_events'],
+                'timeouts': metrics['timeouts'],
+                'grown': metrics['grown'],
+                'shrunk': metrics['shrunk'],
+                'avg_wait_ms': metrics['wait_time_total'] / checkouts * 1000,
+                'max_wait_ms': metrics['wait_time_max'] * 1000,
+                'avg_hold_ms': metrics['hold_time_total'] / checkouts * 1000,
+                'max_hold_ms': metrics['hold_time_max'] * 1000,
+            }
+    
+    def close(self):
+        """Close idle connections now and in-use ones as they are returned"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._size -= 1
+            for waiter in self._waiters:
+                waiter.event.set()
+            self._waiters.clear()
+
 class DatabaseConfig:
     """Database configuration and connection management"""
     
+    # Storage backend: 'mysql' (default) or 'sqlite' for the embedded engine.
+    # Switching backends needs no model changes.
+    BACKEND = os.getenv("DB_BACKEND", "mysql")
+    
+    # SQLite database file (":memory:" for a throwaway in-memory database)
+    SQLITE_PATH = os.getenv("SQLITE_PATH", "budget_tracker.db")
+    
+    # Memory-mapped file of archived transactions (see history_archive.py),
+    # merged into reports that ask for archived history
+    HISTORY_ARCHIVE_PATH = os.getenv("HISTORY_ARCHIVE_PATH", os.path.join("archives", "history.btxh"))
+    
     # Database connection parameters
     DB_CONFIG = {
         'host': 'localhost',
@@ -24,27 +314,110 @@ class DatabaseConfig:
         'port': 3306
     }
     
+    # Default number of rows sent per batch by execute_many
+    BATCH_SIZE = 1000
+    
+    # Default number of rows pulled per fetchmany by stream_query
+    STREAM_BATCH_SIZE = 500
+    
+    # Server-side prepared statements for queries run with prepared=True.
+    # Prepared statements live in the MySQL session, so pooled sessions are
+    # not reset on checkin while this is enabled.
+    USE_PREPARED_STATEMENTS = True
+    
+    # Maximum prepared statements kept open per pooled connection
+    PREPARED_CACHE_SIZE = 32
+    
+    # Return rows as compact tuple-backed records (see records.py) instead of
+    # dictionaries; individual calls can override it with compact=True/False
+    COMPACT_ROWS = False
+    
+    # Answer whole-month spending summaries from the monthly_spending rollup
+    # (migration 002) instead of re-aggregating transactions
+    USE_SPENDING_ROLLUP = True
+    
+    # Read-through cache of SELECT results (see query_cache.py). Writes made
+    # through execute_query / execute_many invalidate the tables they touch;
+    # QUERY_CACHE_TTL (seconds) bounds staleness from writes made elsewhere.
+    # Off unless QUERY_CACHE_ENABLED=1 (or true/yes) is set in the environment.
+    QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "").lower() in (
+        "1", "true", "yes")
+    QUERY_CACHE_MAX_ENTRIES = 1024
+    QUERY_CACHE_MAX_BYTES = 32 * 2**20
+    QUERY_CACHE_TTL = 60.0
+    
+    # Apply pending migrations/ when the pool opens on a backend that manages
+    # its own schema (the embedded SQLite backend); MySQL databases are
+    # migrated with "python manage.py migrate"
+    AUTO_MIGRATE = True
+    
+    # Query instrumentation (see query_stats.py): statements at or above
+    # SLOW_QUERY_MS go to the slow-query log, optionally with their EXPLAIN
+    QUERY_STATS_ENABLED = True
+    SLOW_QUERY_MS = 200.0
+    EXPLAIN_SLOW_QUERIES = False
+    
+    # Connection pool sizing and back-pressure
+    POOL_SIZE = 5
+    POOL_TIMEOUT = 10.0  # seconds a caller waits for a free connection
+    POOL_AUTO_SIZE = False  # grow under sustained contention
+    POOL_MAX_SIZE = 20  # cap for auto-sizing
+    
     # Connection pool
-    _connection_pool: Optional[pooling.MySQLConnectionPool] = None
+    _connection_pool: Optional[ConnectionPool] = None
+    _backend: Optional[Backend] = None
     
     @classmethod
-    def initialize_pool(cls, pool_name: str = "budget_pool", pool_size: int = 5):
-        """Initialize connection pool"""
+    def backend(cls) -> Backend:
+        """Return the active storage backend, creating it from BACKEND on first use"""
+        if cls._backend is None or cls._backend.name != cls.BACKEND:
+            cls._backend = get_backend(cls.BACKEND).from_config(cls)
+        return cls._backend
+    
+    @classmethod
+    def use_prepared_statements(cls) -> bool:
+        """Whether prepared=True queries go through the prepared statement cache"""
+        return cls.USE_PREPARED_STATEMENTS and cls.backend().supports_prepared
+    
+    @classmethod
+    def initialize_pool(cls, pool_name: str = "budget_pool", pool_size: Optional[int] = None,
+                        timeout: Optional[float] = None, auto_size: Optional[bool] = None,
+                        max_pool_size: Optional[int] = None):
+        """
+        Initialize connection pool
+        
+        Args:
+            pool_name: Name reported in pool statistics
+            pool_size: Base number of connections (defaults to POOL_SIZE)
+            timeout: Seconds to wait for a connection (defaults to POOL_TIMEOUT)
+            auto_size: Grow under contention (defaults to POOL_AUTO_SIZE)
+            max_pool_size: Upper bound when auto-sizing (defaults to POOL_MAX_SIZE)
+        """
         try:
-            cls._connection_pool = pooling.MySQLConnectionPool(
+            backend = cls.backend()
+            backend.bootstrap()
+            cls._connection_pool = ConnectionPool(
+                backend.connect,
                 pool_name=pool_name,
-                pool_size=pool_size,
-                pool_reset_session=True,
-                **cls.DB_CONFIG
+                pool_size=pool_size or cls.POOL_SIZE,
+                max_size=max_pool_size or cls.POOL_MAX_SIZE,
+                timeout=cls.POOL_TIMEOUT if timeout is None else timeout,
+                reset_session=not cls.use_prepared_statements(),
+                auto_size=cls.POOL_AUTO_SIZE if auto_size is None else auto_size
             )
+            query_cache.configure(cls.QUERY_CACHE_MAX_ENTRIES, cls.QUERY_CACHE_MAX_BYTES,
+                                  cls.QUERY_CACHE_TTL)
             print("Connection pool initialized successfully")
+            if cls.AUTO_MIGRATE and backend.manages_schema:
+                from migrations import migrate
+                migrate(verbose=False)
         except Error as e:
             print(f"Error initializing connection pool: {e}")
             raise
     
     @classmethod
     def get_connection(cls):
-        """Get a connection from the pool"""
+        """Get a connection from the pool, waiting up to POOL_TIMEOUT if exhausted"""
         if cls._connection_pool is None:
             cls.initialize_pool()
         
@@ -54,56 +427,417 @@ class DatabaseConfig:
             print(f"Error getting connection from pool: {e}")
             raise
     
+    @classmethod
+    def get_pool_stats(cls) -> Optional[Dict]:
+        """Return a snapshot of pool metrics, or None if the pool is not initialized"""
+        if cls._connection_pool is None:
+            return None
+        return cls._connection_pool.stats()
+    
     @classmethod
     def close_pool(cls):
         """Close all connections in the pool"""
         if cls._connection_pool:
-            # Connection pools don't have a direct close method
-            # Connections are returned to the pool automatically
+            cls._connection_pool.close()
             cls._connection_pool = None
             print("Connection pool closed")
+    
+    @classmethod
+    @contextmanager
+    def session(cls):
+        """
+        Pin one pooled connection to the current thread or task
+        
+        Every execute_query / execute_many / stream_query call made inside the
+        block (including through the models) reuses this connection and skips
+        its own commit. The work is committed once when the block exits, or
+        rolled back if it raises. Nested sessions join the outer one.
+        
+        Yields:
+            The pinned connection
+        """
+        connection = _session_connection()
+        if connection is not None:
+            yield connection
+            return
+        
+        connection = cls.get_connection()
+        callbacks = []
+        token = _session_state.set((_current_owner(), connection, callbacks))
+        try:
+            yield connection
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            _session_state.reset(token)
+            connection.close()
+        
+        # Committed: the work is durable, so a failing callback is only reported
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in after-commit callback: {e}")
+    
+    @classmethod
+    def on_commit(cls, callback: Callable[[], None]):
+        """
+        Run callback once the enclosing session commits
+        
+        Callbacks run in registration order after the connection is back in
+        the pool, and are discarded if the session rolls back. Outside a
+        session the callback runs immediately.
+        
+        Args:
+            callback: Function taking no arguments
+        """
+        state = _session_state.get()
+        if state is not None and state[0] == _current_owner():
+            state[2].append(callback)
+        else:
+            callback()
+    
+    @classmethod
+    def transaction(cls):
+        """Alias of session() for call sites that read better as a transaction"""
+        return cls.session()
+
+class PreparedStatementCache:
+    """LRU cache of server-side prepared cursors for one connection, keyed by SQL text"""
+    
+    # MySQL error for a statement handle the server no longer knows about
+    ER_UNKNOWN_STMT_HANDLER = 1243
+    
+    def __init__(self, connection, max_size: int):
+        self._connection = connection
+        self._cursors: OrderedDict = OrderedDict()
+        self.max_size = max_size
+    
+    def get(self, query: str):
+        """Return the prepared cursor for query, preparing it on first use"""
+        cursor = self._cursors.get(query)
+        if cursor is not None:
+            self._cursors.move_to_end(query)
+            return cursor
+        
+        cursor = self._connection.cursor(prepared=True)
+        self._cursors[query] = cursor
+        while len(self._cursors) > self.max_size:
+            _, evicted = self._cursors.popitem(last=False)
+            # Closing the cursor deallocates the statement on the server
+            evicted.close()
+        return cursor
+    
+    def discard(self, query: str):
+        """Drop the cursor for query, e.g. after its statement handle went stale"""
+        cursor = self._cursors.pop(query, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Error:
+                pass
+    
+    def __len__(self):
+        return len(self._cursors)
+
+# Statement caches keyed by the physical connection, which outlives the
+# pooled wrapper handed out on each checkout
+_statement_caches = weakref.WeakKeyDictionary()
+_statement_caches_lock = threading.Lock()
+
+def _statement_cache(connection) -> PreparedStatementCache:
+    """Return the prepared statement cache of a (pooled) connection"""
+    raw = getattr(connection, '_cnx', connection)
+    with _statement_caches_lock:
+        cache = _statement_caches.get(raw)
+        if cache is None:
+            cache = PreparedStatementCache(raw, DatabaseConfig.PREPARED_CACHE_SIZE)
+            _statement_caches[raw] = cache
+        return cache
+
+def _execute_prepared(connection, query: str, params: tuple, fetch: bool,
+                      compact: bool = False):
+    """
+    Run query through the connection's prepared statement cache
+    
+    Returns:
+        (result, rowcount) where result is the rows if fetch=True, else lastrowid
+    """
+    cache = _statement_cache(connection)
+    for attempt in range(2):
+        cursor = cache.get(query)
+        try:
+            cursor.execute(query, params or ())
+            if fetch:
+                columns = cursor.column_names
+                if compact:
+                    rows = as_records(columns, cursor.fetchall())
+                else:
+                    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                return rows, len(rows)
+            return cursor.lastrowid, cursor.rowcount
+        except Error as e:
+            cache.discard(query)
+            # The server forgot the statement (e.g. after a reconnect): prepare again
+            stale = getattr(e, 'errno', None) == PreparedStatementCache.ER_UNKNOWN_STMT_HANDLER
+            if attempt == 0 and stale:
+                continue
+            raise
+
+def _explain(connection, query: str, params: tuple) -> Optional[List[Dict]]:
+    """Capture the EXPLAIN plan of a SELECT, or None if it cannot be explained"""
+    if query.split(None, 1)[0].upper() not in ("SELECT", "WITH"):
+        return None
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(DatabaseConfig.backend().explain_prefix + query, params or ())
+        return cursor.fetchall()
+    except Error:
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+
+def _record_query(connection, query: str, params: tuple, started: float, rows: int):
+    """Feed one execution into query_stats, explaining it if it was slow"""
+    if not DatabaseConfig.QUERY_STATS_ENABLED:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    plan = None
+    if DatabaseConfig.EXPLAIN_SLOW_QUERIES and elapsed_ms >= DatabaseConfig.SLOW_QUERY_MS:
+        plan = _explain(connection, query, params)
+    query_stats.record(query, elapsed_ms, rows, find_caller(),
+                       DatabaseConfig.SLOW_QUERY_MS, plan)
+
+def _invalidate(query: str):
+    """
+    Invalidate cached results that read the tables a write statement touches
+    
+    Inside a session the tables are invalidated again after the commit, so
+    results cached from the pre-commit state in the meantime are dropped too.
+    """
+    if not DatabaseConfig.QUERY_CACHE_ENABLED:
+        return
+    tables = tables_written(query)
+    if not tables:
+        # Unrecognized statement (DDL, ANALYZE, ...): assume it touches anything
+        query_cache.clear()
+        return
+    query_cache.bump(tables)
+    if _session_connection() is not None:
+        DatabaseConfig.on_commit(lambda: query_cache.bump(tables))
 
 def get_db_connection():
     """Helper function to get a database connection"""
     return DatabaseConfig.get_connection()
 
-def execute_query(query: str, params: tuple = None, fetch: bool = False):
+@contextmanager
+def _checkout():
+    """
+    Yield (connection, owned) for a single statement helper
+    
+    Inside a session the pinned connection is returned with owned=False,
+    meaning the caller must neither commit, roll back nor close it.
+    """
+    connection = _session_connection()
+    if connection is not None:
+        yield connection, False
+        return
+    
+    connection = get_db_connection()
+    try:
+        yield connection, True
+    finally:
+        connection.close()
+
+def execute_query(query: str, params: tuple = None, fetch: bool = False,
+                  prepared: bool = False, compact: Optional[bool] = None,
+                  cache: Optional[bool] = None):
     """
     Execute a SQL query with optional parameters
     
+    Inside DatabaseConfig.session() the session's connection is used and the
+    commit is deferred to the end of the session.
+    
     Args:
         query: SQL query string
         params: Query parameters as tuple
         fetch: If True, fetch and return results
+        prepared: If True, run as a cached server-side prepared statement
+                  (when enabled and supported by the backend)
+        compact: Return tuple-backed records instead of dictionaries
+                 (defaults to DatabaseConfig.COMPACT_ROWS)
+        cache: Serve and store fetch results through the query cache
+               (defaults to DatabaseConfig.QUERY_CACHE_ENABLED); reads inside a
+               session always go to the database
     
     Returns:
         Query results if fetch=True, otherwise None
     """
-    connection = None
+    compact = DatabaseConfig.COMPACT_ROWS if compact is None else compact
+    cache = DatabaseConfig.QUERY_CACHE_ENABLED if cache is None else cache
+    if fetch and cache and _session_connection() is None:
+        cache_key = (query, tuple(params) if params else (), compact)
+        hit, result = query_cache.get(cache_key)
+        if hit:
+            return result
+        tables = tables_read(query)
+        snapshot = query_cache.snapshot(tables)
+        result = execute_query(query, params, fetch, prepared, compact, cache=False)
+        query_cache.put(cache_key, result, tables, snapshot)
+        return result
+    
     cursor = None
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+    with _checkout() as (connection, owned):
+        try:
+            started = time.perf_counter()
+            if prepared and DatabaseConfig.use_prepared_statements():
+                result, rowcount = _execute_prepared(connection, query, params, fetch,
+                                                     compact)
+                _record_query(connection, query, params, started, rowcount)
+                if not fetch:
+                    if owned:
+                        connection.commit()
+                    _invalidate(query)
+                return result
+            
+            cursor = connection.cursor(dictionary=not compact)
+            
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            if fetch:
+                result = cursor.fetchall()
+                if compact:
+                    result = as_records(cursor.column_names, result)
+                _record_query(connection, query, params, started, len(result))
+                return result
+            else:
+                _record_query(connection, query, params, started, cursor.rowcount)
+                if owned:
+                    connection.commit()
+                _invalidate(query)
+                return cursor.lastrowid
+                
+        except Error as e:
+            if owned:
+                connection.rollback()
+            print(f"Database error: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+def stream_query(query: str, params: tuple = None, batch_size: Optional[int] = None,
+                 compact: Optional[bool] = None) -> Iterator[Dict]:
+    """
+    Execute a SELECT and yield rows one at a time without buffering the result
+    
+    Uses an unbuffered cursor and fetchmany so only one batch of rows is held
+    in memory. The pooled connection stays checked out until the generator is
+    exhausted or closed; use it in a for loop or close() it when stopping early.
+    Inside a session the session's connection is used, so finish iterating
+    before running other statements in the same session.
+    
+    Args:
+        query: SQL query string
+        params: Query parameters as tuple
+        batch_size: Rows per fetchmany (defaults to DatabaseConfig.STREAM_BATCH_SIZE)
+        compact: Yield tuple-backed records instead of dictionaries
+                 (defaults to DatabaseConfig.COMPACT_ROWS)
+    
+    Yields:
+        Each result row as a dictionary (or record)
+    """
+    batch_size = batch_size or DatabaseConfig.STREAM_BATCH_SIZE
+    compact = DatabaseConfig.COMPACT_ROWS if compact is None else compact
+    cursor = None
+    rows_seen = 0
+    with _checkout() as (connection, owned):
+        try:
+            started = time.perf_counter()
+            cursor = connection.cursor(dictionary=not compact, buffered=False)
+            
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if compact:
+                    rows = as_records(cursor.column_names, rows)
+                rows_seen += len(rows)
+                yield from rows
         
-        if fetch:
-            result = cursor.fetchall()
-            return result
-        else:
-            connection.commit()
-            return cursor.lastrowid
+        except Error as e:
+            print(f"Database error: {e}")
+            raise
+        finally:
+            # Drain rows left behind when the caller stops early, otherwise
+            # closing the unbuffered cursor raises "Unread result found"
+            connection.consume_results()
+            if cursor:
+                cursor.close()
+            # Latency of a stream includes the time the consumer spent per row
+            _record_query(connection, query, params, started, rows_seen)
+
+def _chunked(rows: Iterable[tuple], size: int):
+    """Yield successive lists of at most size rows from any iterable"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def execute_many(query: str, params_seq: Iterable[tuple],
+                 chunk_size: Optional[int] = None) -> List[int]:
+    """
+    Execute a parameterized INSERT for many rows in batches
+    
+    Rows are sent in chunks (a single multi-row INSERT on MySQL) and each
+    chunk is committed once. Chunks committed before a failing chunk are kept.
+    Inside a session nothing is committed until the session ends.
+    
+    Args:
+        query: INSERT ... VALUES (%s, ...) query string
+        params_seq: Iterable of parameter tuples, one per row
+        chunk_size: Rows per batch (defaults to DatabaseConfig.BATCH_SIZE)
+    
+    Returns:
+        List of generated IDs in the same order as params_seq
+    """
+    chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+    ids = []
+    cursor = None
+    with _checkout() as (connection, owned):
+        try:
+            cursor = connection.cursor()
             
-    except Error as e:
-        if connection:
-            connection.rollback()
-        print(f"Database error: {e}")
-        raise
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
+            backend = DatabaseConfig.backend()
+            for chunk in _chunked(params_seq, chunk_size):
+                started = time.perf_counter()
+                ids.extend(backend.insert_many(cursor, query, chunk))
+                _record_query(connection, query, None, started, len(chunk))
+                if owned:
+                    connection.commit()
+                _invalidate(query)
+            
+            return ids
+        
+        except Error as e:
+            if owned:
+                connection.rollback()
+            print(f"Database error: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
@@ -0,0 +1,300 @@
+"""
+Duplicate Detection Module
+Fingerprints transactions by (user_id, amount, transaction_date, normalized
+description) so re-imported statement rows are recognized with one index
+lookup, plus a fuzzy mode that matches near-duplicates posted a few days
+apart by scanning rows sorted by amount and date
+"""
+
+import hashlib
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from conversions import as_date, to_cents
+from db_config import DatabaseConfig, execute_query, stream_query
+
+# Defaults for fuzzy matching: how many days apart two postings of the same
+# purchase may be, and the share of description words they must have in common
+DEFAULT_WINDOW_DAYS = 3
+DEFAULT_SIMILARITY = 0.5
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_description(description: Optional[str]) -> str:
+    """Case-folded description with punctuation and repeated spaces collapsed"""
+    return _NON_WORD.sub(" ", (description or "").casefold()).strip()
+
+
+def fingerprint(user_id: int, amount, transaction_date, description: Optional[str]) -> str:
+    """
+    Fingerprint of a transaction as stored in transactions.fingerprint
+
+    Args:
+        user_id: Owner of the transaction
+        amount: Amount (Decimal, float or string)
+        transaction_date: Date (date or YYYY-MM-DD)
+        description: Free-text description (normalized before hashing)
+
+    Returns:
+        32 hex characters
+    """
+    key = (f"{user_id}|{to_cents(amount)}|{as_date(transaction_date).isoformat()}|"
+           f"{normalize_description(description)}")
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def similarity(first: Optional[str], second: Optional[str]) -> float:
+    """Share of distinct words two descriptions have in common (Jaccard, 0..1)"""
+    first_words = set(normalize_description(first).split())
+    second_words = set(normalize_description(second).split())
+    if not first_words and not second_words:
+        return 1.0
+    return len(first_words & second_words) / len(first_words | second_words)
+
+
+def refresh_fingerprints(only_missing: bool = True, chunk_size: Optional[int] = None) -> int:
+    """
+    Compute transactions.fingerprint for existing rows
+
+    Rows are read and updated in chunks by transaction ID, one CASE UPDATE
+    per chunk.
+
+    Args:
+        only_missing: Skip rows that already have a fingerprint
+        chunk_size: Rows per chunk (defaults to DatabaseConfig.BATCH_SIZE)
+
+    Returns:
+        Number of rows updated
+    """
+    chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+    query = f"""
+        SELECT transaction_id, user_id, amount, transaction_date, description
+        FROM transactions
+        WHERE transaction_id > %s {'AND fingerprint IS NULL' if only_missing else ''}
+        ORDER BY transaction_id
+        LIMIT %s
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = execute_query(query, (last_id, chunk_size), fetch=True, compact=True, cache=False)
+        if not rows:
+            return updated
+        pairs = [(row[0], fingerprint(row[1], row[2], row[3], row[4])) for row in rows]
+        cases = " ".join(["WHEN %s THEN %s"] * len(pairs))
+        placeholders = ", ".join(["%s"] * len(pairs))
+        execute_query(f"""
+            UPDATE transactions
+            SET fingerprint = CASE transaction_id {cases} END
+            WHERE transaction_id IN ({placeholders})
+        """, tuple(value for pair in pairs for value in pair) + tuple(pair[0] for pair in pairs))
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+
+def existing_counts(fingerprints: Iterable[str], up_to_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Number of stored transactions per fingerprint (one indexed lookup each)
+
+    Args:
+        fingerprints: Fingerprints to look up
+        up_to_id: Only count transactions with an ID at or below this one
+
+    Returns:
+        Counts of the fingerprints that exist; absent ones are left out
+    """
+    fingerprints = sorted(set(fingerprints))
+    if not fingerprints:
+        return {}
+    query = f"""
+        SELECT fingerprint, COUNT(*) AS count
+        FROM transactions
+        WHERE fingerprint IN ({', '.join(['%s'] * len(fingerprints))})
+        {'AND transaction_id <= %s' if up_to_id is not None else ''}
+        GROUP BY fingerprint
+    """
+    params = tuple(fingerprints) + ((up_to_id,) if up_to_id is not None else ())
+    rows = execute_query(query, params, fetch=True, compact=True, cache=False)
+    return {row[0]: row[1] for row in rows}
+
+
+class DuplicateFilter:
+    """
+    Drops incoming rows that repeat transactions stored before the filter
+    was created, for one import
+
+    Only transactions that existed when the filter was created count, so
+    rows inserted by the same import are never matched against each
+    other. Each stored transaction absorbs at most one incoming row, so a
+    statement that really has two identical purchases keeps the second
+    one unless the database also has two.
+
+    In 'exact' mode rows match on fingerprint. In 'fuzzy' mode they match
+    on user and amount, a date at most window_days apart and descriptions
+    with at least the given word similarity.
+    """
+
+    def __init__(self, mode: str = "exact", window_days: int = DEFAULT_WINDOW_DAYS,
+                 min_similarity: float = DEFAULT_SIMILARITY):
+        if mode not in ("exact", "fuzzy"):
+            raise ValueError(f"Unknown duplicate mode {mode!r}; use 'exact' or 'fuzzy'")
+        self.mode = mode
+        self.window = timedelta(days=window_days)
+        self.min_similarity = min_similarity
+        rows = execute_query("SELECT MAX(transaction_id) AS max_id FROM transactions",
+                             fetch=True, cache=False)
+        self.up_to_id = (rows[0]['max_id'] if rows else None) or 0
+        # Stored matches already used: counts per fingerprint, or transaction IDs
+        self._used_counts: Dict[str, int] = defaultdict(int)
+        self._used_ids = set()
+
+    def filter(self, rows: Sequence[tuple]) -> Tuple[List[tuple], List[int]]:
+        """
+        Split rows into new ones and duplicates
+
+        Args:
+            rows: (user_id, category_id, amount, transaction_date, description,
+                  payment_method) tuples
+
+        Returns:
+            (rows to insert, positions in rows of the duplicates)
+        """
+        if not rows or not self.up_to_id:
+            return list(rows), []
+        if self.mode == "exact":
+            duplicates = self._exact(rows)
+        else:
+            duplicates = self._fuzzy(rows)
+        skipped = set(duplicates)
+        return [row for position, row in enumerate(rows) if position not in skipped], duplicates
+
+    def _exact(self, rows: Sequence[tuple]) -> List[int]:
+        prints = [fingerprint(row[0], row[2], row[3], row[4]) for row in rows]
+        stored = existing_counts(prints, self.up_to_id)
+        duplicates = []
+        for position, print_ in enumerate(prints):
+            if self._used_counts[print_] < stored.get(print_, 0):
+                self._used_counts[print_] += 1
+                duplicates.append(position)
+        return duplicates
+
+    def _fuzzy(self, rows: Sequence[tuple]) -> List[int]:
+        duplicates = []
+        by_user = defaultdict(list)
+        for position, row in enumerate(rows):
+            by_user[row[0]].append(position)
+        for user_id, positions in by_user.items():
+            days = [as_date(rows[position][3]) for position in positions]
+            candidates = execute_query("""
+                SELECT transaction_id, amount, transaction_date, description
+                FROM transactions
+                WHERE user_id = %s AND transaction_date BETWEEN %s AND %s
+                    AND transaction_id <= %s
+            """, (user_id, min(days) - self.window, max(days) + self.window, self.up_to_id),
+                fetch=True, compact=True, cache=False)
+            # Stored rows by amount, sorted by date, so each incoming row only
+            # scans the stored rows of its amount inside its date window
+            by_amount = defaultdict(list)
+            for candidate in candidates:
+                if candidate[0] not in self._used_ids:
+                    by_amount[to_cents(candidate[1])].append(
+                        (as_date(candidate[2]), candidate[0], candidate[3]))
+            for window in by_amount.values():
+                window.sort()
+            for position, day in zip(positions, days):
+                row = rows[position]
+                window = by_amount.get(to_cents(row[2]))
+                if not window:
+                    continue
+                first = bisect_left(window, (day - self.window,))
+                last = bisect_right(window, (day + self.window, float("inf")))
+                best = None
+                for index in range(first, last):
+                    stored_day, transaction_id, description = window[index]
+                    if transaction_id in self._used_ids:
+                        continue
+                    if similarity(row[4], description) >= self.min_similarity:
+                        distance = abs((stored_day - day).days)
+                        if best is None or distance < best[0]:
+                            best = (distance, transaction_id)
+                if best is not None:
+                    self._used_ids.add(best[1])
+                    duplicates.append(position)
+        return sorted(duplicates)
+
+
+def find_duplicates(fuzzy: bool = False, window_days: int = DEFAULT_WINDOW_DAYS,
+                    min_similarity: float = DEFAULT_SIMILARITY) -> List[List[int]]:
+    """
+    Find groups of duplicate transactions across the whole table
+
+    Exact mode groups rows by fingerprint in the database. Fuzzy mode
+    streams the table sorted by user, amount and date and compares each row
+    only with the rows of the same user and amount in the preceding
+    window_days (a sorted-neighbourhood scan rather than all pairs);
+    matches are merged transitively into groups.
+
+    Args:
+        fuzzy: Also match near-duplicates (see DuplicateFilter)
+        window_days: Days between postings of the same purchase (fuzzy mode)
+        min_similarity: Description word similarity required (fuzzy mode)
+
+    Returns:
+        Groups of transaction IDs, each sorted, oldest group first
+    """
+    if not fuzzy:
+        rows = stream_query("""
+            SELECT t.fingerprint, t.transaction_id
+            FROM transactions t
+            JOIN (
+                SELECT fingerprint
+                FROM transactions
+                WHERE fingerprint IS NOT NULL
+                GROUP BY fingerprint
+                HAVING COUNT(*) > 1
+            ) d ON d.fingerprint = t.fingerprint
+            ORDER BY t.fingerprint, t.transaction_id
+        """, compact=True)
+        groups = defaultdict(list)
+        for row in rows:
+            groups[row[0]].append(row[1])
+        return sorted(groups.values())
+
+    window = timedelta(days=window_days)
+    parent = {}
+
+    def root(transaction_id):
+        while parent[transaction_id] != transaction_id:
+            parent[transaction_id] = parent[parent[transaction_id]]
+            transaction_id = parent[transaction_id]
+        return transaction_id
+
+    recent = deque()
+    key = None
+    rows = stream_query("""
+        SELECT transaction_id, user_id, amount, transaction_date, description
+        FROM transactions
+        ORDER BY user_id, amount, transaction_date, transaction_id
+    """, compact=True)
+    for transaction_id, user_id, amount, transaction_date, description in rows:
+        day = as_date(transaction_date)
+        if (user_id, amount) != key:
+            key = (user_id, amount)
+            recent.clear()
+        while recent and day - recent[0][0] > window:
+            recent.popleft()
+        for _, other_id, other_description in recent:
+            if similarity(description, other_description) >= min_similarity:
+                parent.setdefault(transaction_id, transaction_id)
+                parent.setdefault(other_id, other_id)
+                parent[root(transaction_id)] = root(other_id)
+        recent.append((day, transaction_id, description))
+
+    groups = defaultdict(list)
+    for transaction_id in parent:
+        groups[root(transaction_id)].append(transaction_id)
+    return sorted(sorted(group) for group in groups.values())
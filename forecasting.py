@@ -0,0 +1,190 @@
+"""
+Forecasting Module
+Projects end-of-period spending for budget rules from each user's recent
+daily spending, vectorized with NumPy across all rules at once
+
+Requires NumPy (optional dependency: pip install numpy).
+"""
+
+import time
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from conversions import EPOCH_ORDINAL, as_date, from_cents, to_cents
+from db_config import execute_query
+
+# Days of history behind the daily spending rate, and the age in days at
+# which a day's spending counts half as much as today's
+DEFAULT_WINDOW = 90
+DEFAULT_HALF_LIFE = 21.0
+
+_RULES_QUERY = """
+    SELECT br.rule_id, br.budget_id, br.category_id, br.limit_amount,
+           br.alert_threshold, br.spent_amount,
+           b.user_id, b.budget_name, b.start_date, b.end_date,
+           c.category_name
+    FROM budget_rules br
+    JOIN budgets b ON br.budget_id = b.budget_id
+    JOIN categories c ON br.category_id = c.category_id
+    WHERE b.is_active = TRUE {budget_filter}
+    ORDER BY br.budget_id, c.category_name
+"""
+
+# Daily spending per (user, category) over the history window, served by
+# the (transaction_date, created_at) index
+_HISTORY_QUERY = """
+    SELECT user_id, category_id, transaction_date, SUM(amount) AS amount
+    FROM transactions
+    WHERE transaction_date BETWEEN %s AND %s {user_filter}
+    GROUP BY user_id, category_id, transaction_date
+"""
+
+
+_KEY_BASE = 1 << 32
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("forecasting requires NumPy; install it with 'pip install numpy'")
+
+
+def daily_rates(pairs: Sequence[tuple], as_of: date, window: int = DEFAULT_WINDOW,
+                half_life: float = DEFAULT_HALF_LIFE,
+                users: Optional[Sequence[int]] = None) -> "np.ndarray":
+    """
+    Exponentially weighted daily spending of (user_id, category_id) pairs
+
+    The spending of each of the window days up to and including as_of is
+    weighted by 0.5 ** (age / half_life); days without spending count as
+    zero, so a pair that stopped spending decays towards zero.
+
+    Args:
+        pairs: (user_id, category_id) pairs
+        as_of: Last day of history
+        window: Days of history
+        half_life: Age in days at which a day's weight halves
+        users: Restrict the history query to these users (optional)
+
+    Returns:
+        float64 array of cents per day, one per pair
+    """
+    _require_numpy()
+    first_day = as_of.toordinal() - window + 1
+
+    query = _HISTORY_QUERY.format(user_filter="")
+    params = (date.fromordinal(first_day), as_of)
+    if users is not None:
+        query = _HISTORY_QUERY.format(
+            user_filter=f"AND user_id IN ({', '.join(['%s'] * len(users))})")
+        params += tuple(users)
+    rows = execute_query(query, params, fetch=True, compact=True, cache=False)
+
+    history = np.zeros((len(pairs), window), dtype=np.int64)
+    if rows and pairs:
+        # Match rows to pairs by a combined integer key with a binary search
+        pair_keys = np.array([user_id * _KEY_BASE + category_id for user_id, category_id in pairs],
+                             dtype=np.int64)
+        order = np.argsort(pair_keys)
+        sorted_keys = pair_keys[order]
+        user_ids, category_ids, days, amounts = zip(*rows)
+        keys = np.array(user_ids, dtype=np.int64) * _KEY_BASE + np.array(category_ids, dtype=np.int64)
+        found = np.minimum(np.searchsorted(sorted_keys, keys), len(pairs) - 1)
+        matched = sorted_keys[found] == keys
+        offsets = (np.array(days, dtype='datetime64[D]').astype(np.int64)
+                   - (first_day - EPOCH_ORDINAL))
+        # Daily sums of DECIMAL(10, 2) amounts are exact in float64 cents once rounded
+        cents = np.rint(np.array(amounts, dtype=np.float64) * 100).astype(np.int64)
+        np.add.at(history, (order[found[matched]], offsets[matched]), cents[matched])
+
+    ages = np.arange(window - 1, -1, -1, dtype=np.float64)
+    weights = 0.5 ** (ages / half_life)
+    return history @ weights / weights.sum()
+
+
+def project_rules(budget_ids: Optional[Sequence[int]] = None, as_of=None,
+                  window: int = DEFAULT_WINDOW, half_life: float = DEFAULT_HALF_LIFE) -> List[Dict]:
+    """
+    Project end-of-period spending for every rule of the active budgets
+
+    projected_spend = spent so far + daily rate x days left in the period,
+    where the rate is the user's exponentially weighted daily spending in
+    the rule's category (see daily_rates). Periods that have not started
+    project the whole period at that rate; finished periods project what
+    was spent. Spent so far is the rule's spent_amount counter.
+
+    Args:
+        budget_ids: Only these budgets (defaults to every active budget)
+        as_of: Date of the projection (defaults to today)
+        window: Days of history behind the daily rate
+        half_life: Age in days at which a day's weight halves
+
+    Returns:
+        List of rules with budget_name, category_name, limit_amount, spent,
+        days_total, days_elapsed, daily_rate, projected_spend,
+        projected_percent, projected_overspend and will_exceed, ordered by
+        budget and category name
+    """
+    _require_numpy()
+    as_of = as_date(as_of) if as_of is not None else date.today()
+    if budget_ids is not None:
+        budget_ids = sorted(set(budget_ids))
+        if not budget_ids:
+            return []
+        query = _RULES_QUERY.format(
+            budget_filter=f"AND br.budget_id IN ({', '.join(['%s'] * len(budget_ids))})")
+        rules = execute_query(query, tuple(budget_ids), fetch=True, compact=False, cache=False)
+    else:
+        rules = execute_query(_RULES_QUERY.format(budget_filter=""), fetch=True,
+                              compact=False, cache=False)
+    if not rules:
+        return []
+
+    pairs = sorted({(rule['user_id'], rule['category_id']) for rule in rules})
+    users = sorted({user_id for user_id, _ in pairs}) if budget_ids is not None else None
+    rates = daily_rates(pairs, as_of, window, half_life, users)
+    pair_index = {pair: position for position, pair in enumerate(pairs)}
+
+    # One element per rule from here on
+    starts = np.array([as_date(rule['start_date']).toordinal() for rule in rules])
+    ends = np.array([as_date(rule['end_date']).toordinal() for rule in rules])
+    limits = np.array([to_cents(rule['limit_amount']) for rule in rules], dtype=np.int64)
+    spent = np.array([to_cents(rule['spent_amount']) for rule in rules], dtype=np.int64)
+    rate = rates[[pair_index[(rule['user_id'], rule['category_id'])] for rule in rules]]
+
+    days_total = ends - starts + 1
+    days_elapsed = np.clip(as_of.toordinal() - starts + 1, 0, days_total)
+    projected = spent + np.rint(rate * (days_total - days_elapsed)).astype(np.int64)
+    overspend = np.maximum(projected - limits, 0)
+    percent = np.divide(projected * 100.0, limits, out=np.zeros(len(rules)), where=limits > 0)
+
+    for position, rule in enumerate(rules):
+        rule['spent'] = from_cents(spent[position])
+        rule['days_total'] = int(days_total[position])
+        rule['days_elapsed'] = int(days_elapsed[position])
+        rule['daily_rate'] = from_cents(round(rate[position]))
+        rule['projected_spend'] = from_cents(projected[position])
+        rule['projected_percent'] = float(percent[position])
+        rule['projected_overspend'] = from_cents(overspend[position])
+        rule['will_exceed'] = bool(overspend[position] > 0)
+    return rules
+
+
+def score_all(as_of=None, window: int = DEFAULT_WINDOW,
+              half_life: float = DEFAULT_HALF_LIFE) -> Dict:
+    """
+    Batch mode: project every rule of every active budget
+
+    Returns:
+        Dictionary with rules (see project_rules), at_risk (the rules
+        projected to exceed their limit, largest overspend first) and seconds
+    """
+    started = time.perf_counter()
+    rules = project_rules(as_of=as_of, window=window, half_life=half_life)
+    at_risk = sorted((rule for rule in rules if rule['will_exceed']),
+                     key=lambda rule: rule['projected_overspend'], reverse=True)
+    return {'rules': rules, 'at_risk': at_risk, 'seconds': time.perf_counter() - started}
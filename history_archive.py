@@ -0,0 +1,347 @@
+"""
+History Archive Module
+Read-only, memory-mapped file of archived transactions for historical
+reports without loading rows back into the database
+
+Layout (all integers little-endian):
+
+    64-byte preamble: b"BTXH1\\n\\0\\0", then u64 record offset, u64 record
+    count, u32 record size, u32 index stride, u64 index offset, u64 index
+    entries, u64 metadata offset, u64 metadata length
+    records: 32 bytes each, int32 user_id, day, category_id and payment
+    method code (-1 for none), int64 cents and transaction_id, sorted by
+    (user_id, day, transaction_id)
+    sparse index: (user_id, day) of every stride-th record
+    metadata: JSON with payment method names, date range and source files
+
+Amounts are int64 cents and dates are days since 1970-01-01, the encodings
+of the columnar export (exporter.py). Descriptions stay in the compressed
+archives written by archiver.py.
+
+Requires NumPy (optional dependency: pip install numpy).
+"""
+
+import csv
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import exporter
+from conversions import EPOCH_ORDINAL, as_date, from_cents, to_cents
+from db_config import DatabaseConfig
+
+MAGIC = b"BTXH1\n\0\0"
+DEFAULT_STRIDE = 1024
+
+_PREAMBLE = struct.Struct("<8sQQIIQQQQ")
+_EPOCH = date(1970, 1, 1)
+# Keeps (user_id, day) keys ordered when days are negative (before 1970)
+_DAY_BIAS = 1 << 31
+
+
+def _record_dtype():
+    return np.dtype([
+        ('user_id', '<i4'),
+        ('day', '<i4'),
+        ('category_id', '<i4'),
+        ('payment_method', '<i4'),
+        ('cents', '<i8'),
+        ('transaction_id', '<i8'),
+    ])
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("history_archive requires NumPy; install it with 'pip install numpy'")
+
+
+def _keys(user_ids, days):
+    """Sort keys of (user_id, day) pairs as one int64 each"""
+    return (np.asarray(user_ids, dtype=np.int64) << 32) + (np.asarray(days, dtype=np.int64)
+                                                          + _DAY_BIAS)
+
+
+def _day(value) -> int:
+    return as_date(value).toordinal() - EPOCH_ORDINAL
+
+
+def _read_source(path: str, file_format: str, compression: Optional[str]):
+    """Yield (transaction_id, user_id, category_id, cents, day, payment_method) column chunks"""
+    if file_format == 'columnar':
+        for group in exporter.read_columnar(path, compression):
+            yield (group['transaction_id'], group['user_id'], group['category_id'],
+                   group['amount'], group['transaction_date'], group['payment_method'])
+        return
+    if file_format != 'csv':
+        raise ValueError(f"Unsupported archive format {file_format!r}")
+    opener = exporter.COMPRESSION[compression] if compression else open
+    with opener(path, 'rb') as handle:
+        reader = csv.DictReader((line.decode('utf-8') for line in handle))
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == DatabaseConfig.BATCH_SIZE:
+                yield _csv_columns(chunk)
+                chunk = []
+        if chunk:
+            yield _csv_columns(chunk)
+
+
+def _csv_columns(rows: List[Dict]):
+    return ([int(row['transaction_id']) for row in rows],
+            [int(row['user_id']) for row in rows],
+            [int(row['category_id']) for row in rows],
+            [to_cents(row['amount']) for row in rows],
+            [_day(row['transaction_date']) for row in rows],
+            [row['payment_method'] or None for row in rows])
+
+
+def build(path: str, sources: Iterable[Tuple[str, str, Optional[str]]],
+          stride: int = DEFAULT_STRIDE) -> Dict:
+    """
+    Write a history file from archive files
+
+    The numeric columns of every source are held in memory (32 bytes per
+    transaction) to sort them. A transaction found in several sources is
+    kept once.
+
+    Args:
+        path: Output file (replaced atomically)
+        sources: (path, file_format, compression) of archives written by archiver.py
+        stride: Records per sparse index entry
+
+    Returns:
+        Dictionary with records, first_date, last_date and file_bytes
+    """
+    _require_numpy()
+    sources = list(sources)
+    record = _record_dtype()
+    methods: Dict[Optional[str], int] = {}
+    chunks = []
+    for source_path, file_format, compression in sources:
+        for ids, users, categories, cents, days, payment_methods in _read_source(
+                source_path, file_format, compression):
+            chunk = np.empty(len(ids), dtype=record)
+            chunk['transaction_id'] = np.asarray(ids, dtype=np.int64)
+            chunk['user_id'] = np.asarray(users, dtype=np.int32)
+            chunk['category_id'] = np.asarray(categories, dtype=np.int32)
+            chunk['cents'] = np.asarray(cents, dtype=np.int64)
+            chunk['day'] = np.asarray(days, dtype=np.int32)
+            chunk['payment_method'] = [-1 if method is None else
+                                       methods.setdefault(method, len(methods))
+                                       for method in payment_methods]
+            chunks.append(chunk)
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=record)
+    _, first = np.unique(records['transaction_id'], return_index=True)
+    records = records[first]
+    records = records[np.lexsort((records['transaction_id'], records['day'],
+                                  records['user_id']))]
+    index = np.empty((len(records) + stride - 1) // stride,
+                     dtype=[('user_id', '<i4'), ('day', '<i4')])
+    index['user_id'] = records['user_id'][::stride]
+    index['day'] = records['day'][::stride]
+
+    first_date = last_date = None
+    if len(records):
+        first_date = (_EPOCH + timedelta(days=int(records['day'].min()))).isoformat()
+        last_date = (_EPOCH + timedelta(days=int(records['day'].max()))).isoformat()
+    metadata = json.dumps({
+        'payment_methods': [method for method, _ in sorted(methods.items(),
+                                                           key=lambda item: item[1])],
+        'first_date': first_date,
+        'last_date': last_date,
+        'sources': [source[0] for source in sources],
+    }).encode()
+
+    record_offset = _PREAMBLE.size
+    index_offset = record_offset + records.nbytes
+    metadata_offset = index_offset + index.nbytes
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as handle:
+        handle.write(_PREAMBLE.pack(MAGIC, record_offset, len(records), record.itemsize, stride,
+                                    index_offset, len(index), metadata_offset, len(metadata)))
+        handle.write(records.tobytes())
+        handle.write(index.tobytes())
+        handle.write(metadata)
+    os.replace(temporary, path)
+    return {
+        'records': len(records),
+        'first_date': first_date,
+        'last_date': last_date,
+        'file_bytes': os.path.getsize(path),
+    }
+
+
+def build_from_catalog(path: Optional[str] = None, stride: int = DEFAULT_STRIDE) -> Dict:
+    """Rebuild the history file from every archive in transaction_archives"""
+    import archiver
+    path = path or DatabaseConfig.HISTORY_ARCHIVE_PATH
+    sources = [(archive['path'], archive['file_format'], archive['compression'])
+               for archive in archiver.list_archives()]
+    return build(path, sources, stride)
+
+
+class HistoryArchive:
+    """
+    Memory-mapped history file
+
+    Records are NumPy views straight onto the mapping: nothing is copied
+    or parsed when the file is opened, and a query only touches the pages
+    of the user's date range. That range is found by binary search on the
+    sparse index, then within one stride of records at each end.
+    """
+
+    def __init__(self, path: str):
+        _require_numpy()
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"{path} is not a history archive")
+        (magic, record_offset, count, record_size, self.stride, index_offset, index_entries,
+         metadata_offset, metadata_length) = _PREAMBLE.unpack_from(self._map, 0)
+        record = _record_dtype()
+        if magic != MAGIC or record_size != record.itemsize:
+            self.close()
+            raise ValueError(f"{path} is not a history archive")
+        self.records = np.frombuffer(self._map, dtype=record, count=count, offset=record_offset)
+        index = np.frombuffer(self._map, dtype=[('user_id', '<i4'), ('day', '<i4')],
+                              count=index_entries, offset=index_offset)
+        self._index_keys = _keys(index['user_id'], index['day'])
+        self.metadata = json.loads(self._map[metadata_offset:metadata_offset + metadata_length])
+        self.payment_methods = self.metadata['payment_methods']
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def close(self):
+        """Unmap the file; views returned earlier must no longer be used"""
+        self.records = None
+        self._index_keys = None
+        try:
+            self._map.close()
+        except BufferError:
+            # A caller still holds a view; the mapping goes with it
+            pass
+        self._file.close()
+
+    def __enter__(self) -> "HistoryArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _position(self, key: int) -> int:
+        """Index of the first record whose (user_id, day) key is >= key"""
+        block = max(int(np.searchsorted(self._index_keys, key, side='left')) - 1, 0)
+        start = block * self.stride
+        window = self.records[start:start + 2 * self.stride]
+        return start + int(np.searchsorted(_keys(window['user_id'], window['day']), key,
+                                           side='left'))
+
+    def user_range(self, user_id: int, start_date=None, end_date=None):
+        """
+        A user's records in a date range, as a zero-copy view
+
+        Args:
+            user_id: The user's ID
+            start_date: First date, inclusive (optional)
+            end_date: Last date, inclusive (optional)
+
+        Returns:
+            Structured array view ordered by date
+        """
+        first_day = _day(start_date) if start_date is not None else -_DAY_BIAS
+        last_day = _day(end_date) if end_date is not None else _DAY_BIAS - 2
+        start = self._position(int(_keys(user_id, first_day)))
+        end = self._position(int(_keys(user_id, last_day + 1)))
+        return self.records[start:end]
+
+    def spending_by_category(self, user_id: int, start_date=None,
+                             end_date=None) -> Dict[int, Tuple[int, int]]:
+        """
+        A user's archived spending per category in a date range
+
+        Returns:
+            {category_id: (total cents, transaction count)}
+        """
+        records = self.user_range(user_id, start_date, end_date)
+        if not len(records):
+            return {}
+        categories, codes = np.unique(records['category_id'], return_inverse=True)
+        totals = np.zeros(len(categories), dtype=np.int64)
+        np.add.at(totals, codes, records['cents'])
+        counts = np.bincount(codes, minlength=len(categories))
+        return {int(category): (int(total), int(count))
+                for category, total, count in zip(categories, totals, counts)}
+
+    def total_spending(self, user_id: int, start_date=None, end_date=None) -> Decimal:
+        """A user's archived spending in a date range"""
+        return from_cents(int(self.user_range(user_id, start_date, end_date)['cents'].sum()))
+
+    def spending_by_month(self, user_id: int, start_date=None, end_date=None) -> List[Dict]:
+        """
+        A user's archived spending per calendar month
+
+        Returns:
+            List of dictionaries with month (first day), total_spent and
+            transaction_count, oldest month first
+        """
+        records = self.user_range(user_id, start_date, end_date)
+        if not len(records):
+            return []
+        months = (records['day'].astype('datetime64[D]').astype('datetime64[M]')
+                  .astype(np.int64))
+        # Records are sorted by day, so months are already ascending
+        boundaries = np.flatnonzero(np.diff(months)) + 1
+        starts = np.concatenate(([0], boundaries))
+        totals = np.add.reduceat(records['cents'], starts)
+        counts = np.diff(np.concatenate((starts, [len(records)])))
+        return [{
+            'month': date(1970 + int(month) // 12, int(month) % 12 + 1, 1),
+            'total_spent': from_cents(total),
+            'transaction_count': int(count),
+        } for month, total, count in zip(months[starts], totals, counts)]
+
+
+_open_lock = threading.Lock()
+_opened: Dict[str, Tuple[float, HistoryArchive]] = {}
+
+
+def open_history(path: Optional[str] = None) -> Optional[HistoryArchive]:
+    """
+    Shared reader of the history file, reopened when the file is rebuilt
+
+    Args:
+        path: History file (defaults to DatabaseConfig.HISTORY_ARCHIVE_PATH)
+
+    Returns:
+        The reader, or None when the file does not exist
+    """
+    path = path or DatabaseConfig.HISTORY_ARCHIVE_PATH
+    try:
+        modified = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    with _open_lock:
+        opened = _opened.get(path)
+        if opened is None or opened[0] != modified:
+            # The old mapping is left to the garbage collector: callers may
+            # still be reading views of it
+            _opened[path] = opened = (modified, HistoryArchive(path))
+        return opened[1]
@@ -0,0 +1,420 @@
+"""
+Statement Importer Module
+Streams CSV and OFX bank statement exports into the transactions table in
+batches, validating every row and collecting per-row errors instead of
+aborting the import
+"""
+
+import csv
+import html
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import dedupe
+from db_config import DatabaseConfig
+from models import Category, Transaction, User
+
+# Canonical fields and the CSV header names accepted for each (lower case)
+CSV_COLUMNS = {
+    'date': ('date', 'transaction_date', 'posted', 'posting date', 'transaction date'),
+    'amount': ('amount', 'value'),
+    'category': ('category', 'category_name'),
+    'description': ('description', 'payee', 'name', 'memo', 'details'),
+    'payment_method': ('payment_method', 'payment method', 'method'),
+    'debit': ('debit', 'debit amount', 'withdrawal', 'withdrawals', 'money out', 'paid out'),
+    'credit': ('credit', 'credit amount', 'deposit', 'deposits', 'money in', 'paid in'),
+}
+
+# Sign conventions of a signed CSV amount column (read_csv's debits argument)
+DEBIT_SIGNS = ('negative', 'positive')
+
+# OFX <TRNTYPE> values and the payment method they are stored as
+OFX_PAYMENT_METHODS = {
+    'POS': 'Debit Card',
+    'DEBIT': 'Debit Card',
+    'ATM': 'Cash',
+    'CASH': 'Cash',
+    'CHECK': 'Check',
+    'PAYMENT': 'Bank Transfer',
+    'XFER': 'Bank Transfer',
+    'DIRECTDEBIT': 'Bank Transfer',
+    'REPEATPMT': 'Bank Transfer',
+    'FEE': 'Bank Fee',
+    'SRVCHG': 'Bank Fee',
+}
+
+# transactions.amount is DECIMAL(10, 2); text columns are VARCHAR(255) / (50)
+MAX_AMOUNT = Decimal('99999999.99')
+_CENT = Decimal('0.01')
+_DESCRIPTION_LENGTH = 255
+_PAYMENT_METHOD_LENGTH = 50
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_AMOUNT_NOISE = re.compile(r"[\s$€£,]")
+
+
+class RowError(ValueError):
+    """A statement row that cannot be imported"""
+
+
+def read_csv(path: str, delimiter: str = ',', encoding: str = 'utf-8-sig',
+             columns: Optional[Dict[str, str]] = None,
+             debits: Optional[str] = 'negative') -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream the rows of a CSV export with a header line
+
+    Amounts come either from one signed amount column or from separate
+    debit and credit columns. Rows are marked as credits (deposits,
+    refunds, paychecks) the way read_ofx marks them, so the importer skips
+    them.
+
+    Args:
+        path: CSV file path
+        delimiter: Field delimiter
+        encoding: File encoding (the default skips a UTF-8 byte order mark)
+        columns: Header name per field ('date', 'amount', 'category',
+                 'description', 'payment_method', 'debit', 'credit') when
+                 they differ from the names in CSV_COLUMNS
+        debits: Sign of spending in a signed amount column: 'negative' (the
+                bank and OFX convention; positive amounts are credits),
+                'positive' (negative amounts are credits), or None when every
+                row is spending
+
+    Yields:
+        (line number, {field: text}) for every data row, with 'credit' set
+    """
+    if debits is not None and debits not in DEBIT_SIGNS:
+        raise ValueError(f"Unknown debit sign {debits!r}; use 'negative', 'positive' or None")
+    with open(path, newline='', encoding=encoding) as handle:
+        reader = csv.reader(handle, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        names = [name.strip().lower() for name in header]
+        positions = {}
+        for field, aliases in CSV_COLUMNS.items():
+            wanted = (columns[field].lower(),) if columns and field in columns else aliases
+            for alias in wanted:
+                if alias in names:
+                    positions[field] = names.index(alias)
+                    break
+        split = 'debit' in positions or 'credit' in positions
+        missing = [field for field in ('date', 'amount')
+                   if field not in positions and not (field == 'amount' and split)]
+        if missing:
+            raise RowError(f"CSV header has no {' or '.join(missing)} column")
+
+        fields = list(positions.items())
+        for row in reader:
+            if not row or not any(row):
+                continue
+            values = {field: row[position] if position < len(row) else ''
+                      for field, position in fields}
+            debit, credit = values.pop('debit', '').strip(), values.pop('credit', '').strip()
+            if split:
+                # One of the two columns is filled in; the other is blank (or zero)
+                is_credit = not _amount_given(debit) and _amount_given(credit)
+                values['amount'] = credit if is_credit else debit
+                values['credit'] = is_credit
+            else:
+                negative = _is_negative(values['amount'])
+                values['credit'] = (debits is not None
+                                    and negative == (debits == 'positive'))
+            yield reader.line_num, values
+
+
+def _is_negative(text: str) -> bool:
+    """Whether a statement amount is written as negative (-12.50 or (12.50))"""
+    cleaned = _AMOUNT_NOISE.sub('', text or '')
+    return cleaned.startswith('-') or (cleaned.startswith('(') and cleaned.endswith(')'))
+
+
+def _amount_given(text: str) -> bool:
+    """Whether a debit or credit column holds a non-zero amount"""
+    cleaned = _AMOUNT_NOISE.sub('', text or '').strip('()-')
+    try:
+        return bool(cleaned) and Decimal(cleaned) != 0
+    except InvalidOperation:
+        # Left for parse_amount to report
+        return True
+
+
+def read_ofx(path: str, encoding: str = 'utf-8',
+             block_size: int = 1 << 16) -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream the <STMTTRN> records of an OFX 1.x (SGML) or 2.x (XML) export
+
+    The file is tokenized in blocks, so statements on a single line or
+    larger than memory are handled too. Credits (positive TRNAMT) are
+    returned with their sign so the importer can skip them.
+
+    Args:
+        path: OFX file path
+        encoding: File encoding
+        block_size: Characters read per block
+
+    Yields:
+        (transaction number, {field: text}) for every statement transaction
+    """
+    with open(path, encoding=encoding, errors='replace') as handle:
+        pending = ''
+        record = None
+        number = 0
+        while True:
+            block = handle.read(block_size)
+            pending += block
+            # Tokenize up to the last '<', whose tag may continue in the next block
+            end = len(pending) if not block else pending.rfind('<')
+            if end <= 0:
+                if not block:
+                    return
+                continue
+            for match in _OFX_TAG.finditer(pending, 0, end):
+                closing, tag, text = match.groups()
+                tag = tag.upper()
+                if tag == 'STMTTRN':
+                    if closing:
+                        if record is not None:
+                            number += 1
+                            yield number, _ofx_fields(record)
+                        record = None
+                    else:
+                        record = {}
+                elif record is not None and not closing:
+                    text = text.strip()
+                    if text and tag not in record:
+                        record[tag] = html.unescape(text)
+            pending = pending[end:]
+            if not block:
+                return
+
+
+def _ofx_fields(record: Dict) -> Dict:
+    """Map an OFX transaction's tags to the importer's fields"""
+    name = record.get('NAME', '')
+    memo = record.get('MEMO', '')
+    trntype = record.get('TRNTYPE', '').upper()
+    return {
+        'date': record.get('DTPOSTED', '')[:8],
+        'amount': record.get('TRNAMT', ''),
+        'description': f"{name} - {memo}" if name and memo and memo != name else name or memo,
+        'payment_method': OFX_PAYMENT_METHODS.get(trntype, trntype.title()),
+        'credit': not record.get('TRNAMT', '').strip().startswith('-'),
+    }
+
+
+def parse_amount(text: str) -> Decimal:
+    """
+    Parse a statement amount as a positive spending amount
+
+    Currency symbols and thousands separators are ignored, and the sign
+    is dropped: read_csv and read_ofx mark credits, which import_rows
+    skips once their amount has parsed.
+
+    Raises:
+        RowError: If the amount is missing, zero, too large or has
+                  fractions of a cent
+    """
+    cleaned = _AMOUNT_NOISE.sub('', text or '')
+    if cleaned.startswith('(') and cleaned.endswith(')'):
+        cleaned = cleaned[1:-1]
+    try:
+        amount = abs(Decimal(cleaned))
+    except InvalidOperation:
+        raise RowError(f"invalid amount {text!r}")
+    if not amount.is_finite() or amount == 0:
+        raise RowError(f"invalid amount {text!r}")
+    if amount != amount.quantize(_CENT):
+        raise RowError(f"amount {text!r} has fractions of a cent")
+    if amount > MAX_AMOUNT:
+        raise RowError(f"amount {text!r} exceeds {MAX_AMOUNT}")
+    return amount
+
+
+def parse_date(text: str, date_format: Optional[str] = None) -> date:
+    """
+    Parse a statement date
+
+    Args:
+        text: Date text
+        date_format: strptime format; by default YYYY-MM-DD and the OFX
+                     form YYYYMMDD are accepted
+
+    Raises:
+        RowError: If the date is missing or malformed
+    """
+    text = (text or '').strip()
+    try:
+        if date_format:
+            return datetime.strptime(text, date_format).date()
+        if len(text) == 8 and text.isdigit():
+            return date(int(text[:4]), int(text[4:6]), int(text[6:]))
+        return date.fromisoformat(text)
+    except ValueError:
+        raise RowError(f"invalid date {text!r}")
+
+
+class _CategoryResolver:
+    """Category name to ID lookups through Category.get_by_name, cached per import"""
+
+    def __init__(self, default_category: Optional[str]):
+        self._ids = {}
+        self.default_id = self.resolve(default_category) if default_category else None
+        if default_category and self.default_id is None:
+            raise RowError(f"default category {default_category!r} does not exist")
+
+    def resolve(self, name: str) -> Optional[int]:
+        key = name.strip()
+        if key not in self._ids:
+            category = Category.get_by_name(key)
+            self._ids[key] = category['category_id'] if category else None
+        return self._ids[key]
+
+    def category_id(self, name: Optional[str]) -> int:
+        if name and name.strip():
+            category_id = self.resolve(name)
+            if category_id is None:
+                if self.default_id is None:
+                    raise RowError(f"unknown category {name.strip()!r}")
+                return self.default_id
+            return category_id
+        if self.default_id is None:
+            raise RowError("no category and no default category")
+        return self.default_id
+
+
+def import_rows(user_id: int, rows: Iterable[Tuple[int, Dict]],
+                default_category: Optional[str] = None, date_format: Optional[str] = None,
+                chunk_size: Optional[int] = None, max_errors: int = 1000,
+                progress: Optional[Callable[[Dict], None]] = None,
+                duplicates: Optional[str] = 'exact') -> Dict:
+    """
+    Validate statement rows and insert them in batches
+
+    Rows are inserted with Transaction.create_many, one chunk per commit,
+    so the monthly rollup and budget counters stay current. A row that
+    fails validation is reported and skipped; if a chunk is rejected by
+    the database its rows are retried one at a time so only the offending
+    rows are lost. Rows that repeat transactions stored before the import
+    started are skipped (see dedupe.DuplicateFilter), so re-importing an
+    overlapping statement only adds the new rows. Credits are skipped only
+    once their amount parses; a missing or malformed amount is a row error
+    even on a row the reader marked as a credit.
+
+    Args:
+        user_id: Owner of the imported transactions
+        rows: (record number, {field: text}) pairs from read_csv / read_ofx
+        default_category: Category name for rows without a known category
+        date_format: strptime format of the date column (see parse_date)
+        chunk_size: Rows per INSERT/commit (defaults to DatabaseConfig.BATCH_SIZE)
+        max_errors: Row errors kept in the result (all are counted)
+        progress: Called with the running result after every chunk
+        duplicates: 'exact' (same fingerprint), 'fuzzy' (near-duplicates
+                    within a few days) or None to insert every row
+
+    Returns:
+        Dictionary with imported, skipped (credits), duplicates, failed,
+        errors ([{'record', 'message'}]), seconds and rows_per_second
+
+    Raises:
+        RowError: If every row is a credit, which usually means the sign
+                  convention is wrong (see read_csv's debits)
+    """
+    if not User.get_by_id(user_id):
+        raise RowError(f"user {user_id} does not exist")
+    categories = _CategoryResolver(default_category)
+    duplicate_filter = dedupe.DuplicateFilter(duplicates) if duplicates else None
+    chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+    result = {'imported': 0, 'skipped': 0, 'duplicates': 0, 'failed': 0, 'errors': []}
+    started = time.perf_counter()
+
+    def fail(record, message):
+        result['failed'] += 1
+        if len(result['errors']) < max_errors:
+            result['errors'].append({'record': record, 'message': message})
+
+    def flush(batch, records):
+        if duplicate_filter:
+            batch, repeated = duplicate_filter.filter(batch)
+            if repeated:
+                skipped = set(repeated)
+                records = [record for position, record in enumerate(records)
+                           if position not in skipped]
+                result['duplicates'] += len(repeated)
+        try:
+            Transaction.create_many(batch, chunk_size)
+            result['imported'] += len(batch)
+        except Exception:
+            for row, record in zip(batch, records):
+                try:
+                    Transaction.create(*row)
+                    result['imported'] += 1
+                except Exception as e:
+                    fail(record, f"rejected by the database: {e}")
+        if progress:
+            progress(result)
+
+    batch, records = [], []
+    for record, fields in rows:
+        try:
+            amount = parse_amount(fields.get('amount'))
+            if fields.get('credit'):
+                result['skipped'] += 1
+                continue
+            batch.append((user_id,
+                          categories.category_id(fields.get('category')),
+                          amount,
+                          parse_date(fields.get('date'), date_format),
+                          (fields.get('description') or '').strip()[:_DESCRIPTION_LENGTH],
+                          (fields.get('payment_method') or '').strip()[:_PAYMENT_METHOD_LENGTH]))
+            records.append(record)
+        except RowError as e:
+            fail(record, str(e))
+            continue
+        if len(batch) >= chunk_size:
+            flush(batch, records)
+            batch, records = [], []
+    if batch:
+        flush(batch, records)
+    if result['skipped'] and not (result['imported'] or result['duplicates'] or result['failed']):
+        raise RowError(f"all {result['skipped']:,} rows are credits, so nothing was imported; "
+                       "a CSV that lists spending as positive amounts needs debits='positive'")
+
+    result['seconds'] = time.perf_counter() - started
+    result['rows_per_second'] = (result['imported'] / result['seconds']
+                                 if result['seconds'] else 0.0)
+    return result
+
+
+def import_file(path: str, user_id: int, file_format: Optional[str] = None,
+                **options) -> Dict:
+    """
+    Import a CSV or OFX statement file
+
+    Args:
+        path: Statement file
+        user_id: Owner of the imported transactions
+        file_format: 'csv' or 'ofx' (defaults to the file extension; .qfx is OFX)
+        **options: delimiter / encoding / columns / debits for read_csv, and
+                   the keyword arguments of import_rows
+
+    Returns:
+        Import result (see import_rows)
+    """
+    file_format = (file_format or path.rsplit('.', 1)[-1]).lower()
+    reader_options = {key: options.pop(key)
+                      for key in ('delimiter', 'encoding', 'columns', 'debits')
+                      if key in options}
+    if file_format == 'csv':
+        rows = read_csv(path, **reader_options)
+    elif file_format in ('ofx', 'qfx'):
+        reader_options.pop('delimiter', None)
+        reader_options.pop('columns', None)
+        reader_options.pop('debits', None)
+        rows = read_ofx(path, **reader_options)
+    else:
+        raise RowError(f"unsupported statement format {file_format!r}")
+    return import_rows(user_id, rows, **options)
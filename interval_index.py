@@ -0,0 +1,142 @@
+"""
+Interval Index Module
+In-process index of closed [start, end] intervals grouped by key, answering
+"which intervals of this key contain this point" without a database query
+"""
+
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, Hashable, Iterable, List, Sequence, Tuple
+
+
+class _KeyIntervals:
+    """
+    Intervals of one key sorted by start, with a running maximum of end
+
+    A point query bisects to the last interval starting at or before the
+    point and walks backwards until the running maximum end falls below the
+    point, since no earlier interval can reach it.
+    """
+
+    __slots__ = ("starts", "ends", "max_ends", "ids")
+
+    def __init__(self, intervals: Iterable[Tuple[Any, Any, Hashable]]):
+        ordered = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [interval[0] for interval in ordered]
+        self.ends = [interval[1] for interval in ordered]
+        self.ids = [interval[2] for interval in ordered]
+        self.max_ends = []
+        for end in self.ends:
+            self.max_ends.append(end if not self.max_ends else max(end, self.max_ends[-1]))
+
+    def covering(self, point) -> List[Hashable]:
+        found = []
+        position = bisect_right(self.starts, point) - 1
+        while position >= 0 and self.max_ends[position] >= point:
+            if self.ends[position] >= point:
+                found.append(self.ids[position])
+            position -= 1
+        found.reverse()
+        return found
+
+
+class IntervalIndex:
+    """
+    Thread-safe interval index keyed by (for example) user ID
+
+    Each entry has a unique ID, a key, a closed [start, end] interval and an
+    arbitrary payload. Changing a key rebuilds only that key's intervals.
+    Lookups return the stored payloads themselves; callers that hand them
+    out must copy mutable ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[Hashable, Tuple[Hashable, Any, Any, Any]] = {}
+        self._key_ids: Dict[Hashable, set] = {}
+        self._by_key: Dict[Hashable, _KeyIntervals] = {}
+
+    def _rebuild(self, key: Hashable):
+        entry_ids = self._key_ids.get(key)
+        if entry_ids:
+            self._by_key[key] = _KeyIntervals(
+                (self._entries[entry_id][1], self._entries[entry_id][2], entry_id)
+                for entry_id in entry_ids)
+        else:
+            self._key_ids.pop(key, None)
+            self._by_key.pop(key, None)
+
+    def load(self, entries: Iterable[Tuple[Hashable, Hashable, Any, Any, Any]]):
+        """
+        Replace the whole index
+
+        Args:
+            entries: (entry_id, key, start, end, payload) tuples
+        """
+        with self._lock:
+            self._entries = {}
+            self._key_ids = {}
+            for entry_id, key, start, end, payload in entries:
+                self._entries[entry_id] = (key, start, end, payload)
+                self._key_ids.setdefault(key, set()).add(entry_id)
+            self._by_key = {}
+            for key in self._key_ids:
+                self._rebuild(key)
+
+    def put(self, entry_id: Hashable, key: Hashable, start, end, payload=None):
+        """Add an entry, or replace the entry with the same ID"""
+        with self._lock:
+            previous = self._entries.get(entry_id)
+            self._entries[entry_id] = (key, start, end, payload)
+            if previous is not None and previous[0] != key:
+                self._key_ids[previous[0]].discard(entry_id)
+                self._rebuild(previous[0])
+            self._key_ids.setdefault(key, set()).add(entry_id)
+            self._rebuild(key)
+
+    def remove(self, entry_id: Hashable):
+        """Remove an entry if present"""
+        with self._lock:
+            previous = self._entries.pop(entry_id, None)
+            if previous is not None:
+                self._key_ids[previous[0]].discard(entry_id)
+                self._rebuild(previous[0])
+
+    def remove_key(self, key: Hashable):
+        """Remove every entry of a key"""
+        with self._lock:
+            for entry_id in self._key_ids.pop(key, ()):
+                del self._entries[entry_id]
+            self._by_key.pop(key, None)
+
+    def find(self, key: Hashable, point) -> List[Any]:
+        """
+        Payloads of the key's entries whose interval contains point
+
+        Returns:
+            Payloads ordered by interval start
+        """
+        with self._lock:
+            intervals = self._by_key.get(key)
+            if intervals is None:
+                return []
+            return [self._entries[entry_id][3] for entry_id in intervals.covering(point)]
+
+    def find_many(self, queries: Sequence[Tuple[Hashable, Any]]) -> List[List[Any]]:
+        """
+        Run find() for many (key, point) pairs under one lock acquisition
+
+        Returns:
+            One list of payloads per query, in query order
+        """
+        with self._lock:
+            results = []
+            for key, point in queries:
+                intervals = self._by_key.get(key)
+                results.append([] if intervals is None else
+                               [self._entries[entry_id][3]
+                                for entry_id in intervals.covering(point)])
+            return results
+
+    def __len__(self) -> int:
+        return len(self._entries)
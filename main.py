@@ -3,21 +3,34 @@ Budget Tracker Console Application
 Main console interface for interacting with the budget tracking system
 """
 
+import os
 import sys
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
+import analytics
+import budget_alerts
+import forecasting
+import history_archive
+import importer
 from db_config import DatabaseConfig
+from query_cache import query_cache
+from query_stats import query_stats
 from models import User, Category, Budget, BudgetRule, Transaction
 
 
 class BudgetTrackerApp:
     """Console-based application for budget tracking"""
     
+    # Rows per page in transaction listings
+    PAGE_SIZE = 50
+    
     def __init__(self):
         self.current_user_id: Optional[int] = None
         self.running = True
+        # In-memory columnar copies of users' transactions for drill-downs
+        self.frames = {}
     
     def display_header(self):
         """Display application header"""
@@ -38,6 +51,10 @@ class BudgetTrackerApp:
         print("8. View Budget Rules with Spending")
         print("9. Create New Transaction")
         print("10. Database Statistics")
+        print("11. Query Statistics")
+        print("12. Import Bank Statement (CSV/OFX)")
+        print("13. Spending Drill-down (in-memory)")
+        print("14. Search Transactions")
         print("0. Exit")
         print("-" * 40)
     
@@ -124,18 +141,49 @@ class BudgetTrackerApp:
         except Exception as e:
             print(f"Error retrieving budgets: {e}")
     
-    def view_all_transactions(self):
-        """Display all transactions (limited to most recent 50)"""
-        print("\n" + "="*60)
-        print("RECENT TRANSACTIONS (Last 50)")
-        print("="*60)
+    def browse_pages(self, fetch_page, show_page):
+        """
+        Show keyset-paginated results with next/previous navigation
         
-        try:
-            transactions = Transaction.get_all(limit=50)
-            if not transactions:
+        Args:
+            fetch_page: Callable taking a page token (or None) and returning a page dict
+            show_page: Callable printing a page's items and its page number
+        """
+        page_token = None
+        page_number = 1
+        while True:
+            page = fetch_page(page_token)
+            if not page['items']:
                 print("No transactions found.")
                 return
             
+            show_page(page['items'], page_number)
+            
+            options = []
+            if page['next_page']:
+                options.append("[N]ext")
+            if page['prev_page']:
+                options.append("[P]revious")
+            if not options:
+                return
+            
+            choice = self.get_user_input(f"{' / '.join(options)} page, or Enter to return").lower()
+            if choice == 'n' and page['next_page']:
+                page_token = page['next_page']
+                page_number += 1
+            elif choice == 'p' and page['prev_page']:
+                page_token = page['prev_page']
+                page_number -= 1
+            else:
+                return
+    
+    def view_all_transactions(self):
+        """Display all transactions, newest first, one page at a time"""
+        print("\n" + "="*60)
+        print(f"ALL TRANSACTIONS ({self.PAGE_SIZE} per page)")
+        print("="*60)
+        
+        def show_page(transactions, page_number):
             print(f"\n{'ID':<6} {'User':<15} {'Category':<15} {'Amount':<10} {'Date':<12} {'Description':<25}")
             print("-" * 90)
             
@@ -145,7 +193,10 @@ class BudgetTrackerApp:
                 desc = (txn.get('description', '')[:23] + '..') if len(txn.get('description', '')) > 25 else txn.get('description', '')
                 print(f"{txn['transaction_id']:<6} {txn['username']:<15} {txn['category_name']:<15} {amount:<10} {date_str:<12} {desc:<25}")
             
-            print(f"\nShowing {len(transactions)} transactions")
+            print(f"\nPage {page_number}: showing {len(transactions)} transactions")
+        
+        try:
+            self.browse_pages(lambda token: Transaction.get_page(self.PAGE_SIZE, token), show_page)
             
         except Exception as e:
             print(f"Error retrieving transactions: {e}")
@@ -181,29 +232,14 @@ class BudgetTrackerApp:
             print(f"Error retrieving budget details: {e}")
     
     def view_user_transactions(self):
-        """Display transactions for a specific user"""
+        """Display transactions for a specific user, one page at a time"""
         user_id = self.get_user_input("Enter User ID")
         
         if not user_id.isdigit():
             print("Invalid user ID.")
             return
         
-        try:
-            user = User.get_by_id(int(user_id))
-            if not user:
-                print(f"User with ID {user_id} not found.")
-                return
-            
-            transactions = Transaction.get_by_user(int(user_id), limit=50)
-            
-            print("\n" + "="*60)
-            print(f"TRANSACTIONS FOR {user['username']}")
-            print("="*60)
-            
-            if not transactions:
-                print("No transactions found for this user.")
-                return
-            
+        def show_page(transactions, page_number):
             print(f"\n{'ID':<6} {'Category':<15} {'Amount':<10} {'Date':<12} {'Description':<30}")
             print("-" * 80)
             
@@ -216,8 +252,22 @@ class BudgetTrackerApp:
                 print(f"{txn['transaction_id']:<6} {txn['category_name']:<15} {amount:<10} {date_str:<12} {desc:<30}")
             
             print("-" * 80)
-            print(f"Total Spending: ${total:,.2f}")
+            print(f"Page {page_number} Spending: ${total:,.2f}")
             print(f"Number of Transactions: {len(transactions)}")
+        
+        try:
+            user = User.get_by_id(int(user_id))
+            if not user:
+                print(f"User with ID {user_id} not found.")
+                return
+            
+            print("\n" + "="*60)
+            print(f"TRANSACTIONS FOR {user['username']}")
+            print("="*60)
+            
+            self.browse_pages(
+                lambda token: Transaction.get_page_by_user(int(user_id), self.PAGE_SIZE, token),
+                show_page)
             
         except Exception as e:
             print(f"Error retrieving user transactions: {e}")
@@ -232,38 +282,148 @@ class BudgetTrackerApp:
             print("Invalid user ID.")
             return
         
+        # Archived transactions are only in the history file (manage.py build-history)
+        include_archive = (history_archive.np is not None
+                           and os.path.exists(DatabaseConfig.HISTORY_ARCHIVE_PATH)
+                           and self.get_user_input("Include archived history? (y/n)").lower() == 'y')
+        
         try:
-            user = User.get_by_id(int(user_id))
-            if not user:
+            report = Transaction.get_spending_report(int(user_id), start_date, end_date)
+            if not report:
                 print(f"User with ID {user_id} not found.")
                 return
-            
-            summary = Transaction.get_spending_by_category(int(user_id), start_date, end_date)
-            total = Transaction.get_total_spending(int(user_id), start_date, end_date)
+            if include_archive:
+                report['categories'] = Transaction.get_spending_by_category(
+                    int(user_id), start_date, end_date, include_archive=True)
+                report['total'] = sum((item['total_spent'] for item in report['categories']),
+                                      Decimal('0.00'))
             
             print("\n" + "="*60)
-            print(f"SPENDING SUMMARY FOR {user['username']}")
+            print(f"SPENDING SUMMARY FOR {report['user']['username']}")
             print(f"Period: {start_date} to {end_date}")
             print("="*60)
             
-            if not summary:
+            if not report['categories']:
                 print("No transactions found for this period.")
                 return
             
             print(f"\n{'Category':<20} {'Icon':<6} {'Transactions':<15} {'Total Spent':<15}")
             print("-" * 60)
             
-            for item in summary:
+            for item in report['categories']:
                 icon = item.get('icon', '')[:5] if item.get('icon') else ''
                 total_spent = f"${item['total_spent']:,.2f}"
                 print(f"{item['category_name']:<20} {icon:<6} {item['transaction_count']:<15} {total_spent:<15}")
             
             print("-" * 60)
-            print(f"TOTAL SPENDING: ${total:,.2f}")
+            print(f"TOTAL SPENDING: ${report['total']:,.2f}")
             
         except Exception as e:
             print(f"Error retrieving spending summary: {e}")
     
+    def spending_drill_down(self):
+        """Explore a user's spending from an in-memory copy of their transactions"""
+        user_id = self.get_user_input("Enter User ID")
+        if not user_id.isdigit():
+            print("Invalid user ID.")
+            return
+        
+        try:
+            # Loaded once per user; later views and date ranges skip the database
+            frame = self.frames.get(int(user_id))
+            if frame is None:
+                frame = self.frames[int(user_id)] = analytics.TransactionFrame.load(int(user_id))
+            else:
+                frame.refresh()
+        except ImportError as e:
+            print(e)
+            return
+        except Exception as e:
+            print(f"Error loading transactions: {e}")
+            return
+        
+        print(f"\nLoaded {len(frame):,} transactions for user {user_id}.")
+        start_date = self.get_user_input("Start Date (YYYY-MM-DD, blank for all)") or None
+        end_date = self.get_user_input("End Date (YYYY-MM-DD, blank for all)") or None
+        
+        while True:
+            print("\n[c] by category  [m] by month  [p] by payment method  [t] top 5 categories")
+            print("[x] month x category  [d] change dates  [r] reload  [b] back")
+            choice = self.get_user_input("View").lower()
+            try:
+                if choice == 'b':
+                    return
+                elif choice == 'd':
+                    start_date = self.get_user_input("Start Date (YYYY-MM-DD, blank for all)") or None
+                    end_date = self.get_user_input("End Date (YYYY-MM-DD, blank for all)") or None
+                elif choice == 'r':
+                    print(f"Reloaded {frame.reload():,} transactions.")
+                elif choice in ('c', 't'):
+                    rows = frame.spending_by_category(start_date, end_date)
+                    for row in rows[:5] if choice == 't' else rows:
+                        print(f"{row['category_name']:<20} {row['transaction_count']:>8} "
+                              f"${row['total_spent']:>14,.2f}")
+                elif choice == 'm':
+                    for row in frame.spending_by_month(start_date, end_date):
+                        print(f"{row['month']:%Y-%m}  {row['transaction_count']:>8} "
+                              f"${row['total_spent']:>14,.2f}")
+                elif choice == 'p':
+                    for row in frame.spending_by_payment_method(start_date, end_date):
+                        print(f"{row['payment_method'] or '(none)':<20} {row['transaction_count']:>8} "
+                              f"${row['total_spent']:>14,.2f}")
+                elif choice == 'x':
+                    table = frame.pivot(start_date, end_date)
+                    print("Month   " + "".join(f"{name[:12]:>13}" for name in table['categories']))
+                    for month, totals in zip(table['months'], table['totals']):
+                        print(f"{month:%Y-%m} " + "".join(f"{total:>13,.2f}" for total in totals))
+                else:
+                    print("Invalid choice.")
+            except ValueError as e:
+                print(f"Invalid date: {e}")
+    
+    def search_transactions(self):
+        """Search a user's transaction descriptions, best match first"""
+        user_id = self.get_user_input("Enter User ID")
+        if not user_id.isdigit():
+            print("Invalid user ID.")
+            return
+        
+        text = self.get_user_input("Search for (e.g., starbucks)")
+        if not text:
+            print("Nothing to search for.")
+            return
+        start_date = self.get_user_input("From date (YYYY-MM-DD, Enter for any)") or None
+        end_date = self.get_user_input("To date (YYYY-MM-DD, Enter for any)") or None
+        category_id = self.get_user_input("Category ID (Enter for any)")
+        if category_id and not category_id.isdigit():
+            print("Invalid category ID.")
+            return
+        category_id = int(category_id) if category_id else None
+        
+        def show_page(transactions, page_number):
+            print(f"\n{'ID':<6} {'Category':<15} {'Amount':<10} {'Date':<12} {'Description':<30}")
+            print("-" * 80)
+            
+            for txn in transactions:
+                amount = f"${txn['amount']:,.2f}"
+                date_str = str(txn['transaction_date'])[:10] if txn['transaction_date'] else 'N/A'
+                desc = (txn.get('description', '')[:28] + '..') if len(txn.get('description', '')) > 30 else txn.get('description', '')
+                print(f"{txn['transaction_id']:<6} {txn['category_name']:<15} {amount:<10} {date_str:<12} {desc:<30}")
+            
+            print(f"\nPage {page_number}: showing {len(transactions)} matches")
+        
+        print("\n" + "="*60)
+        print(f"SEARCH RESULTS FOR '{text}'")
+        print("="*60)
+        
+        try:
+            self.browse_pages(
+                lambda token: Transaction.search(int(user_id), text, start_date, end_date,
+                                                 category_id, self.PAGE_SIZE, token),
+                show_page)
+        except Exception as e:
+            print(f"Error searching transactions: {e}")
+    
     def view_budget_rules_with_spending(self):
         """Display budget rules with current spending"""
         budget_id = self.get_user_input("Enter Budget ID")
@@ -289,15 +449,34 @@ class BudgetTrackerApp:
                 print("No rules found for this budget.")
                 return
             
-            print(f"\n{'Category':<15} {'Limit':<12} {'Spent':<12} {'Remaining':<12} {'% Used':<10}")
-            print("-" * 70)
+            # End-of-period projections need NumPy; without it the columns are left out
+            projections = {}
+            if forecasting.np is not None:
+                projections = {rule['rule_id']: rule
+                               for rule in forecasting.project_rules([int(budget_id)])}
+            
+            header = f"\n{'Category':<15} {'Limit':<12} {'Spent':<12} {'Remaining':<12} {'% Used':<10}"
+            if projections:
+                header += f" {'Projected':<12} {'Proj. Overspend':<15}"
+            print(header)
+            print("-" * (98 if projections else 70))
             
             for rule in rules:
                 limit = f"${rule['limit_amount']:,.2f}"
                 spent = f"${rule['total_spent']:,.2f}"
                 remaining = f"${rule['remaining']:,.2f}"
                 percent = f"{rule['percent_used']:.1f}%"
-                print(f"{rule['category_name']:<15} {limit:<12} {spent:<12} {remaining:<12} {percent:<10}")
+                line = f"{rule['category_name']:<15} {limit:<12} {spent:<12} {remaining:<12} {percent:<10}"
+                projection = projections.get(rule['rule_id'])
+                if projection:
+                    projected = f"${projection['projected_spend']:,.2f}"
+                    overspend = (f"${projection['projected_overspend']:,.2f}"
+                                 if projection['will_exceed'] else "-")
+                    line += f" {projected:<12} {overspend:<15}"
+                print(line)
+            
+            if not budget['is_active'] and forecasting.np is not None:
+                print("\nProjections are only made for active budgets.")
             
         except Exception as e:
             print(f"Error retrieving budget rules: {e}")
@@ -345,17 +524,90 @@ class BudgetTrackerApp:
             description = self.get_user_input("Enter Description")
             payment_method = self.get_user_input("Enter Payment Method")
             
-            # Create transaction
-            txn_id = Transaction.create(
-                int(user_id), int(category_id), amount_float,
-                date, description, payment_method
-            )
+            # Create transaction, unless it repeats a stored one. No connection
+            # or transaction is held while waiting for input.
+            row = (int(user_id), int(category_id), amount_float, date, description, payment_method)
+            txn_id = Transaction.create(*row, duplicates='exact')
+            if txn_id is None:
+                duplicate = Transaction.find_duplicate(int(user_id), amount_float, date, description)
+                if duplicate:
+                    print(f"\nThis looks like transaction {duplicate['transaction_id']} "
+                          f"(${duplicate['amount']:,.2f} on {duplicate['transaction_date']}).")
+                if self.get_user_input("Create it anyway? (y/n)").lower() != 'y':
+                    print("Transaction not created.")
+                    return
+                txn_id = Transaction.create(*row)
             
             print(f"\n✓ Transaction created successfully! ID: {txn_id}")
+            self.show_budget_alerts()
             
         except Exception as e:
             print(f"Error creating transaction: {e}")
     
+    def import_statement(self):
+        """Import transactions from a CSV or OFX bank statement file"""
+        print("\n" + "="*60)
+        print("IMPORT BANK STATEMENT")
+        print("="*60)
+        
+        user_id = self.get_user_input("Enter User ID")
+        if not user_id.isdigit():
+            print("Invalid user ID.")
+            return
+        
+        path = self.get_user_input("Enter statement file path (.csv, .ofx or .qfx)")
+        default_category = self.get_user_input(
+            "Category for rows without a known category (blank to reject them)")
+        
+        options = {}
+        if path.lower().endswith('.csv'):
+            # Credits (deposits, refunds) are skipped; which sign is spending?
+            sign = self.get_user_input("Spending amounts are (n)egative, (p)ositive, "
+                                       "or (a)ll rows are spending [n]").lower()
+            options['debits'] = {'p': 'positive', 'a': None}.get(sign[:1], 'negative')
+        
+        def show_progress(result):
+            print(f"  {result['imported']:,} imported, {result['failed']:,} rejected...", end="\r")
+        
+        try:
+            result = importer.import_file(path, int(user_id),
+                                          default_category=default_category or None,
+                                          progress=show_progress, **options)
+        except (OSError, importer.RowError) as e:
+            print(f"Import failed: {e}")
+            return
+        except Exception as e:
+            print(f"Error importing statement: {e}")
+            return
+        
+        print(f"\n✓ Imported {result['imported']:,} transactions in {result['seconds']:.2f}s "
+              f"({result['rows_per_second']:,.0f} rows/s)")
+        if result['skipped']:
+            print(f"Skipped {result['skipped']:,} credits (deposits are not spending)")
+        if result['duplicates']:
+            print(f"Skipped {result['duplicates']:,} transactions that were already imported")
+        if result['failed']:
+            print(f"Rejected {result['failed']:,} rows:")
+            for error in result['errors'][:20]:
+                print(f"  record {error['record']}: {error['message']}")
+            if result['failed'] > 20:
+                print(f"  ... and {result['failed'] - 20:,} more")
+        self.show_budget_alerts()
+    
+    def show_budget_alerts(self):
+        """Print budget alerts raised by the last change (default queue sink only)"""
+        sink = budget_alerts.get_sink()
+        if not isinstance(sink, budget_alerts.QueueSink):
+            return
+        
+        for event in sink.drain():
+            if event['type'] == budget_alerts.LIMIT_EXCEEDED:
+                print(f"⚠ Budget '{event['budget_name']}' is over its limit for this category: "
+                      f"${event['spent']:,.2f} of ${event['limit_amount']:,.2f}")
+            else:
+                print(f"⚠ Budget '{event['budget_name']}' reached {event['percent_used']:.0f}% "
+                      f"of its limit for this category (alert at {event['alert_threshold']:.0f}%)")
+    
     def show_statistics(self):
         """Display database statistics"""
         print("\n" + "="*60)
@@ -373,9 +625,58 @@ class BudgetTrackerApp:
             active_budgets = Budget.get_active_budgets()
             print(f"\nActive Budgets: {len(active_budgets)}")
             
+            # Connection pool health
+            pool = DatabaseConfig.get_pool_stats()
+            if pool:
+                print(f"\nConnection Pool: {pool['in_use']}/{pool['size']} in use "
+                      f"(high water {pool['high_water']}, {pool['waiting']} waiting)")
+                print(f"Checkout wait: avg {pool['avg_wait_ms']:.2f} ms, max {pool['max_wait_ms']:.2f} ms")
+                print(f"Connection hold: avg {pool['avg_hold_ms']:.2f} ms, max {pool['max_hold_ms']:.2f} ms")
+                print(f"Pool exhausted: {pool['exhausted_events']} times ({pool['timeouts']} timeouts)")
+            
+            # Query cache effectiveness
+            if DatabaseConfig.QUERY_CACHE_ENABLED:
+                cache = query_cache.stats()
+                print(f"\nQuery Cache: {cache['entries']} entries, {cache['bytes'] / 2**20:.1f} MiB "
+                      f"of {cache['max_bytes'] / 2**20:.0f} MiB")
+                print(f"Hit rate: {cache['hit_rate']:.1%} ({cache['hits']} hits, {cache['misses']} misses, "
+                      f"{cache['invalidations']} invalidated, {cache['evictions']} evicted)")
+            
         except Exception as e:
             print(f"Error retrieving statistics: {e}")
     
+    def show_query_statistics(self):
+        """Display the hottest queries and the slow-query log"""
+        print("\n" + "="*60)
+        print("QUERY STATISTICS")
+        print("="*60)
+        
+        stats = query_stats.snapshot()
+        if not stats:
+            print("No queries recorded yet.")
+            return
+        
+        print(f"\n{'Calls':>7} {'Total ms':>10} {'Avg ms':>8} {'p95 ms':>8} {'Max ms':>8} {'Rows':>8}  Caller / Query")
+        print("-" * 90)
+        
+        for item in stats[:15]:
+            caller = next(iter(item['callers']), '')
+            sql = (item['sql'][:85] + '..') if len(item['sql']) > 87 else item['sql']
+            print(f"{item['calls']:>7} {item['total_ms']:>10.1f} {item['avg_ms']:>8.2f} "
+                  f"{item['p95_ms']:>8.2f} {item['max_ms']:>8.2f} {item['rows']:>8}  {caller}")
+            print(f"{'':>54}{sql}")
+        
+        slow = query_stats.slow_queries()
+        print(f"\nSlow queries (>= {DatabaseConfig.SLOW_QUERY_MS:.0f} ms): {len(slow)}")
+        for entry in slow[-5:]:
+            print(f"  {entry['elapsed_ms']:.1f} ms  {entry['caller']}: {entry['sql'][:70]}")
+            for step in entry['plan'] or []:
+                if 'detail' in step:  # SQLite EXPLAIN QUERY PLAN
+                    print(f"      EXPLAIN {step['detail']}")
+                else:
+                    print(f"      EXPLAIN {step.get('table')}: type={step.get('type')} "
+                          f"key={step.get('key')} rows={step.get('rows')}")
+    
     def run(self):
         """Main application loop"""
         try:
@@ -420,6 +721,17 @@ class BudgetTrackerApp:
                 elif choice == '10':
                     self.show_statistics()
                     self.pause()
+                elif choice == '11':
+                    self.show_query_statistics()
+                    self.pause()
+                elif choice == '12':
+                    self.import_statement()
+                    self.pause()
+                elif choice == '13':
+                    self.spending_drill_down()
+                elif choice == '14':
+                    self.search_transactions()
+                    self.pause()
                 elif choice == '0':
                     print("\nThank you for using Budget Tracker!")
                     self.running = False
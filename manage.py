@@ -0,0 +1,333 @@
+"""
+Budget Tracker Management Commands
+Maintenance tasks run outside the console application
+
+    python manage.py migrate [--to VERSION]
+    python manage.py showmigrations
+    python manage.py rebuild-rollup
+    python manage.py check-rollup
+    python manage.py check-budgets [--workers N]
+    python manage.py refresh-budget-counters
+    python manage.py export-transactions PATH [--format csv|columnar] [--compress gzip]
+    python manage.py forecast-budgets [--as-of YYYY-MM-DD] [--all]
+    python manage.py find-duplicates [--fuzzy] [--window DAYS]
+    python manage.py refresh-fingerprints
+    python manage.py partition-transactions [--by year|month] [--ahead N]
+    python manage.py maintain-partitions [--ahead N] [--drop-before YYYY-MM-DD]
+    python manage.py show-partitions [--explain-user ID --start YYYY-MM-DD --end YYYY-MM-DD]
+    python manage.py archive-transactions (--older-than YEARS | --before YYYY-MM-DD) [--dir DIR]
+    python manage.py build-history [--out PATH] [--stride N]
+"""
+
+import argparse
+import sys
+
+from db_config import DatabaseConfig
+
+
+def cmd_migrate(args):
+    """Apply pending schema migrations"""
+    from migrations import migrate
+    applied = migrate(target=args.to)
+    if applied:
+        print(f"Applied {len(applied)} migration(s)")
+    else:
+        print("No migrations to apply")
+
+
+def cmd_showmigrations(args):
+    """List migrations and whether each has been applied"""
+    from migrations import status
+    for migration in status():
+        mark = "X" if migration['applied_at'] else " "
+        applied = f"  ({migration['applied_at']})" if migration['applied_at'] else ""
+        print(f"[{mark}] {migration['version']:03d} {migration['description']}{applied}")
+
+
+def cmd_rebuild_rollup(args):
+    """Recompute the monthly spending rollup from the transactions table"""
+    from models.monthly_spending import MonthlySpending
+    rows = MonthlySpending.rebuild()
+    print(f"Rebuilt monthly_spending: {rows} rows")
+
+
+def cmd_check_rollup(args):
+    """Compare the monthly spending rollup with the transactions table"""
+    from models.monthly_spending import MonthlySpending
+    mismatches = MonthlySpending.check()
+    for row in mismatches[:args.limit]:
+        print(f"user {row['user_id']} category {row['category_id']} {row['month']}: "
+              f"expected {row['expected_total']} / {row['expected_count']}, "
+              f"stored {row['stored_total']} / {row['stored_count']}")
+    if mismatches:
+        print(f"{len(mismatches)} mismatched rollup rows; run 'manage.py rebuild-rollup'")
+        sys.exit(1)
+    print("monthly_spending is consistent with transactions")
+
+
+def cmd_check_budgets(args):
+    """Report budget rules of active budgets at or above their alert threshold"""
+    from models.budget_rule import BudgetRule
+    breaches = BudgetRule.evaluate_budgets(chunk_size=args.chunk_size, workers=args.workers,
+                                           breached_only=True)
+    for rule in breaches:
+        status = "OVER LIMIT" if rule['over_limit'] else "ALERT"
+        print(f"{status:<10} user {rule['user_id']} budget {rule['budget_id']} "
+              f"({rule['budget_name']}) {rule['category_name']}: "
+              f"${rule['total_spent']:,.2f} of ${rule['limit_amount']:,.2f} "
+              f"({rule['percent_used']:.1f}%)")
+    print(f"{len(breaches)} rule(s) at or above their alert threshold")
+
+
+def cmd_refresh_budget_counters(args):
+    """Recompute every budget rule's spent counter from the transactions table"""
+    from models.budget_rule import BudgetRule
+    with DatabaseConfig.session():
+        BudgetRule.refresh_spent()
+    print("Budget rule spent counters refreshed")
+
+
+def cmd_export_transactions(args):
+    """Export transactions to CSV or the columnar format in bounded chunks"""
+    from exporter import export_transactions
+    result = export_transactions(args.path, file_format=args.format, compression=args.compress,
+                                 user_id=args.user, start_date=args.start, end_date=args.end,
+                                 chunk_size=args.chunk_size)
+    print(f"Exported {result['rows']:,} transactions to {args.path}: "
+          f"{result['raw_bytes'] / 2**20:.1f} MiB ({result['file_bytes'] / 2**20:.1f} MiB on disk) "
+          f"in {result['seconds']:.2f}s, {result['mb_per_second']:.1f} MiB/s")
+
+
+def cmd_forecast_budgets(args):
+    """Project end-of-period spending for every rule of every active budget"""
+    import forecasting
+    result = forecasting.score_all(as_of=args.as_of, window=args.window,
+                                   half_life=args.half_life)
+    for rule in result['rules'] if args.all else result['at_risk']:
+        status = "OVERSPEND" if rule['will_exceed'] else "ok"
+        print(f"{status:<10} user {rule['user_id']} budget {rule['budget_id']} "
+              f"({rule['budget_name']}) {rule['category_name']}: "
+              f"projected ${rule['projected_spend']:,.2f} of ${rule['limit_amount']:,.2f} "
+              f"(spent ${rule['spent']:,.2f}, day {rule['days_elapsed']}/{rule['days_total']})")
+    print(f"Scored {len(result['rules'])} rule(s) in {result['seconds']:.2f}s; "
+          f"{len(result['at_risk'])} projected to exceed their limit")
+
+
+def cmd_find_duplicates(args):
+    """List groups of duplicate transactions across the whole table"""
+    import dedupe
+    from models.transaction import Transaction
+    groups = dedupe.find_duplicates(fuzzy=args.fuzzy, window_days=args.window,
+                                    min_similarity=args.similarity)
+    for group in groups[:args.limit]:
+        first = Transaction.get_by_id(group[0])
+        summary = (f"user {first['user_id']} ${first['amount']:,.2f} {first['transaction_date']} "
+                   f"'{first['description']}'" if first else "")
+        print(f"{len(group)} x {summary}: transactions {', '.join(map(str, group))}")
+    if len(groups) > args.limit:
+        print(f"... and {len(groups) - args.limit} more group(s)")
+    extra = sum(len(group) - 1 for group in groups)
+    print(f"{len(groups)} duplicate group(s), {extra} redundant transaction(s)")
+
+
+def cmd_refresh_fingerprints(args):
+    """Recompute every transaction's duplicate-detection fingerprint"""
+    import dedupe
+    rows = dedupe.refresh_fingerprints(only_missing=False)
+    print(f"Fingerprinted {rows} transaction(s)")
+
+
+def cmd_partition_transactions(args):
+    """Partition the transactions table by transaction_date (MySQL)"""
+    import partitions
+    created = partitions.enable(granularity=args.by, ahead=args.ahead)
+    print(f"Partitioned transactions into {len(created)} partition(s): {', '.join(created)}")
+
+
+def cmd_maintain_partitions(args):
+    """Add upcoming partitions and drop archived (empty) old ones"""
+    import partitions
+    added = partitions.add_partitions(ahead=args.ahead)
+    print(f"Added {len(added)} partition(s){': ' + ', '.join(added) if added else ''}")
+    if args.drop_before:
+        dropped, skipped = partitions.drop_partitions(args.drop_before)
+        print(f"Dropped {len(dropped)} partition(s){': ' + ', '.join(dropped) if dropped else ''}")
+        if skipped:
+            print(f"Kept {', '.join(skipped)}: they still hold rows; "
+                  f"run archive-transactions first")
+
+
+def cmd_show_partitions(args):
+    """List the transactions partitions and, optionally, those a date-range query reads"""
+    import partitions
+    rows = partitions.list_partitions()
+    if not rows:
+        print("transactions is not partitioned")
+        return
+    for partition in rows:
+        bound = partition['upper_bound'] or "MAXVALUE"
+        print(f"{partition['name']:<10} < {bound!s:<12} ~{partition['estimated_rows']:,} rows")
+    if args.explain_user is not None:
+        # The predicate of Transaction.get_by_date_range and the spending reports
+        plan = partitions.explain("""
+            SELECT * FROM transactions
+            WHERE user_id = %s AND transaction_date BETWEEN %s AND %s
+        """, (args.explain_user, args.start, args.end))
+        for step in plan:
+            print(f"EXPLAIN {step['table']}: partitions {step['partitions']}, "
+                  f"key {step['key']}, rows {step['rows']}")
+
+
+def cmd_archive_transactions(args):
+    """Move old transactions into compressed archive files"""
+    import archiver
+    result = archiver.archive_transactions(
+        before=args.before, older_than_years=args.older_than, directory=args.dir,
+        file_format=args.format, compression=None if args.compress == "none" else args.compress,
+        chunk_size=args.chunk_size)
+    if not result['rows']:
+        print(f"No transactions dated before {result['cutoff']}")
+        return
+    print(f"Archived {result['rows']:,} transactions dated {result['first_date']} to "
+          f"{result['last_date']} into {len(result['archives'])} file(s) in {args.dir} "
+          f"({result['file_bytes'] / 2**20:.1f} MiB) in {result['seconds']:.2f}s")
+    if result['dropped_partitions']:
+        print(f"Dropped partition(s) {', '.join(result['dropped_partitions'])}")
+
+
+def cmd_build_history(args):
+    """Rebuild the memory-mapped history file from the archive catalog"""
+    import history_archive
+    result = history_archive.build_from_catalog(args.out, stride=args.stride)
+    path = args.out or DatabaseConfig.HISTORY_ARCHIVE_PATH
+    print(f"Wrote {result['records']:,} archived transactions dated {result['first_date']} to "
+          f"{result['last_date']} to {path} ({result['file_bytes'] / 2**20:.1f} MiB)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Budget Tracker management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help=cmd_migrate.__doc__)
+    migrate.add_argument("--to", type=int, metavar="VERSION",
+                         help="stop after this migration version")
+    migrate.set_defaults(func=cmd_migrate)
+
+    show = commands.add_parser("showmigrations", help=cmd_showmigrations.__doc__)
+    show.set_defaults(func=cmd_showmigrations)
+
+    rebuild = commands.add_parser("rebuild-rollup", help=cmd_rebuild_rollup.__doc__)
+    rebuild.set_defaults(func=cmd_rebuild_rollup)
+
+    check = commands.add_parser("check-rollup", help=cmd_check_rollup.__doc__)
+    check.add_argument("--limit", type=int, default=20,
+                       help="mismatches to print (default 20)")
+    check.set_defaults(func=cmd_check_rollup)
+
+    budgets = commands.add_parser("check-budgets", help=cmd_check_budgets.__doc__)
+    budgets.add_argument("--chunk-size", type=int, help="budgets per query")
+    budgets.add_argument("--workers", type=int, default=1,
+                         help="threads evaluating chunks concurrently (default 1)")
+    budgets.set_defaults(func=cmd_check_budgets)
+
+    counters = commands.add_parser("refresh-budget-counters",
+                                   help=cmd_refresh_budget_counters.__doc__)
+    counters.set_defaults(func=cmd_refresh_budget_counters)
+
+    export = commands.add_parser("export-transactions", help=cmd_export_transactions.__doc__)
+    export.add_argument("path", help="output file")
+    export.add_argument("--format", choices=("csv", "columnar"), default="csv")
+    export.add_argument("--compress", choices=("gzip", "bz2", "xz"),
+                        help="compress the output stream")
+    export.add_argument("--user", type=int, help="only this user's transactions")
+    export.add_argument("--start", metavar="YYYY-MM-DD", help="earliest transaction date")
+    export.add_argument("--end", metavar="YYYY-MM-DD", help="latest transaction date")
+    export.add_argument("--chunk-size", type=int, help="rows per query and row group")
+    export.set_defaults(func=cmd_export_transactions)
+
+    forecast = commands.add_parser("forecast-budgets", help=cmd_forecast_budgets.__doc__)
+    forecast.add_argument("--as-of", metavar="YYYY-MM-DD", help="projection date (default today)")
+    forecast.add_argument("--window", type=int, default=90,
+                          help="days of spending history (default 90)")
+    forecast.add_argument("--half-life", type=float, default=21.0,
+                          help="days after which a day's spending weighs half (default 21)")
+    forecast.add_argument("--all", action="store_true",
+                          help="list every rule, not only projected overspends")
+    forecast.set_defaults(func=cmd_forecast_budgets)
+
+    duplicates = commands.add_parser("find-duplicates", help=cmd_find_duplicates.__doc__)
+    duplicates.add_argument("--fuzzy", action="store_true",
+                            help="also match near-duplicates posted a few days apart")
+    duplicates.add_argument("--window", type=int, default=3,
+                            help="days between postings of the same purchase (default 3)")
+    duplicates.add_argument("--similarity", type=float, default=0.5,
+                            help="share of description words in common (default 0.5)")
+    duplicates.add_argument("--limit", type=int, default=20,
+                            help="groups to print (default 20)")
+    duplicates.set_defaults(func=cmd_find_duplicates)
+
+    fingerprints = commands.add_parser("refresh-fingerprints",
+                                       help=cmd_refresh_fingerprints.__doc__)
+    fingerprints.set_defaults(func=cmd_refresh_fingerprints)
+
+    partition = commands.add_parser("partition-transactions",
+                                    help=cmd_partition_transactions.__doc__)
+    partition.add_argument("--by", choices=("year", "month"), default="year",
+                           help="partition size (default year)")
+    partition.add_argument("--ahead", type=int, default=1,
+                           help="future partitions to create (default 1)")
+    partition.set_defaults(func=cmd_partition_transactions)
+
+    maintain = commands.add_parser("maintain-partitions", help=cmd_maintain_partitions.__doc__)
+    maintain.add_argument("--ahead", type=int, default=1,
+                          help="future partitions to keep ready (default 1)")
+    maintain.add_argument("--drop-before", metavar="YYYY-MM-DD",
+                          help="drop empty partitions ending on or before this date")
+    maintain.set_defaults(func=cmd_maintain_partitions)
+
+    show = commands.add_parser("show-partitions", help=cmd_show_partitions.__doc__)
+    show.add_argument("--explain-user", type=int, metavar="ID",
+                      help="EXPLAIN a date-range query for this user")
+    show.add_argument("--start", metavar="YYYY-MM-DD", default="2024-01-01")
+    show.add_argument("--end", metavar="YYYY-MM-DD", default="2024-12-31")
+    show.set_defaults(func=cmd_show_partitions)
+
+    archive = commands.add_parser("archive-transactions", help=cmd_archive_transactions.__doc__)
+    cutoff = archive.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument("--older-than", type=int, metavar="YEARS",
+                        help="archive transactions older than this many years")
+    cutoff.add_argument("--before", metavar="YYYY-MM-DD",
+                        help="archive transactions dated before this day")
+    archive.add_argument("--dir", default="archives", help="archive directory (default archives)")
+    archive.add_argument("--format", choices=("columnar", "csv"), default="columnar")
+    archive.add_argument("--compress", choices=("gzip", "bz2", "xz", "none"), default="xz")
+    archive.add_argument("--chunk-size", type=int,
+                         help="rows per archive file, moved in one commit (default 50000)")
+    archive.set_defaults(func=cmd_archive_transactions)
+
+    history = commands.add_parser("build-history", help=cmd_build_history.__doc__)
+    history.add_argument("--out", metavar="PATH",
+                         help="history file (default DatabaseConfig.HISTORY_ARCHIVE_PATH)")
+    history.add_argument("--stride", type=int, default=1024,
+                         help="records per sparse index entry (default 1024)")
+    history.set_defaults(func=cmd_build_history)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Commands manage the schema themselves
+    DatabaseConfig.AUTO_MIGRATE = False
+    try:
+        # One connection per worker thread for commands that take --workers
+        DatabaseConfig.initialize_pool(pool_size=max(1, getattr(args, "workers", 1)))
+        args.func(args)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        DatabaseConfig.close_pool()
+
+
+if __name__ == "__main__":
+    main()
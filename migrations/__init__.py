@@ -0,0 +1,9 @@
+"""
+Migrations Package
+Versioned forward-only schema migrations applied on top of schema.sql
+(or schema_sqlite.sql) to an existing budget_tracker database
+"""
+
+from migrations.runner import load_migrations, migrate, status
+
+__all__ = ['load_migrations', 'migrate', 'status']
@@ -0,0 +1,112 @@
+"""
+Migration Runner
+Discovers migrations/vNNN_*.py modules and applies the pending ones in order,
+recording each in the schema_migrations table
+"""
+
+import importlib
+import pkgutil
+import re
+from typing import Dict, List, Optional
+
+from db_config import DatabaseConfig, execute_query
+
+_MODULE_NAME = re.compile(r"^v(\d+)_\w+$")
+
+CREATE_TABLE = {
+    'mysql': """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    """,
+    'sqlite': """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+
+def load_migrations() -> List:
+    """
+    Import every migration module in version order
+
+    Each module defines VERSION, DESCRIPTION and STATEMENTS, a dictionary
+    mapping a backend name ('mysql', 'sqlite') to its list of SQL statements.
+    A module may also define backfill(), run after its statements in the
+    same session, for data changes that cannot be written in SQL.
+
+    Returns:
+        Migration modules sorted by VERSION
+    """
+    import migrations
+    modules = []
+    for info in pkgutil.iter_modules(migrations.__path__):
+        if _MODULE_NAME.match(info.name):
+            modules.append(importlib.import_module(f"migrations.{info.name}"))
+    modules.sort(key=lambda module: module.VERSION)
+    versions = [module.VERSION for module in modules]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return modules
+
+
+def _applied_versions() -> Dict[int, Dict]:
+    """Create the bookkeeping table if needed and return applied migrations by version"""
+    execute_query(CREATE_TABLE[DatabaseConfig.backend().name])
+    rows = execute_query("SELECT * FROM schema_migrations ORDER BY version", fetch=True)
+    return {row['version']: row for row in rows}
+
+
+def status() -> List[Dict]:
+    """
+    Report every known migration and whether it has been applied
+
+    Returns:
+        List of dictionaries with version, description and applied_at (None if pending)
+    """
+    applied = _applied_versions()
+    return [{
+        'version': module.VERSION,
+        'description': module.DESCRIPTION,
+        'applied_at': applied[module.VERSION]['applied_at'] if module.VERSION in applied else None,
+    } for module in load_migrations()]
+
+
+def migrate(target: Optional[int] = None, verbose: bool = True) -> List[int]:
+    """
+    Apply pending migrations in version order
+
+    Each migration runs in one session. MySQL commits DDL implicitly, so a
+    migration that fails halfway on MySQL can leave its earlier statements
+    applied; it is not recorded and the error is raised.
+
+    Args:
+        target: Stop after this version (defaults to the latest)
+        verbose: Print each migration as it is applied
+
+    Returns:
+        Versions applied by this call
+    """
+    backend = DatabaseConfig.backend().name
+    applied = _applied_versions()
+    done = []
+    for module in load_migrations():
+        if module.VERSION in applied or (target is not None and module.VERSION > target):
+            continue
+        if verbose:
+            print(f"Applying migration {module.VERSION:03d}: {module.DESCRIPTION}")
+        with DatabaseConfig.session():
+            for statement in module.STATEMENTS[backend]:
+                execute_query(statement)
+            if hasattr(module, "backfill"):
+                module.backfill()
+            execute_query(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (module.VERSION, module.DESCRIPTION))
+        done.append(module.VERSION)
+    return done
@@ -0,0 +1,47 @@
+"""
+Migration 001
+Composite indexes for the hottest transaction predicates
+
+- (user_id, transaction_date, created_at, category_id, amount) covers
+  user_id = ? AND transaction_date BETWEEN ? AND ? for the date-range
+  listing, per-category totals and keyset pagination of a user's history
+- (user_id, category_id, transaction_date, amount) covers the per-rule
+  spending join in BudgetRule.get_rules_with_spending
+- (category_id, transaction_date, created_at) and (transaction_date,
+  created_at) serve the category and global paginated listings
+- (user_id, is_active, start_date, end_date) finds a user's active budgets
+  covering a date
+
+The single-column transaction indexes become redundant prefixes and are
+dropped (the composites still back the foreign keys).
+"""
+
+VERSION = 1
+DESCRIPTION = "Composite covering indexes on transactions and budgets"
+
+_CREATE = [
+    "CREATE INDEX idx_transaction_user_date "
+    "ON transactions (user_id, transaction_date, created_at, category_id, amount)",
+    "CREATE INDEX idx_transaction_user_category_date "
+    "ON transactions (user_id, category_id, transaction_date, amount)",
+    "CREATE INDEX idx_transaction_category_date "
+    "ON transactions (category_id, transaction_date, created_at)",
+    "CREATE INDEX idx_transaction_date_created "
+    "ON transactions (transaction_date, created_at)",
+    "CREATE INDEX idx_budget_user_active "
+    "ON budgets (user_id, is_active, start_date, end_date)",
+]
+
+STATEMENTS = {
+    'mysql': _CREATE + [
+        "ALTER TABLE transactions "
+        "DROP INDEX idx_transaction_user, "
+        "DROP INDEX idx_transaction_date, "
+        "DROP INDEX idx_transaction_category",
+    ],
+    'sqlite': _CREATE + [
+        "DROP INDEX idx_transaction_user",
+        "DROP INDEX idx_transaction_date",
+        "DROP INDEX idx_transaction_category",
+    ],
+}
@@ -0,0 +1,67 @@
+"""
+Migration 002
+Monthly spending rollup maintained by the Transaction model
+
+One row per (user_id, category_id, month) holding the sum and count of the
+transactions in that calendar month; month is the first day of the month.
+The table is backfilled from the existing transactions.
+"""
+
+VERSION = 2
+DESCRIPTION = "Monthly spending rollup table"
+
+STATEMENTS = {
+    'mysql': [
+        """
+        CREATE TABLE monthly_spending (
+            user_id INT NOT NULL,
+            category_id INT NOT NULL,
+            month DATE NOT NULL,
+            total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            txn_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, category_id, month),
+            INDEX idx_monthly_spending_category (category_id),
+            CONSTRAINT fk_monthly_spending_user
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+                ON DELETE CASCADE ON UPDATE CASCADE,
+            CONSTRAINT fk_monthly_spending_category
+                FOREIGN KEY (category_id) REFERENCES categories(category_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        ) ENGINE=InnoDB
+        """,
+        """
+        INSERT INTO monthly_spending (user_id, category_id, month, total_amount, txn_count)
+        SELECT user_id, category_id,
+               DATE_SUB(transaction_date, INTERVAL DAYOFMONTH(transaction_date) - 1 DAY),
+               SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3
+        """,
+    ],
+    'sqlite': [
+        """
+        CREATE TABLE monthly_spending (
+            user_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            month DATE NOT NULL,
+            total_amount DECIMAL_REAL(14, 2) NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, category_id, month),
+            CONSTRAINT fk_monthly_spending_user
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+                ON DELETE CASCADE ON UPDATE CASCADE,
+            CONSTRAINT fk_monthly_spending_category
+                FOREIGN KEY (category_id) REFERENCES categories(category_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        )
+        """,
+        "CREATE INDEX idx_monthly_spending_category ON monthly_spending (category_id)",
+        """
+        INSERT INTO monthly_spending (user_id, category_id, month, total_amount, txn_count)
+        SELECT user_id, category_id, date(transaction_date, 'start of month'),
+               SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3
+        """,
+    ],
+}
@@ -0,0 +1,33 @@
+"""
+Migration 003
+Running spent counter on budget rules
+
+budget_rules.spent_amount holds the sum of the budget owner's transactions
+in the rule's category between the budget's start_date and end_date. It is
+kept current by the alert engine (budget_alerts.py) and backfilled here.
+"""
+
+VERSION = 3
+DESCRIPTION = "Running spent counter on budget_rules"
+
+_BACKFILL = """
+    UPDATE budget_rules SET spent_amount = (
+        SELECT COALESCE(SUM(t.amount), 0)
+        FROM budgets b
+        JOIN transactions t ON t.user_id = b.user_id
+            AND t.transaction_date BETWEEN b.start_date AND b.end_date
+        WHERE b.budget_id = budget_rules.budget_id
+            AND t.category_id = budget_rules.category_id
+    )
+"""
+
+STATEMENTS = {
+    'mysql': [
+        "ALTER TABLE budget_rules ADD COLUMN spent_amount DECIMAL(12, 2) NOT NULL DEFAULT 0",
+        _BACKFILL,
+    ],
+    'sqlite': [
+        "ALTER TABLE budget_rules ADD COLUMN spent_amount DECIMAL_REAL(12, 2) NOT NULL DEFAULT 0",
+        _BACKFILL,
+    ],
+}
@@ -0,0 +1,30 @@
+"""
+Migration 004
+Duplicate-detection fingerprint on transactions
+
+transactions.fingerprint is a hash of (user_id, amount, transaction_date,
+normalized description) computed by dedupe.fingerprint. It is indexed (not
+unique: the same purchase can legitimately happen twice in a day) so the
+insert and import paths can look it up directly. Existing rows are
+fingerprinted by backfill().
+"""
+
+VERSION = 4
+DESCRIPTION = "Duplicate-detection fingerprint on transactions"
+
+STATEMENTS = {
+    'mysql': [
+        "ALTER TABLE transactions ADD COLUMN fingerprint CHAR(32) NULL, "
+        "ADD INDEX idx_transaction_fingerprint (fingerprint)",
+    ],
+    'sqlite': [
+        "ALTER TABLE transactions ADD COLUMN fingerprint CHAR(32)",
+        "CREATE INDEX idx_transaction_fingerprint ON transactions (fingerprint)",
+    ],
+}
+
+
+def backfill():
+    """Fingerprint the transactions that existed before this migration"""
+    from dedupe import refresh_fingerprints
+    refresh_fingerprints()
@@ -0,0 +1,18 @@
+"""
+Migration 005
+Full-text index on transaction descriptions
+
+Transaction.search uses MATCH ... AGAINST on MySQL. The embedded SQLite
+backend has no equivalent here and searches an in-process inverted index
+(text_index.py) instead, so nothing changes in its schema.
+"""
+
+VERSION = 5
+DESCRIPTION = "Full-text index on transactions.description"
+
+STATEMENTS = {
+    'mysql': [
+        "ALTER TABLE transactions ADD FULLTEXT INDEX ft_transaction_description (description)",
+    ],
+    'sqlite': [],
+}
@@ -0,0 +1,49 @@
+"""
+Migration 006
+Catalog of transaction archive files
+
+archiver.archive_transactions moves transactions dated before a cutoff out
+of the transactions table into a compressed export file and records the
+file here: its path and format, the cutoff, the date range and number of
+rows it holds.
+"""
+
+VERSION = 6
+DESCRIPTION = "Catalog of transaction archive files"
+
+STATEMENTS = {
+    'mysql': [
+        """
+        CREATE TABLE transaction_archives (
+            archive_id INT PRIMARY KEY AUTO_INCREMENT,
+            path VARCHAR(1024) NOT NULL,
+            file_format VARCHAR(20) NOT NULL,
+            compression VARCHAR(10),
+            cutoff_date DATE NOT NULL,
+            first_date DATE,
+            last_date DATE,
+            row_count INT NOT NULL,
+            file_bytes BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_transaction_archive_dates (first_date, last_date)
+        ) ENGINE=InnoDB
+        """,
+    ],
+    'sqlite': [
+        """
+        CREATE TABLE transaction_archives (
+            archive_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path VARCHAR(1024) NOT NULL,
+            file_format VARCHAR(20) NOT NULL,
+            compression VARCHAR(10),
+            cutoff_date DATE NOT NULL,
+            first_date DATE,
+            last_date DATE,
+            row_count INTEGER NOT NULL,
+            file_bytes BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_transaction_archive_dates ON transaction_archives (first_date, last_date)",
+    ],
+}
@@ -8,5 +8,7 @@ from models.category import Category
 from models.budget import Budget
 from models.budget_rule import BudgetRule
 from models.transaction import Transaction
+from models.monthly_spending import MonthlySpending
 
-__all__ = ['User', 'Category', 'Budget', 'BudgetRule', 'Transaction']
+__all__ = ['User', 'Category', 'Budget', 'BudgetRule', 'Transaction',
+           'MonthlySpending']
@@ -3,14 +3,23 @@ Budget Model - Data Access Layer
 Handles all database operations for budgets table
 """
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Sequence, Tuple
 from datetime import datetime, date
 from decimal import Decimal
-from db_config import execute_query
+import threading
+from db_config import DatabaseConfig, execute_query
+from interval_index import IntervalIndex
+from models.budget_rule import BudgetRule
+from conversions import as_date
 
 class Budget:
     """Budget model representing user budget configurations"""
     
+    # In-process index of active budgets by user and [start_date, end_date],
+    # built on first use by find_covering and kept current by this model
+    _covering_index: Optional[IntervalIndex] = None
+    _covering_lock = threading.Lock()
+    
     def __init__(self, budget_id: Optional[int] = None, user_id: int = 0,
                  budget_name: str = "", budget_type: str = "",
                  total_amount: Decimal = Decimal('0.00'),
@@ -54,6 +63,8 @@ class Budget:
         """
         budget_id = execute_query(query, (user_id, budget_name, budget_type,
                                           total_amount, start_date, end_date, is_active))
+        if is_active:
+            DatabaseConfig.on_commit(lambda: Budget._reindex(budget_id))
         return budget_id
     
     @staticmethod
@@ -165,9 +176,66 @@ class Budget:
         
         params.append(budget_id)
         query = f"UPDATE budgets SET {', '.join(updates)} WHERE budget_id = %s"
-        execute_query(query, tuple(params))
+        with DatabaseConfig.session():
+            execute_query(query, tuple(params))
+            if start_date is not None or end_date is not None:
+                # The rules now cover a different period
+                BudgetRule.refresh_spent([budget_id])
+            DatabaseConfig.on_commit(lambda: Budget._reindex(budget_id))
         return True
     
+    @staticmethod
+    def update_many(budget_ids: Iterable[int], changes: Dict,
+                    chunk_size: Optional[int] = None) -> int:
+        """
+        Apply the same changes to many budgets, one UPDATE per chunk of IDs
+        
+        For example, shift a batch of budgets to a new period with
+        changes={'start_date': '2025-01-01', 'end_date': '2025-12-31'}.
+        
+        Args:
+            budget_ids: IDs of budgets to update
+            changes: New values for any of budget_name, budget_type, total_amount,
+                     start_date, end_date and is_active
+            chunk_size: IDs per UPDATE (defaults to DatabaseConfig.BATCH_SIZE); the
+                        budgets are committed together
+        
+        Returns:
+            Number of budgets updated
+        """
+        columns = ('budget_name', 'budget_type', 'total_amount', 'start_date', 'end_date',
+                   'is_active')
+        unknown = set(changes) - set(columns)
+        if unknown:
+            raise ValueError(f"Cannot bulk update {', '.join(sorted(unknown))}")
+        ids = sorted(set(budget_ids))
+        if not changes or not ids:
+            return 0
+        
+        chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+        assignments = ", ".join(f"{column} = %s" for column in changes)
+        lock = " FOR UPDATE" if DatabaseConfig.backend().name == "mysql" else ""
+        updated = []
+        with DatabaseConfig.session():
+            for start in range(0, len(ids), chunk_size):
+                chunk = tuple(ids[start:start + chunk_size])
+                placeholders = ", ".join(["%s"] * len(chunk))
+                rows = execute_query(f"SELECT budget_id FROM budgets "
+                                     f"WHERE budget_id IN ({placeholders}){lock}",
+                                     chunk, fetch=True, cache=False)
+                if not rows:
+                    continue
+                execute_query(f"UPDATE budgets SET {assignments} "
+                              f"WHERE budget_id IN ({placeholders})",
+                              tuple(changes.values()) + chunk)
+                updated.extend(row['budget_id'] for row in rows)
+            if 'start_date' in changes or 'end_date' in changes:
+                # The rules now cover a different period
+                BudgetRule.refresh_spent(updated)
+            DatabaseConfig.on_commit(lambda: [Budget._reindex(budget_id)
+                                              for budget_id in updated])
+        return len(updated)
+    
     @staticmethod
     def delete(budget_id: int) -> bool:
         """
@@ -181,6 +249,7 @@ class Budget:
         """
         query = "DELETE FROM budgets WHERE budget_id = %s"
         execute_query(query, (budget_id,))
+        DatabaseConfig.on_commit(lambda: Budget._unindex(budget_id))
         return True
     
     @staticmethod
@@ -208,6 +277,90 @@ class Budget:
         result = execute_query(query, fetch=True)
         return result[0]['count'] if result else 0
     
+    @staticmethod
+    def _covering() -> IntervalIndex:
+        """Return the active budget interval index, loading it on first use"""
+        with Budget._covering_lock:
+            if Budget._covering_index is None:
+                index = IntervalIndex()
+                index.load((budget['budget_id'], budget['user_id'], budget['start_date'],
+                            budget['end_date'], budget)
+                           for budget in Budget.get_active_budgets())
+                Budget._covering_index = index
+            return Budget._covering_index
+    
+    @staticmethod
+    def _reindex(budget_id: int):
+        """Refresh one budget in the interval index after a committed change"""
+        index = Budget._covering_index
+        if index is None:
+            return
+        budget = Budget.get_by_id(budget_id)
+        if budget and budget['is_active']:
+            index.put(budget_id, budget['user_id'], budget['start_date'],
+                      budget['end_date'], budget)
+        else:
+            index.remove(budget_id)
+    
+    @staticmethod
+    def _unindex(budget_id: int):
+        """Drop a deleted budget from the interval index"""
+        if Budget._covering_index is not None:
+            Budget._covering_index.remove(budget_id)
+    
+    @staticmethod
+    def unindex_user(user_id: int):
+        """Drop all budgets of a deleted user from the interval index"""
+        if Budget._covering_index is not None:
+            Budget._covering_index.remove_key(user_id)
+    
+    @staticmethod
+    def reload_covering_index():
+        """
+        Discard the interval index so the next lookup reloads it
+        
+        The index only sees changes made through this process's models;
+        call this after budgets were changed elsewhere.
+        """
+        with Budget._covering_lock:
+            Budget._covering_index = None
+    
+    @staticmethod
+    def find_covering(user_id: int, on_date) -> List[Dict]:
+        """
+        Find the user's active budgets whose period contains a date
+        
+        Answered from an in-process interval index instead of the database.
+        
+        Args:
+            user_id: The user's ID
+            on_date: Date (date or YYYY-MM-DD)
+        
+        Returns:
+            List of budgets as dictionaries (copies, so callers may change
+            them), earliest start first
+        """
+        return Budget._copies(Budget._covering().find(user_id, as_date(on_date)))
+    
+    @staticmethod
+    def find_covering_many(pairs: Sequence[Tuple[int, object]]) -> List[List[Dict]]:
+        """
+        Bulk variant of find_covering for ingestion
+        
+        Args:
+            pairs: (user_id, date) pairs
+        
+        Returns:
+            One list of covering budgets per pair, in input order
+        """
+        return [Budget._copies(budgets) for budgets in Budget._covering().find_many(
+            [(user_id, as_date(on_date)) for user_id, on_date in pairs])]
+    
+    @staticmethod
+    def _copies(budgets: List[Dict]) -> List[Dict]:
+        """Fresh dictionaries, since the index's payloads are shared by every thread"""
+        return [dict(budget) if isinstance(budget, dict) else budget for budget in budgets]
+    
     @staticmethod
     def get_budget_summary(budget_id: int) -> Optional[Dict]:
         """
@@ -3,10 +3,11 @@ Budget Rule Model - Data Access Layer
 Handles all database operations for budget_rules table
 """
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
-from db_config import execute_query
+from db_config import DatabaseConfig, execute_query, execute_many, stream_query
 
 class BudgetRule:
     """Budget Rule model representing category spending limits within budgets"""
@@ -41,9 +42,36 @@ class BudgetRule:
             INSERT INTO budget_rules (budget_id, category_id, limit_amount, alert_threshold)
             VALUES (%s, %s, %s, %s)
         """
-        rule_id = execute_query(query, (budget_id, category_id, limit_amount, alert_threshold))
+        with DatabaseConfig.session():
+            rule_id = execute_query(query, (budget_id, category_id, limit_amount, alert_threshold))
+            BudgetRule.refresh_spent([budget_id])
         return rule_id
     
+    @staticmethod
+    def create_many(rules: Iterable[Sequence],
+                    chunk_size: Optional[int] = None) -> List[int]:
+        """
+        Create many budget rules with batched multi-row INSERTs
+        
+        Args:
+            rules: Iterable of (budget_id, category_id, limit_amount, alert_threshold)
+                   tuples; alert_threshold is optional and defaults to 80.00
+            chunk_size: Rows per INSERT (defaults to DatabaseConfig.BATCH_SIZE); the
+                        rules are committed together
+        
+        Returns:
+            IDs of the newly created budget rules, in input order
+        """
+        query = """
+            INSERT INTO budget_rules (budget_id, category_id, limit_amount, alert_threshold)
+            VALUES (%s, %s, %s, %s)
+        """
+        rows = [tuple(rule) + (80.00,)[len(rule) - 3:] for rule in rules]
+        with DatabaseConfig.session():
+            ids = execute_many(query, rows, chunk_size)
+            BudgetRule.refresh_spent({row[0] for row in rows})
+        return ids
+    
     @staticmethod
     def get_by_id(rule_id: int) -> Optional[Dict]:
         """
@@ -109,6 +137,20 @@ class BudgetRule:
         query = "SELECT * FROM budget_rules ORDER BY budget_id, category_id"
         return execute_query(query, fetch=True)
     
+    @staticmethod
+    def iter_all(batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream all budget rules without loading the whole table into memory
+        
+        Args:
+            batch_size: Rows fetched per round trip (optional)
+        
+        Yields:
+            Budget rules as dictionaries
+        """
+        query = "SELECT * FROM budget_rules ORDER BY budget_id, category_id"
+        return stream_query(query, batch_size=batch_size)
+    
     @staticmethod
     def update(rule_id: int, limit_amount: Optional[float] = None,
                alert_threshold: Optional[float] = None) -> bool:
@@ -141,6 +183,47 @@ class BudgetRule:
         execute_query(query, tuple(params))
         return True
     
+    @staticmethod
+    def bulk_set_limits(budget_id: int, limits: Dict[int, float],
+                        chunk_size: Optional[int] = None) -> int:
+        """
+        Set the limits of many rules of a budget with CASE UPDATEs
+        
+        Categories without a rule in the budget are skipped (see create_many).
+        
+        Args:
+            budget_id: ID of the budget
+            limits: New limit amount by category ID
+            chunk_size: Rules per UPDATE (defaults to DatabaseConfig.BATCH_SIZE); the
+                        rules are committed together
+        
+        Returns:
+            Number of rules updated
+        """
+        pairs = sorted(limits.items())
+        chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+        lock = " FOR UPDATE" if DatabaseConfig.backend().name == "mysql" else ""
+        updated = 0
+        with DatabaseConfig.session():
+            for start in range(0, len(pairs), chunk_size):
+                chunk = pairs[start:start + chunk_size]
+                categories = tuple(category_id for category_id, _ in chunk)
+                placeholders = ", ".join(["%s"] * len(chunk))
+                rows = execute_query(f"""
+                    SELECT rule_id FROM budget_rules
+                    WHERE budget_id = %s AND category_id IN ({placeholders}){lock}
+                """, (budget_id,) + categories, fetch=True, cache=False)
+                if not rows:
+                    continue
+                cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+                execute_query(f"""
+                    UPDATE budget_rules
+                    SET limit_amount = CASE category_id {cases} END
+                    WHERE budget_id = %s AND category_id IN ({placeholders})
+                """, tuple(value for pair in chunk for value in pair) + (budget_id,) + categories)
+                updated += len(rows)
+        return updated
+    
     @staticmethod
     def delete(rule_id: int) -> bool:
         """
@@ -183,6 +266,35 @@ class BudgetRule:
         result = execute_query(query, fetch=True)
         return result[0]['count'] if result else 0
     
+    @staticmethod
+    def refresh_spent(budget_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Recompute the spent_amount counters from the transactions table
+        
+        Needed when rules are created or a budget's dates change; transaction
+        changes update the counters incrementally (see budget_alerts).
+        
+        Args:
+            budget_ids: Budgets whose rules to refresh (defaults to all rules)
+        """
+        query = """
+            UPDATE budget_rules SET spent_amount = (
+                SELECT COALESCE(SUM(t.amount), 0)
+                FROM budgets b
+                JOIN transactions t ON t.user_id = b.user_id
+                    AND t.transaction_date BETWEEN b.start_date AND b.end_date
+                WHERE b.budget_id = budget_rules.budget_id
+                    AND t.category_id = budget_rules.category_id
+            )
+        """
+        params = ()
+        if budget_ids is not None:
+            params = tuple(sorted(set(budget_ids)))
+            if not params:
+                return
+            query += f" WHERE budget_id IN ({', '.join(['%s'] * len(params))})"
+        execute_query(query, params)
+    
     @staticmethod
     def get_rules_with_spending(budget_id: int) -> List[Dict]:
         """
@@ -209,7 +321,81 @@ class BudgetRule:
             GROUP BY br.rule_id
             ORDER BY c.category_name
         """
-        return execute_query(query, (budget_id,), fetch=True)
+        return execute_query(query, (budget_id,), fetch=True, prepared=True)
+    
+    @staticmethod
+    def evaluate_budgets(budget_ids: Optional[Iterable[int]] = None,
+                         chunk_size: Optional[int] = None, workers: int = 1,
+                         breached_only: bool = False) -> List[Dict]:
+        """
+        Compute spending against every rule of many budgets with set-based queries
+        
+        Budget IDs are evaluated in chunks, one grouped query per chunk, instead
+        of one get_rules_with_spending call per budget.
+        
+        Args:
+            budget_ids: Budgets to evaluate (defaults to all active budgets)
+            chunk_size: Budgets per query (defaults to DatabaseConfig.BATCH_SIZE)
+            workers: Threads running chunks concurrently, each on its own
+                     pooled connection (1 runs them in the calling thread)
+            breached_only: Return only rules at or above their alert threshold
+        
+        Returns:
+            List of rules with user_id, budget_name, category_name, total_spent,
+            remaining, percent_used, threshold_breached and over_limit,
+            ordered by budget and category name
+        """
+        if budget_ids is None:
+            rows = execute_query(
+                "SELECT budget_id FROM budgets WHERE is_active = TRUE ORDER BY budget_id",
+                fetch=True)
+            ids = [row['budget_id'] for row in rows]
+        else:
+            ids = sorted(set(budget_ids))
+        if not ids:
+            return []
+        
+        chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        if workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(BudgetRule._evaluate_chunk, chunks))
+        else:
+            results = [BudgetRule._evaluate_chunk(chunk) for chunk in chunks]
+        
+        rules = [rule for chunk in results for rule in chunk]
+        if breached_only:
+            rules = [rule for rule in rules if rule['threshold_breached']]
+        return rules
+    
+    @staticmethod
+    def _evaluate_chunk(budget_ids: List[int]) -> List[Dict]:
+        """Evaluate the rules of one chunk of budgets in a single grouped query"""
+        placeholders = ", ".join(["%s"] * len(budget_ids))
+        query = f"""
+            SELECT br.*, b.user_id, b.budget_name, b.start_date, b.end_date,
+                   c.category_name, c.icon,
+                   COALESCE(SUM(t.amount), 0) as total_spent,
+                   br.limit_amount - COALESCE(SUM(t.amount), 0) as remaining,
+                   (COALESCE(SUM(t.amount), 0) / br.limit_amount * 100) as percent_used
+            FROM budget_rules br
+            JOIN budgets b ON br.budget_id = b.budget_id
+            JOIN categories c ON br.category_id = c.category_id
+            LEFT JOIN transactions t ON t.user_id = b.user_id
+                AND t.category_id = br.category_id
+                AND t.transaction_date BETWEEN b.start_date AND b.end_date
+            WHERE br.budget_id IN ({placeholders})
+            GROUP BY br.rule_id
+            ORDER BY br.budget_id, c.category_name
+        """
+        # Dictionary rows, since the breach flags are added to them; a batch
+        # read whose chunks rarely repeat, so it bypasses the query cache
+        rules = execute_query(query, tuple(budget_ids), fetch=True, compact=False,
+                              cache=False)
+        for rule in rules:
+            rule['threshold_breached'] = rule['percent_used'] >= rule['alert_threshold']
+            rule['over_limit'] = rule['remaining'] < 0
+        return rules
     
     def __repr__(self):
         return f"BudgetRule(id={self.rule_id}, budget={self.budget_id}, category={self.category_id})"
@@ -3,9 +3,9 @@ Category Model - Data Access Layer
 Handles all database operations for categories table
 """
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Sequence
 from datetime import datetime
-from db_config import execute_query
+from db_config import DatabaseConfig, execute_query, execute_many
 
 class Category:
     """Category model representing spending categories"""
@@ -39,6 +39,27 @@ class Category:
         category_id = execute_query(query, (category_name, description, icon))
         return category_id
     
+    @staticmethod
+    def create_many(categories: Iterable[Sequence],
+                    chunk_size: Optional[int] = None) -> List[int]:
+        """
+        Create many categories with batched multi-row INSERTs
+        
+        Args:
+            categories: Iterable of (category_name, description, icon) tuples;
+                        description and icon are optional
+            chunk_size: Rows per INSERT/commit (defaults to DatabaseConfig.BATCH_SIZE)
+        
+        Returns:
+            IDs of the newly created categories, in input order
+        """
+        query = """
+            INSERT INTO categories (category_name, description, icon)
+            VALUES (%s, %s, %s)
+        """
+        rows = (tuple(cat) + ("", "")[len(cat) - 1:] for cat in categories)
+        return execute_many(query, rows, chunk_size)
+    
     @staticmethod
     def get_by_id(category_id: int) -> Optional[Dict]:
         """
@@ -128,6 +149,12 @@ class Category:
         Returns:
             True if deletion successful
         """
+        # Checked here too: a partitioned transactions table has no foreign
+        # key to enforce RESTRICT (see partitions.py)
+        used = execute_query("SELECT 1 FROM transactions WHERE category_id = %s LIMIT 1",
+                             (category_id,), fetch=True, cache=False)
+        if used:
+            raise ValueError(f"Category {category_id} is used by transactions")
         query = "DELETE FROM categories WHERE category_id = %s"
         execute_query(query, (category_id,))
         return True
@@ -152,13 +179,23 @@ class Category:
         Returns:
             List of categories with transaction counts
         """
-        query = """
-            SELECT c.*, COUNT(t.transaction_id) as transaction_count
-            FROM categories c
-            LEFT JOIN transactions t ON c.category_id = t.category_id
-            GROUP BY c.category_id
-            ORDER BY c.category_name
-        """
+        if DatabaseConfig.USE_SPENDING_ROLLUP:
+            # Sum the per-month counts instead of joining every transaction
+            query = """
+                SELECT c.*, CAST(COALESCE(SUM(m.txn_count), 0) AS SIGNED) as transaction_count
+                FROM categories c
+                LEFT JOIN monthly_spending m ON c.category_id = m.category_id
+                GROUP BY c.category_id
+                ORDER BY c.category_name
+            """
+        else:
+            query = """
+                SELECT c.*, COUNT(t.transaction_id) as transaction_count
+                FROM categories c
+                LEFT JOIN transactions t ON c.category_id = t.category_id
+                GROUP BY c.category_id
+                ORDER BY c.category_name
+            """
         return execute_query(query, fetch=True)
     
     def __repr__(self):
@@ -0,0 +1,207 @@
+"""
+Monthly Spending Model - Data Access Layer
+Handles the monthly_spending rollup table (sum and count of transactions per
+user, category and calendar month), kept in step with the transactions table
+by the Transaction model
+"""
+
+from typing import Optional, List, Dict, Iterable, Sequence, Tuple
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from conversions import as_date
+from db_config import DatabaseConfig, execute_query, execute_many, stream_query
+
+# Rollup key: (user_id, category_id, first day of month)
+RollupKey = Tuple[int, int, date]
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class MonthlySpending:
+    """Monthly spending rollup model"""
+    
+    # Adds a delta to a rollup row, creating it if needed
+    _UPSERT = {
+        'mysql': """
+            INSERT INTO monthly_spending (user_id, category_id, month, total_amount, txn_count)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                total_amount = total_amount + VALUES(total_amount),
+                txn_count = txn_count + VALUES(txn_count)
+        """,
+        'sqlite': """
+            INSERT INTO monthly_spending (user_id, category_id, month, total_amount, txn_count)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (user_id, category_id, month) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                txn_count = txn_count + excluded.txn_count
+        """,
+    }
+    
+    # First day of the month of transaction_date
+    _MONTH_EXPR = {
+        'mysql': "DATE_SUB(transaction_date, INTERVAL DAYOFMONTH(transaction_date) - 1 DAY)",
+        'sqlite': "date(transaction_date, 'start of month')",
+    }
+    
+    # Totals are DECIMAL(10,2) sums; anything closer than this is equal
+    TOLERANCE = Decimal('0.005')
+    
+    @staticmethod
+    def month_of(transaction_date) -> date:
+        """First day of the month containing transaction_date"""
+        return as_date(transaction_date).replace(day=1)
+    
+    @staticmethod
+    def split_range(start_date, end_date) -> Tuple[Optional[Tuple[date, date]], List[Tuple[date, date]]]:
+        """
+        Split a date range into whole calendar months and leftover partial ranges
+    
+        Args:
+            start_date: First day of the range (inclusive)
+            end_date: Last day of the range (inclusive)
+    
+        Returns:
+            ((first_month, last_month) or None, [(start, end), ...]) where the
+            months are answered from the rollup and the partial ranges from
+            the transactions table
+        """
+        start, end = as_date(start_date), as_date(end_date)
+        first_month = start if start.day == 1 else _next_month(start.replace(day=1))
+        # First month that is not fully inside the range
+        month_end = _next_month(end) - timedelta(days=1)
+        stop_month = _next_month(end) if end == month_end else end.replace(day=1)
+        if first_month >= stop_month:
+            return None, [(start, end)]
+    
+        last_month = stop_month - timedelta(days=1)
+        partial = []
+        if start < first_month:
+            partial.append((start, first_month - timedelta(days=1)))
+        if stop_month <= end:
+            partial.append((stop_month, end))
+        return (first_month, last_month.replace(day=1)), partial
+    
+    @staticmethod
+    def deltas(added: Iterable[Sequence] = (), removed: Iterable[Sequence] = ()) -> Dict[RollupKey, List]:
+        """
+        Aggregate inserted and removed transactions into rollup deltas
+    
+        Args:
+            added: (user_id, category_id, amount, transaction_date, ...) tuples
+                   for new transactions (or the new state of updated ones)
+            removed: Tuples of the same shape for deleted transactions (or the
+                     old state of updated ones)
+    
+        Returns:
+            Dictionary of (user_id, category_id, month) -> [amount, count]
+        """
+        result = defaultdict(lambda: [Decimal('0.00'), 0])
+        for sign, transactions in ((1, added), (-1, removed)):
+            for txn in transactions:
+                entry = result[(txn[0], txn[1], MonthlySpending.month_of(txn[3]))]
+                entry[0] += sign * Decimal(str(txn[2]))
+                entry[1] += sign
+        return result
+    
+    @staticmethod
+    def apply(deltas: Dict[RollupKey, List]):
+        """
+        Add deltas to the rollup
+    
+        Call inside the session that changes the transactions so both are
+        committed together.
+    
+        Args:
+            deltas: Dictionary of (user_id, category_id, month) -> [amount, count]
+        """
+        rows = [key + (amount, count) for key, (amount, count) in sorted(deltas.items())
+                if amount or count]
+        if rows:
+            execute_many(MonthlySpending._UPSERT[DatabaseConfig.backend().name], rows)
+    
+    @staticmethod
+    def rebuild() -> int:
+        """
+        Recompute the whole rollup from the transactions table
+    
+        Returns:
+            Number of rollup rows written
+        """
+        month = MonthlySpending._MONTH_EXPR[DatabaseConfig.backend().name]
+        with DatabaseConfig.session():
+            execute_query("DELETE FROM monthly_spending")
+            execute_query(f"""
+                INSERT INTO monthly_spending (user_id, category_id, month, total_amount, txn_count)
+                SELECT user_id, category_id, {month}, SUM(amount), COUNT(*)
+                FROM transactions
+                GROUP BY 1, 2, 3
+            """)
+            result = execute_query("SELECT COUNT(*) AS count FROM monthly_spending", fetch=True)
+        return result[0]['count']
+    
+    @staticmethod
+    def check() -> List[Dict]:
+        """
+        Compare the rollup with a fresh aggregation of the transactions table
+    
+        Returns:
+            Mismatched rows with user_id, category_id, month and the expected
+            and stored total/count (empty when consistent)
+        """
+        month = MonthlySpending._MONTH_EXPR[DatabaseConfig.backend().name]
+        expected = {}
+        for row in stream_query(f"""
+            SELECT user_id, category_id, {month} AS month,
+                   SUM(amount) AS total_amount, COUNT(*) AS txn_count
+            FROM transactions
+            GROUP BY 1, 2, 3
+        """):
+            key = (row['user_id'], row['category_id'], as_date(row['month']))
+            expected[key] = (Decimal(str(row['total_amount'])), row['txn_count'])
+    
+        mismatches = []
+        zero = (Decimal('0.00'), 0)
+        for row in stream_query("SELECT * FROM monthly_spending"):
+            key = (row['user_id'], row['category_id'], as_date(row['month']))
+            stored = (Decimal(str(row['total_amount'])), row['txn_count'])
+            want = expected.pop(key, zero)
+            if abs(want[0] - stored[0]) > MonthlySpending.TOLERANCE or want[1] != stored[1]:
+                mismatches.append(MonthlySpending._mismatch(key, want, stored))
+        for key, want in expected.items():
+            mismatches.append(MonthlySpending._mismatch(key, want, zero))
+        return mismatches
+    
+    @staticmethod
+    def _mismatch(key: RollupKey, expected: tuple, stored: tuple) -> Dict:
+        return {
+            'user_id': key[0], 'category_id': key[1], 'month': key[2],
+            'expected_total': expected[0], 'expected_count': expected[1],
+            'stored_total': stored[0], 'stored_count': stored[1],
+        }
+    
+    @staticmethod
+    def get_by_user(user_id: int, start_month, end_month) -> List[Dict]:
+        """
+        Retrieve a user's rollup rows for a range of months
+    
+        Args:
+            user_id: The user's ID
+            start_month: First month (any day of it)
+            end_month: Last month (any day of it)
+    
+        Returns:
+            List of rollup rows as dictionaries, oldest month first
+        """
+        query = """
+            SELECT m.*, c.category_name
+            FROM monthly_spending m
+            JOIN categories c ON m.category_id = c.category_id
+            WHERE m.user_id = %s AND m.month BETWEEN %s AND %s AND m.txn_count > 0
+            ORDER BY m.month, c.category_name
+        """
+        return execute_query(query, (user_id, MonthlySpending.month_of(start_month),
+                                     MonthlySpending.month_of(end_month)), fetch=True)
@@ -3,14 +3,49 @@ Transaction Model - Data Access Layer
 Handles all database operations for transactions table
 """
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Iterator, Sequence, Tuple
 from datetime import datetime, date
 from decimal import Decimal
-from db_config import execute_query
+from itertools import islice
+import base64
+import json
+import threading
+from db_config import DatabaseConfig, execute_query, execute_many, stream_query
+from conversions import as_date
+from models.monthly_spending import MonthlySpending
+from text_index import TextIndex, tokenize
+import budget_alerts
+import dedupe
 
 class Transaction:
     """Transaction model representing individual spending entries"""
     
+    # In-process inverted index of descriptions by user for search on
+    # backends without a full-text index; users are loaded on first search
+    # and kept current by this model
+    _search_index: Optional[TextIndex] = None
+    _search_lock = threading.Lock()
+    
+    # MySQL's default innodb_ft_min_token_size; shorter words are not in the
+    # FULLTEXT index
+    FULLTEXT_MIN_WORD = 3
+    # Whether the FULLTEXT index exists (partitioned tables cannot have one);
+    # checked on first search
+    _has_fulltext: Optional[bool] = None
+    
+    # Filters of update_where and delete_where (besides transaction_ids), as
+    # SQL conditions; description matches a substring
+    _BULK_FILTERS = {
+        'user_id': "user_id = %s",
+        'category_id': "category_id = %s",
+        'payment_method': "payment_method = %s",
+        'start_date': "transaction_date >= %s",
+        'end_date': "transaction_date <= %s",
+        'description': "description LIKE %s ESCAPE '!'",
+    }
+    # Columns update_where may change
+    _BULK_COLUMNS = ('category_id', 'amount', 'transaction_date', 'description', 'payment_method')
+    
     def __init__(self, transaction_id: Optional[int] = None, user_id: int = 0,
                  category_id: int = 0, amount: Decimal = Decimal('0.00'),
                  transaction_date: Optional[date] = None, description: str = "",
@@ -29,7 +64,7 @@ class Transaction:
     @staticmethod
     def create(user_id: int, category_id: int, amount: float,
                transaction_date: str, description: str = "",
-               payment_method: str = "") -> int:
+               payment_method: str = "", duplicates: Optional[str] = None) -> Optional[int]:
         """
         Create a new transaction
         
@@ -40,19 +75,90 @@ class Transaction:
             transaction_date: Date of transaction (YYYY-MM-DD)
             description: Transaction description
             payment_method: Payment method used
+            duplicates: 'exact' (same fingerprint) or 'fuzzy' (near-duplicate
+                        within a few days) to skip a transaction that repeats a
+                        stored one (see dedupe.DuplicateFilter); None inserts it
+                        unconditionally
         
         Returns:
-            ID of the newly created transaction
+            ID of the newly created transaction, or None if it was skipped as
+            a duplicate
         """
         query = """
             INSERT INTO transactions (user_id, category_id, amount, transaction_date,
-                                     description, payment_method)
-            VALUES (%s, %s, %s, %s, %s, %s)
+                                     description, payment_method, fingerprint)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
-        transaction_id = execute_query(query, (user_id, category_id, amount,
-                                               transaction_date, description, payment_method))
+        fingerprint = dedupe.fingerprint(user_id, amount, transaction_date, description)
+        # The monthly_spending rollup and budget rule counters are updated in
+        # the same commit
+        with DatabaseConfig.session():
+            # The fingerprint lookup runs in the same transaction as the insert
+            row = (user_id, category_id, amount, transaction_date, description, payment_method)
+            if duplicates and dedupe.DuplicateFilter(duplicates).filter([row])[1]:
+                return None
+            transaction_id = execute_query(query, (user_id, category_id, amount,
+                                                   transaction_date, description, payment_method,
+                                                   fingerprint))
+            added = [(user_id, category_id, amount, transaction_date, transaction_id)]
+            MonthlySpending.apply(MonthlySpending.deltas(added=added))
+            budget_alerts.apply_transactions(added=added)
+            searchable = [(transaction_id, user_id, category_id, transaction_date, description)]
+            DatabaseConfig.on_commit(lambda: Transaction._index_search(searchable))
         return transaction_id
     
+    @staticmethod
+    def create_many(transactions: Iterable[Sequence],
+                    chunk_size: Optional[int] = None,
+                    duplicates: Optional[str] = None) -> List[Optional[int]]:
+        """
+        Create many transactions with batched multi-row INSERTs
+        
+        Args:
+            transactions: Iterable of (user_id, category_id, amount, transaction_date,
+                          description, payment_method) tuples; the last two are optional
+            chunk_size: Rows per INSERT/commit (defaults to DatabaseConfig.BATCH_SIZE)
+            duplicates: 'exact' or 'fuzzy' to skip rows that repeat transactions
+                        stored before the call, with one fingerprint index lookup
+                        per row in exact mode (see dedupe.DuplicateFilter); None
+                        inserts every row
+        
+        Returns:
+            IDs of the newly created transactions in input order, with None for
+            rows skipped as duplicates
+        """
+        query = """
+            INSERT INTO transactions (user_id, category_id, amount, transaction_date,
+                                     description, payment_method, fingerprint)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+        rows = (tuple(txn) + ("", "")[len(txn) - 4:] for txn in transactions)
+        rows = (row + (dedupe.fingerprint(row[0], row[2], row[3], row[4]),) for row in rows)
+        # Created before the first insert, so rows of this call never match each other
+        duplicate_filter = dedupe.DuplicateFilter(duplicates) if duplicates else None
+        ids = []
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return ids
+            repeated = set(duplicate_filter.filter(chunk)[1]) if duplicate_filter else set()
+            new_rows = [row for position, row in enumerate(chunk) if position not in repeated]
+            chunk_ids = []
+            if new_rows:
+                # Each chunk commits together with its rollup and counter updates
+                with DatabaseConfig.session():
+                    chunk_ids = execute_many(query, new_rows, chunk_size)
+                    added = [row[:4] + (txn_id,) for row, txn_id in zip(new_rows, chunk_ids)]
+                    MonthlySpending.apply(MonthlySpending.deltas(added=added))
+                    budget_alerts.apply_transactions(added=added)
+                    searchable = [(txn_id,) + row[:2] + (row[3], row[4])
+                                  for row, txn_id in zip(new_rows, chunk_ids)]
+                    DatabaseConfig.on_commit(lambda: Transaction._index_search(searchable))
+            inserted = iter(chunk_ids)
+            ids.extend(None if position in repeated else next(inserted)
+                       for position in range(len(chunk)))
+    
     @staticmethod
     def get_by_id(transaction_id: int) -> Optional[Dict]:
         """
@@ -93,10 +199,33 @@ class Transaction:
             WHERE t.user_id = %s
             ORDER BY t.transaction_date DESC, t.created_at DESC
         """
+        params = (user_id,)
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT %s"
+            params += (limit,)
+        
+        return execute_query(query, params, fetch=True, prepared=True)
+    
+    @staticmethod
+    def iter_by_user(user_id: int, batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream all transactions for a specific user without loading them at once
+        
+        Args:
+            user_id: The user's ID
+            batch_size: Rows fetched per round trip (optional)
         
-        return execute_query(query, (user_id,), fetch=True)
+        Yields:
+            Transactions as dictionaries, newest first
+        """
+        query = """
+            SELECT t.*, c.category_name, c.icon
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.category_id
+            WHERE t.user_id = %s
+            ORDER BY t.transaction_date DESC, t.created_at DESC
+        """
+        return stream_query(query, (user_id,), batch_size)
     
     @staticmethod
     def get_by_category(category_id: int, limit: Optional[int] = None) -> List[Dict]:
@@ -118,10 +247,12 @@ class Transaction:
             WHERE t.category_id = %s
             ORDER BY t.transaction_date DESC
         """
+        params = (category_id,)
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT %s"
+            params += (limit,)
         
-        return execute_query(query, (category_id,), fetch=True)
+        return execute_query(query, params, fetch=True)
     
     @staticmethod
     def get_by_date_range(user_id: int, start_date: str, end_date: str) -> List[Dict]:
@@ -143,7 +274,8 @@ class Transaction:
             WHERE t.user_id = %s AND t.transaction_date BETWEEN %s AND %s
             ORDER BY t.transaction_date DESC
         """
-        return execute_query(query, (user_id, start_date, end_date), fetch=True)
+        return execute_query(query, (user_id, start_date, end_date), fetch=True,
+                             prepared=True)
     
     @staticmethod
     def get_all(limit: Optional[int] = None) -> List[Dict]:
@@ -163,10 +295,232 @@ class Transaction:
             JOIN categories c ON t.category_id = c.category_id
             ORDER BY t.transaction_date DESC, t.created_at DESC
         """
+        params = ()
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT %s"
+            params += (limit,)
+        
+        return execute_query(query, params, fetch=True)
+    
+    @staticmethod
+    def iter_all(batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream all transactions without loading the whole table into memory
+        
+        Args:
+            batch_size: Rows fetched per round trip (optional)
+        
+        Yields:
+            Transactions as dictionaries, newest first
+        """
+        query = """
+            SELECT t.*, u.username, c.category_name
+            FROM transactions t
+            JOIN users u ON t.user_id = u.user_id
+            JOIN categories c ON t.category_id = c.category_id
+            ORDER BY t.transaction_date DESC, t.created_at DESC
+        """
+        return stream_query(query, batch_size=batch_size)
+    
+    @staticmethod
+    def iter_chunks(user_id: Optional[int] = None, start_date: Optional[str] = None,
+                    end_date: Optional[str] = None,
+                    chunk_size: Optional[int] = None) -> Iterator[List]:
+        """
+        Page through transactions in bounded chunks for bulk export
+    
+        Each chunk is a separate keyset query ordered oldest first by
+        (transaction_date, created_at, transaction_id), the order of the
+        date indexes, so no connection or cursor is held between chunks and
+        every chunk costs the same. The filters use the same predicates as
+        get_page_by_user and get_by_date_range.
+    
+        Args:
+            user_id: Only this user's transactions (optional)
+            start_date: Earliest transaction date, inclusive (optional)
+            end_date: Latest transaction date, inclusive (optional)
+            chunk_size: Rows per chunk (defaults to DatabaseConfig.STREAM_BATCH_SIZE)
+    
+        Yields:
+            Lists of compact records with transaction_id, user_id, username,
+            category_id, category_name, amount, transaction_date, description,
+            payment_method and created_at
+        """
+        chunk_size = chunk_size or DatabaseConfig.STREAM_BATCH_SIZE
+        conditions = []
+        params = ()
+        if user_id is not None:
+            conditions.append("t.user_id = %s")
+            params += (user_id,)
+        if start_date is not None:
+            conditions.append("t.transaction_date >= %s")
+            params += (start_date,)
+        if end_date is not None:
+            conditions.append("t.transaction_date <= %s")
+            params += (end_date,)
+    
+        select = """
+            SELECT t.transaction_id, t.user_id, u.username, t.category_id, c.category_name,
+                   t.amount, t.transaction_date, t.description, t.payment_method, t.created_at
+            FROM transactions t
+            JOIN users u ON t.user_id = u.user_id
+            JOIN categories c ON t.category_id = c.category_id
+        """
+        order = "ORDER BY t.transaction_date, t.created_at, t.transaction_id LIMIT %s"
+        first = f"{select} {'WHERE ' + ' AND '.join(conditions) if conditions else ''} {order}"
+        following = f"""{select} WHERE {' AND '.join(conditions + [
+            "(t.transaction_date, t.created_at, t.transaction_id) > (%s, %s, %s)"])} {order}"""
+    
+        query, position = first, ()
+        while True:
+            # A one-off bulk read, so it bypasses the query cache
+            rows = execute_query(query, params + position + (chunk_size,), fetch=True,
+                                 compact=True, cache=False)
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1]
+            query, position = following, (last.transaction_date, last.created_at,
+                                          last.transaction_id)
+    
+    @staticmethod
+    def _encode_page_token(row: Dict, direction: str) -> str:
+        """Opaque continuation token holding the keyset position of a row"""
+        created_at = row['created_at']
+        position = [str(row['transaction_date']),
+                    created_at.isoformat(" ") if created_at else None,
+                    row['transaction_id'], direction]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+    
+    @staticmethod
+    def _decode_page_token(page_token: str) -> Tuple[tuple, str]:
+        """Inverse of _encode_page_token: ((date, created_at, id), direction)"""
+        try:
+            transaction_date, created_at, transaction_id, direction = json.loads(
+                base64.urlsafe_b64decode(page_token.encode()))
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid page token") from e
+        if direction not in ("next", "prev"):
+            raise ValueError("Invalid page token")
+        return (transaction_date, created_at, int(transaction_id)), direction
+    
+    @staticmethod
+    def _get_page(select: str, conditions: List[str], params: tuple,
+                  page_size: int, page_token: Optional[str]) -> Dict:
+        """
+        Run one keyset-paginated listing query
+        
+        Rows are ordered newest first by (transaction_date, created_at,
+        transaction_id). Instead of OFFSET, each page seeks past the last row
+        of the previous one, so deep pages cost the same as the first.
+        """
+        direction = "next"
+        if page_token:
+            position, direction = Transaction._decode_page_token(page_token)
+            # Row-value comparison, served by an index on the sort columns
+            comparison = "<" if direction == "next" else ">"
+            conditions = conditions + [
+                f"(t.transaction_date, t.created_at, t.transaction_id) {comparison} (%s, %s, %s)"]
+            params = params + position
+        
+        order = "DESC" if direction == "next" else "ASC"
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            {select}
+            {where}
+            ORDER BY t.transaction_date {order}, t.created_at {order}, t.transaction_id {order}
+            LIMIT %s
+        """
+        # One extra row tells whether another page exists in this direction
+        rows = execute_query(query, params + (page_size + 1,), fetch=True, prepared=True)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == "prev":
+            rows.reverse()
+        
+        if direction == "next":
+            more_after, more_before = has_more, page_token is not None
+        else:
+            more_after, more_before = True, has_more
+        
+        next_page = prev_page = None
+        if rows:
+            if more_after:
+                next_page = Transaction._encode_page_token(rows[-1], "next")
+            if more_before:
+                prev_page = Transaction._encode_page_token(rows[0], "prev")
+        
+        return {'items': rows, 'next_page': next_page, 'prev_page': prev_page}
+    
+    @staticmethod
+    def get_page_by_user(user_id: int, page_size: int = 50,
+                         page_token: Optional[str] = None) -> Dict:
+        """
+        Retrieve one page of a user's transactions, newest first
+        
+        Args:
+            user_id: The user's ID
+            page_size: Maximum transactions per page
+            page_token: next_page / prev_page token from a previous call (optional)
+        
+        Returns:
+            Dictionary with 'items' (transactions as dictionaries) and
+            'next_page' / 'prev_page' tokens (None at either end)
+        """
+        select = """
+            SELECT t.*, c.category_name, c.icon
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.category_id
+        """
+        return Transaction._get_page(select, ["t.user_id = %s"], (user_id,),
+                                     page_size, page_token)
+    
+    @staticmethod
+    def get_page_by_category(category_id: int, page_size: int = 50,
+                             page_token: Optional[str] = None) -> Dict:
+        """
+        Retrieve one page of a category's transactions, newest first
+        
+        Args:
+            category_id: The category's ID
+            page_size: Maximum transactions per page
+            page_token: next_page / prev_page token from a previous call (optional)
+        
+        Returns:
+            Dictionary with 'items' (transactions as dictionaries) and
+            'next_page' / 'prev_page' tokens (None at either end)
+        """
+        select = """
+            SELECT t.*, u.username, c.category_name
+            FROM transactions t
+            JOIN users u ON t.user_id = u.user_id
+            JOIN categories c ON t.category_id = c.category_id
+        """
+        return Transaction._get_page(select, ["t.category_id = %s"], (category_id,),
+                                     page_size, page_token)
+    
+    @staticmethod
+    def get_page(page_size: int = 50, page_token: Optional[str] = None) -> Dict:
+        """
+        Retrieve one page of all transactions, newest first
+        
+        Args:
+            page_size: Maximum transactions per page
+            page_token: next_page / prev_page token from a previous call (optional)
         
-        return execute_query(query, fetch=True)
+        Returns:
+            Dictionary with 'items' (transactions as dictionaries) and
+            'next_page' / 'prev_page' tokens (None at either end)
+        """
+        select = """
+            SELECT t.*, u.username, c.category_name
+            FROM transactions t
+            JOIN users u ON t.user_id = u.user_id
+            JOIN categories c ON t.category_id = c.category_id
+        """
+        return Transaction._get_page(select, [], (), page_size, page_token)
     
     @staticmethod
     def update(transaction_id: int, category_id: Optional[int] = None,
@@ -210,7 +564,21 @@ class Transaction:
         
         params.append(transaction_id)
         query = f"UPDATE transactions SET {', '.join(updates)} WHERE transaction_id = %s"
-        execute_query(query, tuple(params))
+        with DatabaseConfig.session():
+            old = Transaction._get_for_update(transaction_id)
+            execute_query(query, tuple(params))
+            if old is not None and (category_id, amount, transaction_date) != (None, None, None):
+                new = (old[0],
+                       old[1] if category_id is None else category_id,
+                       old[2] if amount is None else amount,
+                       old[3] if transaction_date is None else transaction_date,
+                       transaction_id)
+                MonthlySpending.apply(MonthlySpending.deltas(added=[new], removed=[old]))
+                budget_alerts.apply_transactions(added=[new], removed=[old])
+            if (amount, transaction_date, description) != (None, None, None):
+                Transaction._refresh_fingerprint(transaction_id)
+            if (category_id, transaction_date, description) != (None, None, None):
+                DatabaseConfig.on_commit(lambda: Transaction._reindex_search(transaction_id))
         return True
     
     @staticmethod
@@ -225,9 +593,469 @@ class Transaction:
             True if deletion successful
         """
         query = "DELETE FROM transactions WHERE transaction_id = %s"
-        execute_query(query, (transaction_id,))
+        with DatabaseConfig.session():
+            old = Transaction._get_for_update(transaction_id)
+            execute_query(query, (transaction_id,))
+            if old is not None:
+                MonthlySpending.apply(MonthlySpending.deltas(removed=[old]))
+                budget_alerts.apply_transactions(removed=[old])
+            DatabaseConfig.on_commit(lambda: Transaction._unindex_search(transaction_id))
         return True
     
+    @staticmethod
+    def update_where(filters: Dict, changes: Dict, chunk_size: Optional[int] = None) -> int:
+        """
+        Update every transaction matching filters with set-based statements
+        
+        Matching rows are read and updated in chunks by transaction ID, one
+        UPDATE per chunk, each committed together with its rollup, budget
+        counter and fingerprint changes, as Transaction.update would.
+        
+        Args:
+            filters: At least one of transaction_ids (iterable of IDs), user_id,
+                     category_id, payment_method, start_date, end_date (inclusive)
+                     and description (substring)
+            changes: New values for any of category_id, amount, transaction_date,
+                     description and payment_method
+            chunk_size: Rows per chunk (defaults to DatabaseConfig.BATCH_SIZE)
+        
+        Returns:
+            Number of transactions updated
+        """
+        unknown = set(changes) - set(Transaction._BULK_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot bulk update {', '.join(sorted(unknown))}")
+        if not changes:
+            return 0
+        rollup = bool({'category_id', 'amount', 'transaction_date'} & set(changes))
+        fingerprinted = bool({'amount', 'transaction_date', 'description'} & set(changes))
+        searchable = bool({'category_id', 'transaction_date', 'description'} & set(changes))
+        assignments = [f"{column} = %s" for column in changes]
+        
+        def apply(rows):
+            ids = [row.transaction_id for row in rows]
+            new = [(row.user_id,
+                    changes.get('category_id', row.category_id),
+                    changes.get('amount', row.amount),
+                    changes.get('transaction_date', row.transaction_date),
+                    row.transaction_id,
+                    changes.get('description', row.description)) for row in rows]
+            sets, params = list(assignments), list(changes.values())
+            if fingerprinted:
+                sets.append(f"fingerprint = CASE transaction_id "
+                            f"{' '.join(['WHEN %s THEN %s'] * len(new))} END")
+                for txn in new:
+                    params.extend((txn[4], dedupe.fingerprint(txn[0], txn[2], txn[3], txn[5])))
+            execute_query(f"UPDATE transactions SET {', '.join(sets)} "
+                          f"WHERE transaction_id IN ({', '.join(['%s'] * len(ids))})",
+                          tuple(params) + tuple(ids))
+            if rollup:
+                removed = [(row.user_id, row.category_id, row.amount, row.transaction_date,
+                            row.transaction_id) for row in rows]
+                added = [txn[:5] for txn in new]
+                MonthlySpending.apply(MonthlySpending.deltas(added=added, removed=removed))
+                budget_alerts.apply_transactions(added=added, removed=removed)
+            if searchable:
+                indexed = [(txn[4], txn[0], txn[1], txn[3], txn[5]) for txn in new]
+                DatabaseConfig.on_commit(lambda: Transaction._index_search(indexed))
+        
+        return Transaction._bulk_apply(filters, apply, chunk_size)
+    
+    @staticmethod
+    def recategorize(transaction_ids: Iterable[int], category_id: int,
+                     chunk_size: Optional[int] = None) -> int:
+        """
+        Move many transactions to one category
+        
+        Args:
+            transaction_ids: IDs of the transactions
+            category_id: New category ID
+            chunk_size: IDs per UPDATE (defaults to DatabaseConfig.BATCH_SIZE)
+        
+        Returns:
+            Number of transactions updated
+        """
+        return Transaction.update_where({'transaction_ids': transaction_ids},
+                                        {'category_id': category_id}, chunk_size)
+    
+    @staticmethod
+    def delete_where(filters: Dict, chunk_size: Optional[int] = None) -> int:
+        """
+        Delete every transaction matching filters with set-based statements
+        
+        Matching rows are deleted in chunks by transaction ID, one DELETE per
+        chunk, each committed together with its rollup and budget counter
+        changes, as Transaction.delete would.
+        
+        Args:
+            filters: As for update_where
+            chunk_size: Rows per chunk (defaults to DatabaseConfig.BATCH_SIZE)
+        
+        Returns:
+            Number of transactions deleted
+        """
+        def apply(rows):
+            ids = [row.transaction_id for row in rows]
+            execute_query(f"DELETE FROM transactions WHERE transaction_id IN "
+                          f"({', '.join(['%s'] * len(ids))})", tuple(ids))
+            removed = [(row.user_id, row.category_id, row.amount, row.transaction_date,
+                        row.transaction_id) for row in rows]
+            MonthlySpending.apply(MonthlySpending.deltas(removed=removed))
+            budget_alerts.apply_transactions(removed=removed)
+            DatabaseConfig.on_commit(lambda: [Transaction._unindex_search(transaction_id)
+                                              for transaction_id in ids])
+        
+        return Transaction._bulk_apply(filters, apply, chunk_size)
+    
+    @staticmethod
+    def delete_range(user_id: int, start_date: str, end_date: str,
+                     chunk_size: Optional[int] = None) -> int:
+        """
+        Delete a user's transactions within a date range
+        
+        Args:
+            user_id: The user's ID
+            start_date: Start date (YYYY-MM-DD), inclusive
+            end_date: End date (YYYY-MM-DD), inclusive
+            chunk_size: Rows per DELETE (defaults to DatabaseConfig.BATCH_SIZE)
+        
+        Returns:
+            Number of transactions deleted
+        """
+        return Transaction.delete_where({'user_id': user_id, 'start_date': start_date,
+                                         'end_date': end_date}, chunk_size)
+    
+    @staticmethod
+    def _bulk_apply(filters: Dict, apply, chunk_size: Optional[int]) -> int:
+        """
+        Run apply on the transactions matching bulk filters, one session per chunk
+        
+        Chunks are read inside their session (locked FOR UPDATE on MySQL), so
+        the rollup and counter changes made by apply match the rows changed.
+        A transaction_ids filter is split into chunks of IDs; other filters
+        are walked in transaction ID order.
+        
+        Returns:
+            Number of rows passed to apply
+        """
+        unknown = set(filters) - set(Transaction._BULK_FILTERS) - {'transaction_ids'}
+        if unknown:
+            raise ValueError(f"Unknown filter(s) {', '.join(sorted(unknown))}")
+        if not filters:
+            raise ValueError("Bulk changes need at least one filter")
+        chunk_size = chunk_size or DatabaseConfig.BATCH_SIZE
+        
+        conditions, params = [], []
+        for name, condition in Transaction._BULK_FILTERS.items():
+            if name in filters:
+                value = filters[name]
+                if name == 'description':
+                    value = "%" + "".join("!" + char if char in "!%_" else char
+                                          for char in value) + "%"
+                conditions.append(condition)
+                params.append(value)
+        select = f"""
+            SELECT transaction_id, user_id, category_id, amount, transaction_date,
+                   description, payment_method
+            FROM transactions
+            WHERE {' AND '.join(conditions + ['{chunk}'])}
+        """
+        lock = " FOR UPDATE" if DatabaseConfig.backend().name == "mysql" else ""
+        
+        affected = 0
+        if 'transaction_ids' in filters:
+            ids = sorted(set(filters['transaction_ids']))
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                query = select.format(
+                    chunk=f"transaction_id IN ({', '.join(['%s'] * len(chunk))})") + lock
+                with DatabaseConfig.session():
+                    rows = execute_query(query, tuple(params) + tuple(chunk), fetch=True,
+                                         compact=True, cache=False)
+                    if rows:
+                        apply(rows)
+                affected += len(rows)
+            return affected
+        
+        query = (select.format(chunk="transaction_id > %s")
+                 + " ORDER BY transaction_id LIMIT %s" + lock)
+        last_id = 0
+        while True:
+            with DatabaseConfig.session():
+                rows = execute_query(query, tuple(params) + (last_id, chunk_size), fetch=True,
+                                     compact=True, cache=False)
+                if rows:
+                    apply(rows)
+            if not rows:
+                return affected
+            affected += len(rows)
+            last_id = rows[-1].transaction_id
+    
+    @staticmethod
+    def _refresh_fingerprint(transaction_id: int):
+        """Recompute the duplicate-detection fingerprint of an updated transaction"""
+        rows = execute_query("""
+            SELECT user_id, amount, transaction_date, description
+            FROM transactions
+            WHERE transaction_id = %s
+        """, (transaction_id,), fetch=True)
+        if rows:
+            row = rows[0]
+            execute_query("UPDATE transactions SET fingerprint = %s WHERE transaction_id = %s",
+                          (dedupe.fingerprint(row['user_id'], row['amount'],
+                                              row['transaction_date'], row['description']),
+                           transaction_id))
+    
+    @staticmethod
+    def find_duplicate(user_id: int, amount: float, transaction_date: str,
+                       description: str = "") -> Optional[Dict]:
+        """
+        Find a stored transaction with the same fingerprint
+        
+        Matches on user, amount, date and description (compared case- and
+        punctuation-insensitively) with one lookup on the fingerprint index.
+        
+        Args:
+            user_id: ID of the user
+            amount: Transaction amount
+            transaction_date: Date of transaction (YYYY-MM-DD)
+            description: Transaction description
+        
+        Returns:
+            The oldest matching transaction as a dictionary, or None
+        """
+        query = """
+            SELECT * FROM transactions
+            WHERE fingerprint = %s
+            ORDER BY transaction_id
+            LIMIT 1
+        """
+        results = execute_query(query, (dedupe.fingerprint(user_id, amount, transaction_date,
+                                                           description),), fetch=True)
+        return results[0] if results else None
+    
+    @staticmethod
+    def _searchable(user_id: int) -> TextIndex:
+        """Return the description index with the user's transactions loaded"""
+        with Transaction._search_lock:
+            if Transaction._search_index is None:
+                Transaction._search_index = TextIndex()
+            index = Transaction._search_index
+            if not index.loaded(user_id):
+                rows = stream_query("""
+                    SELECT transaction_id, description, transaction_date, category_id
+                    FROM transactions
+                    WHERE user_id = %s
+                    ORDER BY transaction_id
+                """, (user_id,), compact=True)
+                index.load_key(user_id, ((row[0], row[1], (as_date(row[2]), row[3]))
+                                         for row in rows))
+            return index
+    
+    @staticmethod
+    def _index_search(rows: Sequence[tuple]):
+        """
+        Add committed transactions to the description index
+        
+        Args:
+            rows: (transaction_id, user_id, category_id, transaction_date,
+                  description) tuples; users not loaded yet are skipped
+        """
+        index = Transaction._search_index
+        if index is None:
+            return
+        for transaction_id, user_id, category_id, transaction_date, description in rows:
+            index.put(transaction_id, user_id, description,
+                      (as_date(transaction_date), category_id))
+    
+    @staticmethod
+    def _reindex_search(transaction_id: int):
+        """Refresh one transaction in the description index after a committed change"""
+        if Transaction._search_index is None:
+            return
+        rows = execute_query("""
+            SELECT transaction_id, user_id, category_id, transaction_date, description
+            FROM transactions
+            WHERE transaction_id = %s
+        """, (transaction_id,), fetch=True, compact=True, cache=False)
+        if rows:
+            Transaction._index_search(rows)
+        else:
+            Transaction._unindex_search(transaction_id)
+    
+    @staticmethod
+    def _unindex_search(transaction_id: int):
+        """Drop a deleted transaction from the description index"""
+        if Transaction._search_index is not None:
+            Transaction._search_index.remove(transaction_id)
+    
+    @staticmethod
+    def unindex_search_user(user_id: int):
+        """Drop all transactions of a deleted user from the description index"""
+        if Transaction._search_index is not None:
+            Transaction._search_index.remove_key(user_id)
+    
+    @staticmethod
+    def reload_search_index():
+        """
+        Discard the description index so each user is reloaded on next search
+        
+        The index only sees changes made through this process's models;
+        call this after transactions were changed elsewhere.
+        """
+        with Transaction._search_lock:
+            Transaction._search_index = None
+            Transaction._has_fulltext = None
+    
+    @staticmethod
+    def _fulltext_available() -> bool:
+        """Whether MySQL has the FULLTEXT index on transactions.description"""
+        if Transaction._has_fulltext is None:
+            rows = execute_query("""
+                SELECT COUNT(*) AS count
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+                    AND INDEX_TYPE = 'FULLTEXT'
+            """, fetch=True, cache=False)
+            Transaction._has_fulltext = bool(rows and rows[0]['count'])
+        return Transaction._has_fulltext
+    
+    @staticmethod
+    def _encode_search_token(offset: int) -> str:
+        """Opaque continuation token holding a position in ranked search results"""
+        return base64.urlsafe_b64encode(json.dumps(["search", offset]).encode()).decode()
+    
+    @staticmethod
+    def _decode_search_token(page_token: str) -> int:
+        """Inverse of _encode_search_token"""
+        try:
+            kind, offset = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid page token") from e
+        if kind != "search" or not isinstance(offset, int) or offset < 0:
+            raise ValueError("Invalid page token")
+        return offset
+    
+    @staticmethod
+    def search(user_id: int, text: str, start_date: Optional[str] = None,
+               end_date: Optional[str] = None, category_id: Optional[int] = None,
+               page_size: int = 20, page_token: Optional[str] = None) -> Dict:
+        """
+        Search a user's transaction descriptions, best match first
+        
+        Every word of the text must occur in the description, and each word
+        also matches longer words it starts ("star" finds "Starbucks"). On
+        MySQL the FULLTEXT index finds and ranks the matches. Otherwise (for
+        words shorter than FULLTEXT_MIN_WORD, or a partitioned table without
+        the index) an in-process inverted index of the user's descriptions
+        does; it is loaded on the user's first search and kept current by
+        this model's writes.
+        
+        Args:
+            user_id: The user's ID
+            text: Words to look for
+            start_date: Earliest transaction date, inclusive (optional)
+            end_date: Latest transaction date, inclusive (optional)
+            category_id: Only this category (optional)
+            page_size: Maximum transactions per page
+            page_token: next_page / prev_page token from a previous call (optional)
+        
+        Returns:
+            Dictionary with 'items' (transactions as dictionaries with
+            category_name, icon and a relevance score) and 'next_page' /
+            'prev_page' tokens (None at either end)
+        """
+        offset = Transaction._decode_search_token(page_token) if page_token else 0
+        words = list(dict.fromkeys(tokenize(text)))
+        rows = []
+        if (words and DatabaseConfig.backend().name == "mysql"
+                and min(len(word) for word in words) >= Transaction.FULLTEXT_MIN_WORD
+                and Transaction._fulltext_available()):
+            # Boolean mode: every word required (+), prefix match (*)
+            against = " ".join(f"+{word}*" for word in words)
+            conditions = ["t.user_id = %s", "MATCH(t.description) AGAINST (%s IN BOOLEAN MODE)"]
+            params = (against, user_id, against)
+            if start_date:
+                conditions.append("t.transaction_date >= %s")
+                params += (start_date,)
+            if end_date:
+                conditions.append("t.transaction_date <= %s")
+                params += (end_date,)
+            if category_id is not None:
+                conditions.append("t.category_id = %s")
+                params += (category_id,)
+            query = f"""
+                SELECT t.*, c.category_name, c.icon,
+                       MATCH(t.description) AGAINST (%s IN BOOLEAN MODE) AS score
+                FROM transactions t
+                JOIN categories c ON t.category_id = c.category_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score DESC, t.transaction_id DESC
+                LIMIT %s OFFSET %s
+            """
+            rows = execute_query(query, params + (page_size + 1, offset), fetch=True)
+        elif words:
+            first = as_date(start_date) if start_date else None
+            last = as_date(end_date) if end_date else None
+            
+            def wanted(payload) -> bool:
+                day, category = payload
+                return ((first is None or day >= first) and (last is None or day <= last)
+                        and (category_id is None or category == category_id))
+            
+            ranked = Transaction._searchable(user_id).search(
+                user_id, " ".join(words), where=wanted)[offset:offset + page_size + 1]
+            if ranked:
+                query = f"""
+                    SELECT t.*, c.category_name, c.icon
+                    FROM transactions t
+                    JOIN categories c ON t.category_id = c.category_id
+                    WHERE t.transaction_id IN ({', '.join(['%s'] * len(ranked))})
+                """
+                found = {row['transaction_id']: row
+                         for row in execute_query(query, tuple(doc_id for _, doc_id in ranked),
+                                                  fetch=True, compact=False)}
+                for score, doc_id in ranked:
+                    row = found.get(doc_id)
+                    if row is not None:
+                        row['score'] = score
+                        rows.append(row)
+        
+        has_more = len(rows) > page_size
+        return {
+            'items': rows[:page_size],
+            'next_page': Transaction._encode_search_token(offset + page_size) if has_more else None,
+            'prev_page': (Transaction._encode_search_token(max(offset - page_size, 0))
+                          if offset else None),
+        }
+    
+    @staticmethod
+    def _get_for_update(transaction_id: int) -> Optional[tuple]:
+        """
+        Read the rollup and budget counter fields of a transaction inside the session
+        
+        On MySQL the row stays locked until the session commits, so the
+        rollup delta matches the row that is changed. SQLite serializes
+        writers, and a write after a stale read fails instead.
+        
+        Returns:
+            (user_id, category_id, amount, transaction_date, transaction_id)
+            or None if not found
+        """
+        query = """
+            SELECT user_id, category_id, amount, transaction_date
+            FROM transactions
+            WHERE transaction_id = %s
+        """
+        if DatabaseConfig.backend().name == "mysql":
+            query += " FOR UPDATE"
+        rows = execute_query(query, (transaction_id,), fetch=True)
+        if not rows:
+            return None
+        row = rows[0]
+        return (row['user_id'], row['category_id'], row['amount'], row['transaction_date'],
+                transaction_id)
+    
     @staticmethod
     def count() -> int:
         """
@@ -241,7 +1069,38 @@ class Transaction:
         return result[0]['count'] if result else 0
     
     @staticmethod
-    def get_spending_by_category(user_id: int, start_date: str, end_date: str) -> List[Dict]:
+    def _spending_source(user_id: int, start_date: str, end_date: str) -> Tuple[str, tuple]:
+        """
+        Subquery yielding (category_id, amount, txn_count) rows for a user's date range
+        
+        Whole calendar months are read from the monthly_spending rollup and
+        only the partial months at either end from transactions, so the cost
+        depends on the number of months rather than transactions.
+        """
+        months, partial = None, [(start_date, end_date)]
+        if DatabaseConfig.USE_SPENDING_ROLLUP:
+            months, partial = MonthlySpending.split_range(start_date, end_date)
+        
+        parts, params = [], ()
+        if months:
+            parts.append("""
+                SELECT category_id, total_amount AS amount, txn_count
+                FROM monthly_spending
+                WHERE user_id = %s AND month BETWEEN %s AND %s
+            """)
+            params += (user_id,) + months
+        for start, end in partial:
+            parts.append("""
+                SELECT category_id, amount, 1 AS txn_count
+                FROM transactions
+                WHERE user_id = %s AND transaction_date BETWEEN %s AND %s
+            """)
+            params += (user_id, start, end)
+        return " UNION ALL ".join(parts), params
+    
+    @staticmethod
+    def get_spending_by_category(user_id: int, start_date: str, end_date: str,
+                                 include_archive: bool = False) -> List[Dict]:
         """
         Get total spending by category for a user within a date range
         
@@ -249,20 +1108,59 @@ class Transaction:
             user_id: The user's ID
             start_date: Start date (YYYY-MM-DD)
             end_date: End date (YYYY-MM-DD)
+            include_archive: Add transactions archived out of the table, read
+                             from the memory-mapped history file (see
+                             history_archive.py; needs NumPy)
         
         Returns:
             List of categories with total spending
         """
-        query = """
-            SELECT c.category_name, c.icon, SUM(t.amount) as total_spent,
-                   COUNT(t.transaction_id) as transaction_count
-            FROM transactions t
-            JOIN categories c ON t.category_id = c.category_id
-            WHERE t.user_id = %s AND t.transaction_date BETWEEN %s AND %s
+        source, params = Transaction._spending_source(user_id, start_date, end_date)
+        query = f"""
+            SELECT c.category_id, c.category_name, c.icon, SUM(s.amount) as total_spent,
+                   CAST(SUM(s.txn_count) AS SIGNED) as transaction_count
+            FROM ({source}) s
+            JOIN categories c ON s.category_id = c.category_id
             GROUP BY c.category_id
+            HAVING SUM(s.txn_count) > 0
             ORDER BY total_spent DESC
         """
-        return execute_query(query, (user_id, start_date, end_date), fetch=True)
+        results = execute_query(query, params, fetch=True)
+        if include_archive:
+            results = Transaction._merge_archived_spending(results, user_id, start_date, end_date)
+        return results
+    
+    @staticmethod
+    def _merge_archived_spending(results: List[Dict], user_id: int, start_date: str,
+                                 end_date: str) -> List[Dict]:
+        """Add the history file's per-category totals to get_spending_by_category rows"""
+        import history_archive
+        history = history_archive.open_history()
+        if history is None:
+            return results
+        archived = history.spending_by_category(user_id, start_date, end_date)
+        if not archived:
+            return results
+        
+        # New dictionaries: the live rows may be shared with the query cache
+        merged = {row['category_id']: dict(row) for row in results}
+        missing = [category_id for category_id in archived if category_id not in merged]
+        if missing:
+            query = f"""
+                SELECT category_id, category_name, icon
+                FROM categories
+                WHERE category_id IN ({', '.join(['%s'] * len(missing))})
+            """
+            for category in execute_query(query, tuple(missing), fetch=True):
+                merged[category['category_id']] = dict(category, total_spent=Decimal('0.00'),
+                                                       transaction_count=0)
+        for category_id, (cents, count) in archived.items():
+            row = merged.get(category_id)
+            if row is None:
+                continue
+            row['total_spent'] += Decimal(cents).scaleb(-2)
+            row['transaction_count'] += count
+        return sorted(merged.values(), key=lambda row: row['total_spent'], reverse=True)
     
     @staticmethod
     def get_total_spending(user_id: int, start_date: str, end_date: str) -> Decimal:
@@ -277,13 +1175,70 @@ class Transaction:
         Returns:
             Total spending amount
         """
-        query = """
-            SELECT COALESCE(SUM(amount), 0) as total
-            FROM transactions
-            WHERE user_id = %s AND transaction_date BETWEEN %s AND %s
+        source, params = Transaction._spending_source(user_id, start_date, end_date)
+        query = f"""
+            SELECT COALESCE(SUM(s.amount), 0) as total
+            FROM ({source}) s
         """
-        result = execute_query(query, (user_id, start_date, end_date), fetch=True)
+        result = execute_query(query, params, fetch=True)
         return result[0]['total'] if result else Decimal('0.00')
     
+    @staticmethod
+    def get_spending_report(user_id: int, start_date: str, end_date: str) -> Optional[Dict]:
+        """
+        Get a user's spending summary for a date range in one statement
+        
+        The per-category breakdown, the grand total and the user header come
+        back from a single query: categories are aggregated once and window
+        functions add the totals to every row.
+        
+        Args:
+            user_id: The user's ID
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+        
+        Returns:
+            Dictionary with 'user' (user_id, username, email), 'categories'
+            (category_name, icon, total_spent, transaction_count; largest
+            first), 'total' and 'transaction_count', or None if the user
+            does not exist
+        """
+        source, params = Transaction._spending_source(user_id, start_date, end_date)
+        query = f"""
+            SELECT u.user_id, u.username, u.email,
+                   s.category_name, s.icon, s.total_spent, s.transaction_count,
+                   SUM(s.total_spent) OVER () as grand_total,
+                   CAST(SUM(s.transaction_count) OVER () AS SIGNED) as grand_count
+            FROM users u
+            LEFT JOIN (
+                SELECT c.category_name, c.icon, SUM(src.amount) as total_spent,
+                       CAST(SUM(src.txn_count) AS SIGNED) as transaction_count
+                FROM ({source}) src
+                JOIN categories c ON src.category_id = c.category_id
+                GROUP BY c.category_id
+                HAVING SUM(src.txn_count) > 0
+            ) s ON 1 = 1
+            WHERE u.user_id = %s
+            ORDER BY s.total_spent DESC
+        """
+        rows = execute_query(query, params + (user_id,), fetch=True)
+        if not rows:
+            return None
+        
+        first = rows[0]
+        categories = [{
+            'category_name': row['category_name'],
+            'icon': row['icon'],
+            'total_spent': row['total_spent'],
+            'transaction_count': row['transaction_count'],
+        } for row in rows if row['category_name'] is not None]
+        return {
+            'user': {'user_id': first['user_id'], 'username': first['username'],
+                     'email': first['email']},
+            'categories': categories,
+            'total': first['grand_total'] if categories else Decimal('0.00'),
+            'transaction_count': first['grand_count'] if categories else 0,
+        }
+    
     def __repr__(self):
         return f"Transaction(id={self.transaction_id}, amount=${self.amount}, date={self.transaction_date})"
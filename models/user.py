@@ -3,9 +3,11 @@ User Model - Data Access Layer
 Handles all database operations for users table
 """
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator
 from datetime import datetime
-from db_config import execute_query
+from db_config import DatabaseConfig, execute_query, stream_query
+from models.budget import Budget
+from models.transaction import Transaction
 
 class User:
     """User model representing a user in the budget tracker"""
@@ -53,7 +55,7 @@ class User:
             User data as dictionary or None if not found
         """
         query = "SELECT * FROM users WHERE user_id = %s"
-        results = execute_query(query, (user_id,), fetch=True)
+        results = execute_query(query, (user_id,), fetch=True, prepared=True)
         return results[0] if results else None
     
     @staticmethod
@@ -97,6 +99,20 @@ class User:
         query = "SELECT * FROM users ORDER BY created_at DESC"
         return execute_query(query, fetch=True)
     
+    @staticmethod
+    def iter_all(batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream all users without loading the whole table into memory
+        
+        Args:
+            batch_size: Rows fetched per round trip (optional)
+        
+        Yields:
+            Users as dictionaries
+        """
+        query = "SELECT * FROM users ORDER BY created_at DESC"
+        return stream_query(query, batch_size=batch_size)
+    
     @staticmethod
     def update(user_id: int, username: Optional[str] = None, 
                email: Optional[str] = None, password_hash: Optional[str] = None) -> bool:
@@ -145,7 +161,14 @@ class User:
             True if deletion successful
         """
         query = "DELETE FROM users WHERE user_id = %s"
-        execute_query(query, (user_id,))
+        with DatabaseConfig.session():
+            # A partitioned transactions table has no foreign key to cascade
+            # from (see partitions.py), so its rows are deleted explicitly
+            execute_query("DELETE FROM transactions WHERE user_id = %s", (user_id,))
+            execute_query(query, (user_id,))
+        # The user's budgets were removed by the cascade
+        DatabaseConfig.on_commit(lambda: Budget.unindex_user(user_id))
+        DatabaseConfig.on_commit(lambda: Transaction.unindex_search_user(user_id))
         return True
     
     @staticmethod
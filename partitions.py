@@ -0,0 +1,239 @@
+"""
+Partitions Module
+RANGE partitioning of the transactions table on transaction_date (MySQL)
+
+Partitions cover a calendar year (p2024) or month (p202403), plus a
+catch-all pmax for dates past the last one. Queries that filter on
+transaction_date only read the partitions in range; EXPLAIN lists them in
+its partitions column.
+
+MySQL requires every unique key of a partitioned table to contain the
+partitioning column, and supports neither foreign keys nor FULLTEXT
+indexes on partitioned tables. enable() therefore:
+
+- widens the primary key to (transaction_id, transaction_date)
+- drops the foreign keys to users and categories; User.delete and
+  Category.delete do their cascade and restrict checks in code
+- drops the FULLTEXT index; Transaction.search then uses its in-process
+  index
+
+The embedded SQLite backend has no partitioning; archival
+(archiver.py) works on both.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from conversions import as_date
+from db_config import DatabaseConfig, execute_query
+
+GRANULARITIES = ('year', 'month')
+CATCH_ALL = 'pmax'
+
+_PARTITIONS_QUERY = """
+    SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS estimated_rows
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+        AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+"""
+
+
+def _require_mysql():
+    if DatabaseConfig.backend().name != "mysql":
+        raise ValueError("Table partitioning needs the MySQL backend")
+
+
+def period_start(day, granularity: str) -> date:
+    """First day of the year or month containing day"""
+    day = as_date(day)
+    return day.replace(month=1, day=1) if granularity == 'year' else day.replace(day=1)
+
+
+def next_period(start: date, granularity: str) -> date:
+    """First day of the following year or month"""
+    if granularity == 'year':
+        return start.replace(year=start.year + 1)
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+
+def partition_name(start: date, granularity: str) -> str:
+    """Name of the partition starting on start (p2024 or p202403)"""
+    return f"p{start:%Y}" if granularity == 'year' else f"p{start:%Y%m}"
+
+
+def _partition_clause(start: date, granularity: str) -> str:
+    return (f"PARTITION {partition_name(start, granularity)} "
+            f"VALUES LESS THAN ('{next_period(start, granularity).isoformat()}')")
+
+
+def list_partitions() -> List[Dict]:
+    """
+    Partitions of the transactions table, oldest first
+
+    Returns:
+        List of dictionaries with name, upper_bound (exclusive date, None
+        for pmax) and estimated_rows; empty if the table is not partitioned
+    """
+    _require_mysql()
+    partitions = []
+    for row in execute_query(_PARTITIONS_QUERY, fetch=True, cache=False):
+        bound = row['bound'].strip("'")
+        partitions.append({
+            'name': row['name'],
+            'upper_bound': None if bound == 'MAXVALUE' else as_date(bound),
+            'estimated_rows': row['estimated_rows'],
+        })
+    return partitions
+
+
+def is_partitioned() -> bool:
+    """Whether the transactions table is partitioned"""
+    return DatabaseConfig.backend().name == "mysql" and bool(list_partitions())
+
+
+def granularity_of(partitions: List[Dict]) -> str:
+    """'year' or 'month', from the partition names"""
+    for partition in partitions:
+        if partition['name'] != CATCH_ALL:
+            return 'year' if len(partition['name']) == 5 else 'month'
+    raise ValueError("transactions has no dated partitions")
+
+
+def enable(granularity: str = 'year', ahead: int = 1) -> List[str]:
+    """
+    Partition the transactions table by transaction_date
+
+    Rebuilds the table (MySQL copies every row), so run it in a
+    maintenance window.
+
+    Args:
+        granularity: 'year' or 'month'
+        ahead: Future periods to create after the current one
+
+    Returns:
+        Names of the partitions created
+    """
+    _require_mysql()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}; use 'year' or 'month'")
+    if list_partitions():
+        raise ValueError("transactions is already partitioned")
+
+    rows = execute_query("SELECT MIN(transaction_date) AS first FROM transactions",
+                         fetch=True, cache=False)
+    today = date.today()
+    start = period_start(rows[0]['first'] or today, granularity)
+    last = period_start(today, granularity)
+    for _ in range(ahead):
+        last = next_period(last, granularity)
+    clauses = []
+    while start <= last:
+        clauses.append(_partition_clause(start, granularity))
+        start = next_period(start, granularity)
+    clauses.append(f"PARTITION {CATCH_ALL} VALUES LESS THAN (MAXVALUE)")
+
+    foreign_keys = execute_query("""
+        SELECT CONSTRAINT_NAME AS name
+        FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+            AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+    """, fetch=True, cache=False)
+    fulltext = execute_query("""
+        SELECT DISTINCT INDEX_NAME AS name
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+            AND INDEX_TYPE = 'FULLTEXT'
+    """, fetch=True, cache=False)
+
+    drops = ([f"DROP FOREIGN KEY {row['name']}" for row in foreign_keys]
+             + [f"DROP INDEX {row['name']}" for row in fulltext])
+    if drops:
+        execute_query(f"ALTER TABLE transactions {', '.join(drops)}")
+    execute_query("ALTER TABLE transactions DROP PRIMARY KEY, "
+                  "ADD PRIMARY KEY (transaction_id, transaction_date)")
+    execute_query("ALTER TABLE transactions PARTITION BY RANGE COLUMNS (transaction_date) "
+                  f"({', '.join(clauses)})")
+
+    # Transaction.search checks for the FULLTEXT index once; look again
+    from models.transaction import Transaction
+    Transaction.reload_search_index()
+    return [clause.split()[1] for clause in clauses]
+
+
+def add_partitions(ahead: int = 1) -> List[str]:
+    """
+    Split pmax so partitions exist up to ahead periods after the current one
+
+    Splitting is fast while pmax holds no rows, so run it ahead of time
+    (for example from a daily job).
+
+    Returns:
+        Names of the partitions added
+    """
+    partitions = list_partitions()
+    if not partitions:
+        raise ValueError("transactions is not partitioned; run enable() first")
+    granularity = granularity_of(partitions)
+    bounds = [partition['upper_bound'] for partition in partitions if partition['upper_bound']]
+    start = max(bounds)
+    last = period_start(date.today(), granularity)
+    for _ in range(ahead):
+        last = next_period(last, granularity)
+
+    clauses = []
+    while start <= last:
+        clauses.append(_partition_clause(start, granularity))
+        start = next_period(start, granularity)
+    if not clauses:
+        return []
+    execute_query(f"ALTER TABLE transactions REORGANIZE PARTITION {CATCH_ALL} INTO "
+                  f"({', '.join(clauses)}, "
+                  f"PARTITION {CATCH_ALL} VALUES LESS THAN (MAXVALUE))")
+    return [clause.split()[1] for clause in clauses]
+
+
+def drop_partitions(before) -> Tuple[List[str], List[str]]:
+    """
+    Detach the partitions that end on or before a date and hold no rows
+
+    Archive the rows first (archiver.archive_transactions); a partition
+    that still has rows is left in place, so nothing is dropped without
+    the rollup and budget counters being adjusted.
+
+    Args:
+        before: Date (partitions whose upper bound is at or before it)
+
+    Returns:
+        (names dropped, names skipped because they still hold rows)
+    """
+    cutoff = as_date(before)
+    dropped, skipped = [], []
+    for partition in list_partitions():
+        bound = partition['upper_bound']
+        if bound is None or bound > cutoff:
+            continue
+        # Exact count of one partition; TABLE_ROWS is only an estimate
+        rows = execute_query(f"SELECT COUNT(*) AS count FROM transactions "
+                             f"PARTITION ({partition['name']})", fetch=True, cache=False)
+        if rows[0]['count']:
+            skipped.append(partition['name'])
+        else:
+            dropped.append(partition['name'])
+    if dropped:
+        execute_query(f"ALTER TABLE transactions DROP PARTITION {', '.join(dropped)}")
+    return dropped, skipped
+
+
+def explain(query: str, params: Optional[tuple] = None) -> List[Dict]:
+    """
+    EXPLAIN a query; each row's partitions column names the partitions read
+
+    Args:
+        query: SELECT statement
+        params: Query parameters as tuple
+
+    Returns:
+        EXPLAIN rows as dictionaries
+    """
+    return execute_query(f"EXPLAIN {query}", params, fetch=True, compact=False, cache=False)
@@ -0,0 +1,231 @@
+"""
+Query Cache Module
+Read-through cache of SELECT results used by db_config.execute_query, with
+LRU eviction, a byte budget, a TTL and per-table versions so that writes
+invalidate the entries that read the written tables
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+# Views and the base tables they read (schema.sql)
+VIEWS = {
+    'active_budgets': ('budgets', 'users'),
+    'transaction_summary': ('transactions', 'users', 'categories'),
+}
+
+# Tables whose rows change through ON DELETE / ON UPDATE CASCADE when a row
+# of the key table is updated or deleted (schema.sql and migrations/)
+CASCADES = {
+    'users': ('budgets', 'transactions', 'monthly_spending'),
+    'budgets': ('budget_rules',),
+    'categories': ('budget_rules', 'transactions', 'monthly_spending'),
+}
+
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+`?([A-Za-z_]\w*)", re.IGNORECASE)
+_WRITE_TABLES = re.compile(
+    r"\b(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM|"
+    r"TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|"
+    r"CREATE\s+TABLE(?:\s+IF\s+NOT\s+EXISTS)?|CREATE\s+(?:UNIQUE\s+)?INDEX\s+\w+\s+ON)"
+    r"\s+`?([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+def _with_cascades(tables: Iterable[str]) -> FrozenSet[str]:
+    result = set()
+    pending = list(tables)
+    while pending:
+        table = pending.pop()
+        if table not in result:
+            result.add(table)
+            pending.extend(CASCADES.get(table, ()))
+    return frozenset(result)
+
+
+@lru_cache(maxsize=1024)
+def tables_read(query: str) -> FrozenSet[str]:
+    """Base tables a SELECT reads (views expanded)"""
+    tables = set()
+    for name in _READ_TABLES.findall(query):
+        name = name.lower()
+        tables.update(VIEWS.get(name, (name,)))
+    return frozenset(tables)
+
+
+@lru_cache(maxsize=1024)
+def tables_written(query: str) -> FrozenSet[str]:
+    """
+    Tables a write statement can change, including foreign key cascades
+
+    Returns:
+        Table names, or an empty set if none could be recognized
+    """
+    return _with_cascades(name.lower() for name in _WRITE_TABLES.findall(query))
+
+
+def _estimate_size(rows) -> int:
+    """Approximate bytes held by a result list (row containers and values)"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in (row.values() if isinstance(row, dict) else row):
+            size += sys.getsizeof(value)
+    return size
+
+
+def _copy(rows) -> list:
+    """Fresh list (and fresh dictionaries) so callers cannot alter cached rows"""
+    return [dict(row) if isinstance(row, dict) else row for row in rows]
+
+
+class _CacheEntry:
+    __slots__ = ("rows", "tables", "size", "expires_at")
+
+    def __init__(self, rows, tables, size, expires_at):
+        self.rows = rows
+        self.tables = tables
+        self.size = size
+        self.expires_at = expires_at
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results keyed by SQL and parameters
+
+    Every table has a version number. A result is stored together with the
+    tables it read, only if none of their versions changed while the query
+    ran, and is evicted as soon as one of them is written.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 2**20,
+                 ttl: Optional[float] = 60.0):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._dependents: Dict[str, set] = {}
+        self._versions: Dict[str, int] = {}
+        self._generation = 0
+        self._bytes = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, max_entries: int, max_bytes: int, ttl: Optional[float]):
+        """Change the limits; entries over the new limits are evicted"""
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self.ttl = ttl
+            self._evict()
+
+    def _discard(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for table in entry.tables:
+            dependents = self._dependents.get(table)
+            if dependents is not None:
+                dependents.discard(key)
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._bytes > self.max_bytes):
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get(self, key: tuple) -> Tuple[bool, Optional[list]]:
+        """
+        Look up a result
+
+        Returns:
+            (True, rows) on a hit, (False, None) on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at is not None \
+                    and entry.expires_at <= time.monotonic():
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, _copy(entry.rows)
+
+    def snapshot(self, tables: FrozenSet[str]) -> tuple:
+        """Versions of tables (and the cache generation) before a query runs"""
+        with self._lock:
+            return (self._generation,) + tuple(self._versions.get(table, 0)
+                                               for table in sorted(tables))
+
+    def put(self, key: tuple, rows: list, tables: FrozenSet[str], snapshot: tuple):
+        """
+        Store a result unless one of its tables was written since snapshot()
+
+        Results larger than an eighth of the byte budget are not cached.
+        """
+        size = _estimate_size(rows)
+        with self._lock:
+            current = (self._generation,) + tuple(self._versions.get(table, 0)
+                                                  for table in sorted(tables))
+            if current != snapshot or size > self.max_bytes // 8:
+                return
+            self._discard(key)
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = _CacheEntry(_copy(rows), tables, size, expires_at)
+            self._bytes += size
+            for table in tables:
+                self._dependents.setdefault(table, set()).add(key)
+            self._evict()
+
+    def bump(self, tables: Iterable[str]):
+        """Advance the versions of written tables and drop entries that read them"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                for key in list(self._dependents.pop(table, ())):
+                    self._discard(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry and invalidate queries in flight"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._dependents.clear()
+            self._bytes = 0
+            self._generation += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def reset_stats(self):
+        """Zero the counters"""
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+
+# Process-wide cache used by db_config
+query_cache = QueryCache()
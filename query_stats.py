@@ -0,0 +1,194 @@
+"""
+Query Statistics Module
+Collects per-statement latency histograms, row counts and calling model
+methods for every query run through db_config, plus a slow-query log
+"""
+
+import logging
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Silent unless the application configures logging
+slow_query_logger = logging.getLogger("budget_tracker.slow_query")
+slow_query_logger.addHandler(logging.NullHandler())
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Modules whose frames are skipped when looking for the calling method
+_INTERNAL_FILES = ("db_config.py", "query_stats.py", "contextlib.py")
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_TUPLE = r"\((?:\s*\?\s*,)*\s*\?\s*\)"
+_VALUES_LIST = re.compile(rf"({_TUPLE})(?:\s*,\s*{_TUPLE})+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(query: str) -> str:
+    """
+    Reduce a statement to its shape so calls differing only in values group together
+
+    Args:
+        query: SQL query string
+
+    Returns:
+        Single-line SQL with literals and placeholders replaced by ? and
+        IN / VALUES lists collapsed
+    """
+    normalized = _STRING_LITERAL.sub("?", query)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_LIST.sub(r"\1", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def find_caller() -> str:
+    """
+    Name the first function on the stack outside the database layer
+
+    Returns:
+        Qualified name such as 'Transaction.get_spending_by_category'
+    """
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename.endswith(_INTERNAL_FILES):
+        frame = frame.f_back
+    if frame is None:
+        return "<unknown>"
+    code = frame.f_code
+    # co_qualname (3.11+) includes the class name of static methods
+    name = getattr(code, "co_qualname", None)
+    if name is None:
+        name = f"{frame.f_globals.get('__name__', '?')}.{code.co_name}"
+    return name
+
+
+class _QueryEntry:
+    """Accumulated timings for one normalized statement"""
+
+    __slots__ = ("sql", "calls", "total_ms", "min_ms", "max_ms", "rows",
+                 "buckets", "callers")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.callers = Counter()
+
+    def percentile(self, fraction: float) -> float:
+        """Approximate a latency percentile (ms) from the histogram bucket bounds"""
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                if index < len(BUCKETS_MS):
+                    return min(BUCKETS_MS[index], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+
+class QueryStats:
+    """Thread-safe registry of query timings and slow queries"""
+
+    def __init__(self, slow_log_size: int = 100):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _QueryEntry] = {}
+        self._slow_queries = deque(maxlen=slow_log_size)
+
+    def record(self, query: str, elapsed_ms: float, rows: int, caller: str,
+               slow_threshold_ms: Optional[float] = None,
+               plan: Optional[List[Dict]] = None):
+        """
+        Record one execution of a statement
+
+        Args:
+            query: SQL query string as executed
+            elapsed_ms: Wall time in milliseconds
+            rows: Rows returned (reads) or affected (writes)
+            caller: Calling model method
+            slow_threshold_ms: Log to the slow-query log at or above this latency
+            plan: EXPLAIN output captured for a slow statement (optional)
+        """
+        sql = normalize_sql(query)
+        with self._lock:
+            entry = self._entries.get(sql)
+            if entry is None:
+                entry = self._entries[sql] = _QueryEntry(sql)
+            entry.calls += 1
+            entry.total_ms += elapsed_ms
+            entry.min_ms = min(entry.min_ms, elapsed_ms)
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.rows += rows
+            entry.buckets[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+            entry.callers[caller] += 1
+
+            if slow_threshold_ms is not None and elapsed_ms >= slow_threshold_ms:
+                self._slow_queries.append({
+                    'sql': sql,
+                    'elapsed_ms': elapsed_ms,
+                    'rows': rows,
+                    'caller': caller,
+                    'plan': plan,
+                    'logged_at': time.time(),
+                })
+
+        if slow_threshold_ms is not None and elapsed_ms >= slow_threshold_ms:
+            slow_query_logger.warning("%.1f ms, %d rows, %s: %s", elapsed_ms, rows, caller, sql)
+
+    def snapshot(self) -> List[Dict]:
+        """
+        Current statistics per normalized statement, most total time first
+
+        Returns:
+            List of dictionaries with call counts, total/avg/min/max and
+            p50/p95/p99 latencies in ms, rows and per-caller call counts
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            result = [{
+                'sql': entry.sql,
+                'calls': entry.calls,
+                'total_ms': entry.total_ms,
+                'avg_ms': entry.total_ms / entry.calls,
+                'min_ms': entry.min_ms,
+                'max_ms': entry.max_ms,
+                'p50_ms': entry.percentile(0.50),
+                'p95_ms': entry.percentile(0.95),
+                'p99_ms': entry.percentile(0.99),
+                'rows': entry.rows,
+                'avg_rows': entry.rows / entry.calls,
+                'callers': dict(entry.callers.most_common()),
+                'histogram': dict(zip(BUCKETS_MS + (float("inf"),), entry.buckets)),
+            } for entry in entries]
+        result.sort(key=lambda item: item['total_ms'], reverse=True)
+        return result
+
+    def slow_queries(self) -> List[Dict]:
+        """Most recent slow statements, newest last"""
+        with self._lock:
+            return list(self._slow_queries)
+
+    def reset(self):
+        """Discard all collected statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._slow_queries.clear()
+
+
+# Process-wide registry fed by db_config
+query_stats = QueryStats()
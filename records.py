@@ -0,0 +1,105 @@
+"""
+Records Module
+Compact tuple-backed result rows with dictionary-style access, an opt-in
+alternative to the dictionary cursors used by db_config
+"""
+
+from functools import lru_cache
+from operator import itemgetter
+from typing import Iterable, List, Sequence
+
+# Tuple methods a column of the same name replaces as an attribute
+_TUPLE_METHODS = ('count', 'index')
+
+
+class Record(tuple):
+    """
+    Result row stored as a plain tuple
+
+    Column values are reached by position, by name (row['amount'], row.get)
+    or as attributes (row.amount), so code written against dictionary rows
+    keeps working. Unlike a dict, iterating a record yields its values;
+    use keys()/items() for names.
+
+    Columns named count or index replace the tuple methods, so row.count is
+    the value of SELECT COUNT(*) AS count. Columns named like the mapping
+    methods (get, keys, values, items, to_dict) are only reached by name:
+    row['keys']. One subclass is generated per column list
+    and shares the name -> position index, so each row costs one tuple.
+    """
+
+    __slots__ = ()
+    _fields: tuple = ()
+    _index: dict = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def get(self, key: str, default=None):
+        """Value of a column, or default if the row has no such column"""
+        position = self._index.get(key)
+        return default if position is None else tuple.__getitem__(self, position)
+
+    def keys(self) -> tuple:
+        return self._fields
+
+    def values(self) -> tuple:
+        return tuple(self)
+
+    def items(self):
+        return zip(self._fields, self)
+
+    def to_dict(self) -> dict:
+        """Copy the row into a regular dictionary"""
+        return dict(zip(self._fields, self))
+
+    def __repr__(self):
+        pairs = ", ".join(f"{name}={value!r}" for name, value in zip(self._fields, self))
+        return f"Record({pairs})"
+
+
+@lru_cache(maxsize=256)
+def record_class(columns: tuple) -> type:
+    """
+    Record subclass for a column list (cached, so one class per query shape)
+
+    Args:
+        columns: Column names in cursor order
+
+    Returns:
+        Subclass of Record
+    """
+    # Later duplicates win, matching what a dictionary cursor does
+    index = {name: position for position, name in enumerate(columns)}
+    namespace = {'__slots__': (), '_fields': columns, '_index': index}
+    # __getattr__ only runs when normal lookup fails, which it does not for
+    # the tuple methods
+    for name in _TUPLE_METHODS:
+        if name in index:
+            namespace[name] = property(itemgetter(index[name]))
+    return type("Record", (Record,), namespace)
+
+
+def as_records(columns: Sequence[str], rows: Iterable[tuple]) -> List[Record]:
+    """
+    Wrap tuple rows from a plain cursor as records
+
+    Args:
+        columns: Cursor column names
+        rows: Tuples in the same column order
+
+    Returns:
+        List of Record rows
+    """
+    return list(map(record_class(tuple(columns)), rows))
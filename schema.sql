@@ -1,6 +1,7 @@
 -- Budget Tracking Application Database Schema
 -- Author: Graduate Student Project
 -- Database: MySQL
+-- Creates a new database; apply later changes with "python manage.py migrate"
 
 DROP DATABASE IF EXISTS budget_tracker;
 CREATE DATABASE budget_tracker;
@@ -0,0 +1,171 @@
+-- Budget Tracking Application Database Schema
+-- SQLite translation of schema.sql for the embedded backend
+-- Applied automatically by backends/sqlite_backend.py on a new database
+--
+-- Money columns are declared DECIMAL_REAL: the REAL affinity keeps arithmetic
+-- such as percent_used in floating point, and the backend converts the
+-- stored values back to Decimal like the MySQL DECIMAL columns.
+
+PRAGMA foreign_keys = ON;
+
+-- Table 1: Users
+-- Stores user account information
+CREATE TABLE users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) NOT NULL UNIQUE,
+    email VARCHAR(100) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT chk_email_format CHECK (email LIKE '%_@__%.__%')
+);
+
+-- Table 2: Categories
+-- Defines spending categories (food, entertainment, etc.)
+CREATE TABLE categories (
+    category_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category_name VARCHAR(50) NOT NULL UNIQUE,
+    description TEXT,
+    icon VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table 3: Budgets
+-- Stores different budget configurations for users
+CREATE TABLE budgets (
+    budget_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    budget_name VARCHAR(100) NOT NULL,
+    budget_type VARCHAR(10) NOT NULL,
+    total_amount DECIMAL_REAL(10,2) NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    is_active TINYINT(1) DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT chk_budget_type CHECK (budget_type IN ('strict', 'moderate', 'custom')),
+    CONSTRAINT chk_budget_amount CHECK (total_amount > 0),
+    CONSTRAINT chk_budget_dates CHECK (end_date >= start_date),
+
+    CONSTRAINT fk_budget_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(user_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_budget_user ON budgets(user_id);
+CREATE INDEX idx_budget_active ON budgets(is_active);
+
+-- Table 4: Budget Rules
+-- Defines spending limits for each category within a budget
+CREATE TABLE budget_rules (
+    rule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    budget_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    limit_amount DECIMAL_REAL(10, 2) NOT NULL,
+    alert_threshold DECIMAL_REAL(5, 2) DEFAULT 80.00,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT chk_limit_amount CHECK (limit_amount > 0),
+    CONSTRAINT chk_alert_threshold CHECK (alert_threshold BETWEEN 0 AND 100),
+    CONSTRAINT unique_budget_category UNIQUE (budget_id, category_id),
+
+    CONSTRAINT fk_rule_budget
+        FOREIGN KEY (budget_id)
+        REFERENCES budgets(budget_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE,
+    CONSTRAINT fk_rule_category
+        FOREIGN KEY (category_id)
+        REFERENCES categories(category_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_budget_rule_budget ON budget_rules(budget_id);
+CREATE INDEX idx_budget_rule_category ON budget_rules(category_id);
+
+-- Table 5: Transactions
+-- Records individual spending entries
+CREATE TABLE transactions (
+    transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    amount DECIMAL_REAL(10, 2) NOT NULL,
+    transaction_date DATE NOT NULL,
+    description VARCHAR(255),
+    payment_method VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT chk_transaction_amount CHECK (amount > 0),
+
+    CONSTRAINT fk_transaction_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(user_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE,
+    CONSTRAINT fk_transaction_category
+        FOREIGN KEY (category_id)
+        REFERENCES categories(category_id)
+        ON DELETE RESTRICT
+        ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_transaction_user ON transactions(user_id);
+CREATE INDEX idx_transaction_date ON transactions(transaction_date);
+CREATE INDEX idx_transaction_category ON transactions(category_id);
+
+-- Additional index on user email
+CREATE INDEX idx_user_email ON users(email);
+
+-- ON UPDATE CURRENT_TIMESTAMP equivalents
+CREATE TRIGGER trg_users_updated_at AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER trg_budgets_updated_at AFTER UPDATE ON budgets
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE budgets SET updated_at = CURRENT_TIMESTAMP WHERE budget_id = NEW.budget_id;
+END;
+
+CREATE TRIGGER trg_transactions_updated_at AFTER UPDATE ON transactions
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE transactions SET updated_at = CURRENT_TIMESTAMP
+    WHERE transaction_id = NEW.transaction_id;
+END;
+
+-- Create views for common queries
+CREATE VIEW active_budgets AS
+SELECT
+    b.budget_id,
+    b.user_id,
+    u.username,
+    b.budget_name,
+    b.budget_type,
+    b.total_amount,
+    b.start_date,
+    b.end_date
+FROM budgets b
+JOIN users u ON b.user_id = u.user_id
+WHERE b.is_active = TRUE;
+
+CREATE VIEW transaction_summary AS
+SELECT
+    t.transaction_id,
+    u.username,
+    c.category_name,
+    t.amount,
+    t.transaction_date,
+    t.description,
+    t.payment_method
+FROM transactions t
+JOIN users u ON t.user_id = u.user_id
+JOIN categories c ON t.category_id = c.category_id
+ORDER BY t.transaction_date DESC;
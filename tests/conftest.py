@@ -0,0 +1,37 @@
+"""
+Shared fixtures: a fresh, fully migrated SQLite database per test
+"""
+
+import pytest
+
+import budget_alerts
+from backends.sqlite_backend import TEST_DATA_PATH, SQLiteBackend
+from db_config import DatabaseConfig
+from models import Budget, Transaction
+from query_cache import query_cache
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Pool on a new SQLite file holding test_data.sql"""
+    path = str(tmp_path / "budget_tracker.db")
+    backend = SQLiteBackend(path)
+    backend.bootstrap()
+    # Loaded before the pool opens, so the migrations backfill the rollup,
+    # budget counters and fingerprints as on an upgraded database
+    backend.load_script(TEST_DATA_PATH)
+
+    monkeypatch.setattr(DatabaseConfig, "BACKEND", "sqlite")
+    monkeypatch.setattr(DatabaseConfig, "SQLITE_PATH", path)
+    monkeypatch.setattr(DatabaseConfig, "_backend", backend)
+    monkeypatch.setattr(DatabaseConfig, "QUERY_CACHE_ENABLED", False)
+    monkeypatch.setattr(Budget, "_covering_index", None)
+    monkeypatch.setattr(Transaction, "_search_index", None)
+    monkeypatch.setattr(Transaction, "_has_fulltext", None)
+    budget_alerts.set_sink(budget_alerts.QueueSink())
+    query_cache.clear()
+
+    DatabaseConfig.initialize_pool()
+    yield DatabaseConfig
+    DatabaseConfig.close_pool()
+    query_cache.clear()
@@ -0,0 +1,119 @@
+"""
+Tests for duplicate detection: fingerprints, exact and fuzzy windows
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from dedupe import DuplicateFilter, find_duplicates, fingerprint, similarity
+from models import Transaction, User
+
+
+def test_fingerprint_ignores_case_punctuation_and_amount_format():
+    assert fingerprint(1, Decimal('4.50'), date(2024, 3, 1), "Coffee  Shop!") == \
+        fingerprint(1, '4.5', '2024-03-01', "coffee shop")
+    assert fingerprint(1, 4.5, '2024-03-01', "Coffee") != fingerprint(2, 4.5, '2024-03-01', "Coffee")
+    assert fingerprint(1, 4.5, '2024-03-01', "Coffee") != fingerprint(1, 4.51, '2024-03-01', "Coffee")
+    assert fingerprint(1, 4.5, '2024-03-01', "Coffee") != fingerprint(1, 4.5, '2024-03-02', "Coffee")
+
+
+def test_similarity_is_the_share_of_common_words():
+    assert similarity("ACME Store #123", "acme store") == pytest.approx(2 / 3)
+    assert similarity("", None) == 1.0
+    assert similarity("Coffee", "Tea") == 0.0
+
+
+def test_unknown_mode_is_rejected(db):
+    with pytest.raises(ValueError, match="Unknown duplicate mode"):
+        DuplicateFilter("loose")
+
+
+@pytest.fixture
+def user_id(db):
+    """A user with two identical coffees and one shop purchase"""
+    user_id = User.create("deduper", "deduper@example.com", "hash")
+    Transaction.create_many([(user_id, 1, 4.50, '2024-03-01', "Coffee"),
+                             (user_id, 1, 4.50, '2024-03-01', "Coffee"),
+                             (user_id, 2, 19.99, '2024-03-10', "ACME Store 123")])
+    return user_id
+
+
+def test_each_stored_row_absorbs_one_incoming_row(user_id):
+    coffee = (user_id, 1, 4.50, '2024-03-01', "COFFEE!", "")
+    rows, duplicates = DuplicateFilter().filter([coffee] * 3)
+    assert duplicates == [0, 1] and rows == [coffee]
+    assert DuplicateFilter().filter([coffee])[1] == [0]
+    # A filter remembers what it has matched across calls
+    matcher = DuplicateFilter()
+    matcher.filter([coffee, coffee])
+    assert matcher.filter([coffee])[1] == []
+
+
+def test_rows_stored_after_the_filter_was_created_do_not_count(user_id):
+    matcher = DuplicateFilter()
+    Transaction.create(user_id, 1, 7, '2024-03-05', "Lunch")
+    assert matcher.filter([(user_id, 1, 7, '2024-03-05', "Lunch", "")])[1] == []
+    assert DuplicateFilter().filter([(user_id, 1, 7, '2024-03-05', "Lunch", "")])[1] == [0]
+
+
+@pytest.mark.parametrize("day, matched", [
+    ('2024-03-07', True),   # 3 days early
+    ('2024-03-13', True),   # 3 days late
+    ('2024-03-06', False),  # 4 days early
+    ('2024-03-14', False),  # 4 days late
+])
+def test_fuzzy_window_is_window_days_either_side(user_id, day, matched):
+    row = (user_id, 2, 19.99, day, "Acme store", "")
+    assert DuplicateFilter("fuzzy").filter([row])[1] == ([0] if matched else [])
+    assert DuplicateFilter("exact").filter([row])[1] == []
+
+
+def test_fuzzy_needs_the_same_amount_and_similar_description(user_id):
+    matcher = DuplicateFilter("fuzzy")
+    assert matcher.filter([(user_id, 2, 19.98, '2024-03-10', "ACME Store 123", ""),
+                           (user_id, 2, 19.99, '2024-03-10', "Other shop", "")])[1] == []
+    assert DuplicateFilter("fuzzy", window_days=5).filter(
+        [(user_id, 2, 19.99, '2024-03-15', "ACME Store", "")])[1] == [0]
+
+
+def test_fuzzy_prefers_the_closest_stored_row(user_id):
+    far = Transaction.create(user_id, 1, 8, '2024-04-01', "Book shop")
+    near = Transaction.create(user_id, 1, 8, '2024-04-03', "Book shop")
+    matcher = DuplicateFilter("fuzzy")
+    assert matcher.filter([(user_id, 1, 8, '2024-04-04', "Book shop", "")])[1] == [0]
+    assert matcher._used_ids == {near}
+    assert matcher.filter([(user_id, 1, 8, '2024-04-04', "Book shop", "")])[1] == [0]
+    assert matcher._used_ids == {near, far}
+
+
+def test_find_duplicates_exact_and_fuzzy(user_id):
+    coffees = [row['transaction_id'] for row in Transaction.get_by_user(user_id)
+               if row['description'] == "Coffee"]
+    assert sorted(coffees) in find_duplicates()
+    shop = Transaction.create(user_id, 2, 19.99, '2024-03-12', "Acme store")
+    groups = find_duplicates(fuzzy=True)
+    assert sorted(coffees) in groups
+    assert any(shop in group and len(group) == 2 for group in groups)
+    assert not any(shop in group for group in find_duplicates())
+    assert not any(shop in group for group in find_duplicates(fuzzy=True, window_days=1))
+
+
+def test_create_skips_duplicates_only_when_asked(user_id):
+    assert Transaction.create(user_id, 1, 4.50, '2024-03-01', "coffee", duplicates='exact') is None
+    assert Transaction.create(user_id, 1, 4.50, '2024-03-01', "coffee") is not None
+    assert Transaction.create(user_id, 2, 19.99, '2024-03-11', "Acme Store",
+                              duplicates='fuzzy') is None
+    assert Transaction.find_duplicate(user_id, 4.5, '2024-03-01', "COFFEE")['description'] == "Coffee"
+
+
+def test_create_many_returns_none_for_skipped_rows(user_id):
+    rows = [(user_id, 1, 4.50, '2024-03-01', "Coffee"),
+            (user_id, 1, 6.00, '2024-03-02', "Sandwich"),
+            (user_id, 1, 4.50, '2024-03-01', "Coffee"),
+            (user_id, 1, 4.50, '2024-03-01', "Coffee")]
+    ids = Transaction.create_many(rows, chunk_size=2, duplicates='exact')
+    assert ids[0] is None and ids[2] is None
+    assert ids[1] is not None and ids[3] is not None
+    assert len(Transaction.get_by_user(user_id)) == 5
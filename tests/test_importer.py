@@ -0,0 +1,157 @@
+"""
+Tests for the CSV/OFX statement importer: row errors, credits and duplicates
+"""
+
+import pytest
+
+import importer
+from importer import RowError, import_file, read_csv
+from models import Transaction
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def user_count(user_id=1):
+    return len(Transaction.get_by_user(user_id))
+
+
+def test_bad_rows_are_reported_with_their_line_and_the_rest_imported(db, tmp_path):
+    path = write(tmp_path, "statement.csv",
+                 "Date,Amount,Description,Category\n"
+                 "2024-03-01,-12.50,Coffee,Groceries\n"
+                 "2024-03-02,-abc,Garbage amount,Groceries\n"
+                 "2024-13-40,-5.00,Bad date,Groceries\n"
+                 "2024-03-04,-5.001,Fraction of a cent,Groceries\n"
+                 "2024-03-05,-7.00,Unknown category,Nope\n"
+                 "2024-03-06,\"-$1,200.00\",Laptop,Shopping\n")
+    before = user_count()
+    result = import_file(path, 1)
+    assert (result['imported'], result['failed'], result['skipped']) == (2, 4, 0)
+    assert [error['record'] for error in result['errors']] == [3, 4, 5, 6]
+    assert "invalid amount" in result['errors'][0]['message']
+    assert "invalid date" in result['errors'][1]['message']
+    assert "fractions of a cent" in result['errors'][2]['message']
+    assert "unknown category" in result['errors'][3]['message']
+    assert user_count() == before + 2
+
+
+def test_errors_beyond_max_errors_are_counted_but_not_kept(db, tmp_path):
+    rows = "".join(f"2024-03-01,-x{n},Bad,Groceries\n" for n in range(5))
+    path = write(tmp_path, "bad.csv", "Date,Amount,Description,Category\n" + rows
+                 + "2024-03-01,-1.00,Good,Groceries\n")
+    result = import_file(path, 1, max_errors=2)
+    assert result['failed'] == 5 and len(result['errors']) == 2
+    assert result['imported'] == 1
+
+
+@pytest.mark.parametrize("amount", ["", "n/a"])
+def test_a_malformed_amount_is_an_error_not_a_credit(db, tmp_path, amount):
+    path = write(tmp_path, "statement.csv",
+                 "Date,Amount,Description\n"
+                 f"2024-03-01,{amount},Broken\n"
+                 "2024-03-02,-3.00,Fine\n"
+                 "2024-03-03,9.00,Refund\n")
+    result = import_file(path, 1, default_category="Groceries")
+    assert (result['imported'], result['skipped'], result['failed']) == (1, 1, 1)
+    assert result['errors'][0]['record'] == 2
+
+
+@pytest.mark.parametrize("debits, credits", [
+    ('negative', [False, True, False]),
+    ('positive', [True, False, True]),
+    (None, [False, False, False]),
+])
+def test_sign_conventions(tmp_path, debits, credits):
+    path = write(tmp_path, "signed.csv",
+                 "Date,Amount\n2024-03-01,-12.50\n2024-03-02,2500.00\n2024-03-03,(40.00)\n")
+    assert [fields['credit'] for _, fields in read_csv(path, debits=debits)] == credits
+
+
+def test_split_debit_and_credit_columns(tmp_path):
+    path = write(tmp_path, "split.csv",
+                 "Date,Description,Paid out,Paid in\n"
+                 "2024-03-01,Coffee,12.50,\n"
+                 "2024-03-02,Paycheck,,2500.00\n"
+                 "2024-03-03,Gas,40.00,0.00\n")
+    rows = [(fields['amount'], fields['credit']) for _, fields in read_csv(path)]
+    assert rows == [('12.50', False), ('2500.00', True), ('40.00', False)]
+
+
+def test_unknown_sign_convention_is_rejected(tmp_path):
+    path = write(tmp_path, "signed.csv", "Date,Amount\n2024-03-01,-1.00\n")
+    with pytest.raises(ValueError):
+        next(read_csv(path, debits='upside-down'))
+
+
+def test_a_file_of_only_credits_fails_loudly(db, tmp_path):
+    path = write(tmp_path, "positive.csv",
+                 "Date,Amount,Description\n2024-03-01,5.00,A\n2024-03-02,6.00,B\n")
+    before = user_count()
+    with pytest.raises(RowError, match="debits='positive'"):
+        import_file(path, 1, default_category="Groceries")
+    assert user_count() == before
+    result = import_file(path, 1, default_category="Groceries", debits='positive')
+    assert result['imported'] == 2
+
+
+OFX = ("OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+       "<STMTTRN><TRNTYPE>POS<DTPOSTED>20240301120000<TRNAMT>-12.50<NAME>Cafe &amp; Co"
+       "<MEMO>Latte</STMTTRN>"
+       "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240302<TRNAMT>100.00<NAME>Refund</STMTTRN>"
+       "<STMTTRN><TRNTYPE>ATM<DTPOSTED>20240303<NAME>No amount</STMTTRN>"
+       "<STMTTRN><TRNTYPE>POS<DTPOSTED>20240304<TRNAMT>zz<NAME>Garbage</STMTTRN>"
+       "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>")
+
+
+def test_ofx_credits_are_skipped_and_bad_amounts_reported(db, tmp_path):
+    path = write(tmp_path, "statement.ofx", OFX)
+    result = import_file(path, 1, default_category="Dining Out")
+    assert (result['imported'], result['skipped'], result['failed']) == (1, 1, 2)
+    assert [error['record'] for error in result['errors']] == [3, 4]
+    row = Transaction.get_by_user(1, limit=1)[0]
+    assert row['description'] == "Cafe & Co - Latte"
+    assert row['payment_method'] == importer.OFX_PAYMENT_METHODS['POS']
+
+
+def test_reimporting_a_statement_only_adds_new_rows(db, tmp_path):
+    header = "Date,Amount,Description,Category\n"
+    first = write(tmp_path, "march.csv", header
+                  + "2024-03-01,-4.50,Coffee,Dining Out\n"
+                  + "2024-03-01,-4.50,Coffee,Dining Out\n"
+                  + "2024-03-02,-30.00,Groceries,Groceries\n")
+    result = import_file(first, 1)
+    assert (result['imported'], result['duplicates']) == (3, 0)
+
+    result = import_file(first, 1)
+    assert (result['imported'], result['duplicates']) == (0, 3)
+
+    # Overlapping statement: a third identical coffee and one new row
+    overlap = write(tmp_path, "overlap.csv", header
+                    + "2024-03-01,-4.50,COFFEE!,Dining Out\n"
+                    + "2024-03-01,-4.50,Coffee,Dining Out\n"
+                    + "2024-03-01,-4.50,Coffee,Dining Out\n"
+                    + "2024-03-03,-8.00,Lunch,Dining Out\n")
+    result = import_file(overlap, 1)
+    assert (result['imported'], result['duplicates']) == (2, 2)
+
+
+def test_duplicate_check_can_be_turned_off(db, tmp_path):
+    path = write(tmp_path, "march.csv",
+                 "Date,Amount,Description,Category\n2024-03-01,-4.50,Coffee,Dining Out\n")
+    import_file(path, 1)
+    result = import_file(path, 1, duplicates=None)
+    assert (result['imported'], result['duplicates']) == (1, 0)
+
+
+def test_fuzzy_duplicates_match_postings_days_apart(db, tmp_path):
+    header = "Date,Amount,Description,Category\n"
+    import_file(write(tmp_path, "a.csv", header + "2024-03-01,-19.99,ACME Store 123,Shopping\n"), 1)
+    later = write(tmp_path, "b.csv", header + "2024-03-03,-19.99,Acme store,Shopping\n")
+    result = import_file(later, 1, duplicates='fuzzy')
+    assert (result['imported'], result['duplicates']) == (0, 1)
+    result = import_file(later, 1)
+    assert (result['imported'], result['duplicates']) == (1, 0)
@@ -0,0 +1,95 @@
+"""
+Tests for the monthly_spending rollup and its maintenance on writes
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from db_config import DatabaseConfig, execute_query
+from models import Transaction
+from models.monthly_spending import MonthlySpending
+
+
+@pytest.mark.parametrize("start, end, months, partial", [
+    ('2024-01-01', '2024-03-31', (date(2024, 1, 1), date(2024, 3, 1)), []),
+    ('2024-01-15', '2024-03-10', (date(2024, 2, 1), date(2024, 2, 1)),
+     [(date(2024, 1, 15), date(2024, 1, 31)), (date(2024, 3, 1), date(2024, 3, 10))]),
+    ('2024-02-01', '2024-02-29', (date(2024, 2, 1), date(2024, 2, 1)), []),
+    ('2023-12-01', '2024-01-30', (date(2023, 12, 1), date(2023, 12, 1)),
+     [(date(2024, 1, 1), date(2024, 1, 30))]),
+    ('2024-01-05', '2024-01-20', None, [(date(2024, 1, 5), date(2024, 1, 20))]),
+    ('2024-01-31', '2024-02-01', None, [(date(2024, 1, 31), date(2024, 2, 1))]),
+])
+def test_split_range(start, end, months, partial):
+    assert MonthlySpending.split_range(start, end) == (months, partial)
+
+
+def test_deltas_net_out_added_and_removed_rows():
+    deltas = MonthlySpending.deltas(
+        added=[(1, 2, Decimal('10.00'), '2024-01-05'), (1, 2, 2.5, date(2024, 1, 31)),
+               (1, 3, '4.00', '2024-02-01')],
+        removed=[(1, 2, Decimal('1.25'), '2024-01-10'), (1, 3, '4.00', '2024-02-29')])
+    assert deltas == {
+        (1, 2, date(2024, 1, 1)): [Decimal('11.25'), 1],
+        (1, 3, date(2024, 2, 1)): [Decimal('0.00'), 0],
+    }
+
+
+def spending(user_id, start, end):
+    return {row['category_id']: (row['total_spent'], row['transaction_count'])
+            for row in Transaction.get_spending_by_category(user_id, start, end)}
+
+
+def test_rollup_reports_match_the_transactions_table(db, monkeypatch):
+    Transaction.create_many([(1, 1, 3.25, '2024-01-09'), (1, 1, 4.75, '2024-01-10'),
+                             (1, 2, 8, '2024-03-01'), (1, 3, 9.99, '2024-03-31')])
+    ranges = [('2024-01-01', '2024-12-31'), ('2024-01-10', '2024-03-20'),
+              ('2024-02-01', '2024-02-29'), ('2024-02-03', '2024-02-05')]
+    with_rollup = [spending(1, *dates) for dates in ranges]
+    monkeypatch.setattr(DatabaseConfig, "USE_SPENDING_ROLLUP", False)
+    assert with_rollup == [spending(1, *dates) for dates in ranges]
+    assert with_rollup[0]
+
+
+def test_check_is_clean_after_create_update_and_delete(db):
+    assert MonthlySpending.check() == []
+    created = Transaction.create(1, 1, 12.34, '2024-03-15', 'new')
+    Transaction.create_many([(1, 2, 5, '2024-03-16'), (2, 1, 7.5, '2024-04-01')])
+    assert MonthlySpending.check() == []
+
+    # Amount, category and a move into another month
+    Transaction.update(created, amount=20)
+    Transaction.update(created, category_id=3)
+    Transaction.update(created, transaction_date='2024-05-01')
+    assert MonthlySpending.check() == []
+    month = execute_query(
+        "SELECT total_amount, txn_count FROM monthly_spending "
+        "WHERE user_id = 1 AND category_id = 3 AND month = '2024-05-01'", fetch=True)
+    assert month[0]['total_amount'] == Decimal('20.00') and month[0]['txn_count'] == 1
+
+    Transaction.delete(created)
+    assert MonthlySpending.check() == []
+    month = execute_query(
+        "SELECT txn_count FROM monthly_spending "
+        "WHERE user_id = 1 AND category_id = 3 AND month = '2024-05-01'", fetch=True)
+    assert not month or month[0]['txn_count'] == 0
+
+
+def test_check_is_clean_after_bulk_changes(db):
+    assert Transaction.update_where({'user_id': 1, 'start_date': '2024-02-01',
+                                     'end_date': '2024-02-05'},
+                                    {'category_id': 4, 'amount': 1.5}) > 0
+    assert Transaction.delete_range(2, '2024-01-01', '2024-12-31') > 0
+    assert MonthlySpending.check() == []
+
+
+def test_check_reports_a_drifted_rollup_and_rebuild_repairs_it(db):
+    execute_query("UPDATE monthly_spending SET total_amount = total_amount + 1, "
+                  "txn_count = txn_count + 1 WHERE user_id = 1")
+    mismatches = MonthlySpending.check()
+    assert mismatches
+    assert all(row['stored_count'] == row['expected_count'] + 1 for row in mismatches)
+    MonthlySpending.rebuild()
+    assert MonthlySpending.check() == []
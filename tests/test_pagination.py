@@ -0,0 +1,88 @@
+"""
+Tests for keyset pagination of transaction listings
+"""
+
+import pytest
+
+from models import Transaction, User
+
+
+@pytest.fixture
+def user_rows(db):
+    """A user with ten transactions, most of them sharing a date"""
+    user_id = User.create("pager", "pager@example.com", "hash")
+    dates = ['2024-05-02'] * 6 + ['2024-05-01'] * 3 + ['2024-05-03']
+    ids = Transaction.create_many(
+        [(user_id, 1, 10 + position, day, f"row {position}") for position, day in enumerate(dates)])
+    return user_id, ids
+
+
+def expected_order(user_id):
+    rows = Transaction.get_by_user(user_id)
+    return [row['transaction_id'] for row in sorted(
+        rows, key=lambda row: (row['transaction_date'], row['created_at'], row['transaction_id']),
+        reverse=True)]
+
+
+def walk(user_id, page_size):
+    pages, token = [], None
+    while True:
+        page = Transaction.get_page_by_user(user_id, page_size, token)
+        pages.append([row['transaction_id'] for row in page['items']])
+        token = page['next_page']
+        if token is None:
+            return pages
+
+
+def test_pages_cover_every_row_once_across_ties(user_rows):
+    user_id, ids = user_rows
+    pages = walk(user_id, 3)
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    flat = [transaction_id for page in pages for transaction_id in page]
+    assert flat == expected_order(user_id)
+    assert sorted(flat) == sorted(ids)
+
+
+def test_first_and_last_pages_have_no_token_outward(user_rows):
+    user_id, _ = user_rows
+    first = Transaction.get_page_by_user(user_id, 4)
+    assert first['prev_page'] is None and first['next_page']
+    whole = Transaction.get_page_by_user(user_id, 10)
+    assert whole['next_page'] is None and whole['prev_page'] is None
+
+
+def test_prev_token_returns_the_previous_page(user_rows):
+    user_id, _ = user_rows
+    first = Transaction.get_page_by_user(user_id, 3)
+    second = Transaction.get_page_by_user(user_id, 3, first['next_page'])
+    back = Transaction.get_page_by_user(user_id, 3, second['prev_page'])
+    assert [row['transaction_id'] for row in back['items']] == \
+        [row['transaction_id'] for row in first['items']]
+    assert back['prev_page'] is None
+    assert back['next_page']
+
+
+def test_deletes_between_pages_neither_skip_nor_repeat_rows(user_rows):
+    user_id, _ = user_rows
+    order = expected_order(user_id)
+    first = Transaction.get_page_by_user(user_id, 3)
+    # Delete the row the token points at and the first row of the next page
+    Transaction.delete(order[2])
+    Transaction.delete(order[3])
+    second = Transaction.get_page_by_user(user_id, 3, first['next_page'])
+    assert [row['transaction_id'] for row in second['items']] == order[4:7]
+
+
+def test_inserts_before_the_position_do_not_shift_later_pages(user_rows):
+    user_id, _ = user_rows
+    order = expected_order(user_id)
+    first = Transaction.get_page_by_user(user_id, 3)
+    Transaction.create(user_id, 1, 99, '2024-06-01', "newest")
+    second = Transaction.get_page_by_user(user_id, 3, first['next_page'])
+    assert [row['transaction_id'] for row in second['items']] == order[3:6]
+
+
+def test_malformed_token_is_rejected(user_rows):
+    user_id, _ = user_rows
+    with pytest.raises(ValueError, match="Invalid page token"):
+        Transaction.get_page_by_user(user_id, 3, "not-a-token")
@@ -0,0 +1,162 @@
+"""
+Tests for the bounded ConnectionPool (FIFO waiters, timeouts, sizing)
+"""
+
+import threading
+import time
+
+import pytest
+
+from backends import PoolError
+from db_config import ConnectionPool
+
+
+class FakeConnection:
+    """Stands in for a driver connection; the pool only manages its lifecycle"""
+
+    in_transaction = False
+
+    def __init__(self, number: int):
+        self.number = number
+        self.closed = False
+
+    def is_connected(self) -> bool:
+        return not self.closed
+
+    def reset_session(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**options) -> ConnectionPool:
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+
+    pool = ConnectionPool(connect, **options)
+    pool.opened = opened
+    return pool
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def test_connections_are_reused():
+    pool = make_pool(pool_size=2)
+    first = pool.get_connection()
+    number = first.number
+    first.close()
+    again = pool.get_connection()
+    assert again.number == number
+    assert len(pool.opened) == 2
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_waiters_are_served_in_arrival_order():
+    pool = make_pool(pool_size=1, timeout=5.0)
+    held = pool.get_connection()
+    served = []
+
+    def worker(name):
+        connection = pool.get_connection()
+        served.append(name)
+        connection.close()
+
+    threads = []
+    for position in range(4):
+        thread = threading.Thread(target=worker, args=(position,))
+        thread.start()
+        threads.append(thread)
+        # Queue the next waiter only once this one is in line
+        wait_for(lambda: pool.stats()['waiting'] == position + 1)
+
+    held.close()
+    for thread in threads:
+        thread.join()
+    assert served == [0, 1, 2, 3]
+    stats = pool.stats()
+    assert stats['waiting'] == 0
+    assert stats['exhausted_events'] == 4
+    assert stats['timeouts'] == 0
+
+
+def test_a_returned_connection_goes_to_the_waiter_not_a_newcomer():
+    pool = make_pool(pool_size=1, timeout=5.0)
+    held = pool.get_connection()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.get_connection()))
+    waiter.start()
+    wait_for(lambda: pool.stats()['waiting'] == 1)
+    held.close()
+    waiter.join()
+    assert got[0].number == 0
+    # The pool stays exhausted while the waiter holds the connection
+    with pytest.raises(PoolError):
+        pool.get_connection(timeout=0.01)
+    got[0].close()
+
+
+def test_exhausted_pool_times_out():
+    pool = make_pool(pool_size=1, timeout=0.05)
+    held = pool.get_connection()
+    started = time.perf_counter()
+    with pytest.raises(PoolError, match="Timed out"):
+        pool.get_connection()
+    assert time.perf_counter() - started >= 0.05
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waiting'] == 0
+    # The timed-out caller left the queue, so the next release idles the connection
+    held.close()
+    assert pool.stats()['idle'] == 1
+
+
+def test_closing_the_pool_fails_waiters():
+    pool = make_pool(pool_size=1, timeout=5.0)
+    held = pool.get_connection()
+    errors = []
+
+    def worker():
+        try:
+            pool.get_connection()
+        except PoolError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    wait_for(lambda: pool.stats()['waiting'] == 1)
+    pool.close()
+    thread.join()
+    assert len(errors) == 1 and "closed" in str(errors[0])
+    held.close()
+    assert pool.opened[0].closed
+
+
+def test_auto_size_grows_under_contention_and_shrinks_back():
+    pool = make_pool(pool_size=1, max_size=2, timeout=0.01, auto_size=True,
+                     grow_threshold=2, grow_window=60.0)
+    held = pool.get_connection()
+    with pytest.raises(PoolError):
+        pool.get_connection()
+    # The second exhausted checkout within the window grows the pool
+    extra = pool.get_connection()
+    assert pool.stats()['size'] == 2 and pool.stats()['grown'] == 1
+    with pytest.raises(PoolError):
+        pool.get_connection()
+    extra.close()
+    held.close()
+    assert pool.stats()['size'] == 2
+    pool.grow_window = 0.0
+    pool.get_connection().close()
+    assert pool.stats()['size'] == 1 and pool.stats()['shrunk'] == 1
@@ -0,0 +1,127 @@
+"""
+Tests for the read-through query cache and its table-version invalidation
+"""
+
+import threading
+
+import pytest
+
+from db_config import DatabaseConfig, execute_query
+from query_cache import QueryCache, query_cache, tables_read, tables_written
+
+
+def test_tables_read_expands_views():
+    assert tables_read("SELECT * FROM transaction_summary t JOIN budgets b ON 1") == \
+        {'transactions', 'users', 'categories', 'budgets'}
+
+
+def test_tables_written_follow_cascades_transitively():
+    assert tables_written("DELETE FROM users WHERE user_id = %s") == \
+        {'users', 'budgets', 'budget_rules', 'transactions', 'monthly_spending'}
+    assert tables_written("UPDATE categories SET icon = %s") == \
+        {'categories', 'budget_rules', 'transactions', 'monthly_spending'}
+    assert tables_written("INSERT INTO transactions (amount) VALUES (%s)") == {'transactions'}
+    assert tables_written("ANALYZE") == frozenset()
+
+
+def store(cache, key, rows, tables):
+    tables = frozenset(tables)
+    cache.put(key, rows, tables, cache.snapshot(tables))
+
+
+def test_bump_drops_only_entries_that_read_the_table():
+    cache = QueryCache()
+    store(cache, ('budgets',), [{'budget_id': 1}], {'budgets'})
+    store(cache, ('users',), [{'user_id': 1}], {'users'})
+    cache.bump(tables_written("DELETE FROM budgets WHERE budget_id = 1"))
+    assert cache.get(('budgets',)) == (False, None)
+    assert cache.get(('users',)) == (True, [{'user_id': 1}])
+
+
+def test_a_write_while_the_query_runs_keeps_the_result_out():
+    cache = QueryCache()
+    tables = frozenset({'transactions'})
+    snapshot = cache.snapshot(tables)
+    cache.bump({'transactions'})
+    cache.put(('stale',), [{'amount': 1}], tables, snapshot)
+    assert cache.get(('stale',)) == (False, None)
+
+
+def test_hits_return_copies():
+    cache = QueryCache()
+    store(cache, ('k',), [{'amount': 1}], {'transactions'})
+    _, rows = cache.get(('k',))
+    rows[0]['amount'] = 2
+    assert cache.get(('k',)) == (True, [{'amount': 1}])
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    import query_cache as module
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    cache = QueryCache(ttl=60.0)
+    store(cache, ('k',), [{'amount': 1}], {'transactions'})
+    now[0] += 59
+    assert cache.get(('k',))[0]
+    now[0] += 2
+    assert cache.get(('k',)) == (False, None)
+
+
+@pytest.fixture
+def cached_db(db, monkeypatch):
+    monkeypatch.setattr(DatabaseConfig, "QUERY_CACHE_ENABLED", True)
+    query_cache.clear()
+    return db
+
+
+RULES = "SELECT rule_id FROM budget_rules WHERE budget_id = %s ORDER BY rule_id"
+
+
+def test_repeated_reads_are_served_from_the_cache(cached_db):
+    first = execute_query(RULES, (1,), fetch=True)
+    hits = query_cache.stats()['hits']
+    assert execute_query(RULES, (1,), fetch=True) == first
+    assert query_cache.stats()['hits'] == hits + 1
+
+
+def test_deleting_a_budget_invalidates_its_cascaded_rules(cached_db):
+    assert execute_query(RULES, (1,), fetch=True)
+    execute_query("DELETE FROM budgets WHERE budget_id = %s", (1,))
+    assert execute_query(RULES, (1,), fetch=True) == []
+
+
+def test_deleting_a_user_invalidates_rows_two_cascades_away(cached_db):
+    budget_ids = [row['budget_id'] for row in execute_query(
+        "SELECT budget_id FROM budgets WHERE user_id = %s", (1,), fetch=True)]
+    rules = [execute_query(RULES, (budget_id,), fetch=True) for budget_id in budget_ids]
+    spending = execute_query("SELECT * FROM monthly_spending WHERE user_id = %s", (1,),
+                             fetch=True)
+    assert any(rules) and spending
+    execute_query("DELETE FROM users WHERE user_id = %s", (1,))
+    assert all(execute_query(RULES, (budget_id,), fetch=True) == []
+               for budget_id in budget_ids)
+    assert execute_query("SELECT * FROM monthly_spending WHERE user_id = %s", (1,),
+                         fetch=True) == []
+
+
+def test_session_reads_bypass_the_cache(cached_db):
+    cached = execute_query(RULES, (1,), fetch=True)
+    before = query_cache.stats()
+    with DatabaseConfig.session():
+        assert execute_query(RULES, (1,), fetch=True) == cached
+        assert execute_query(RULES, (1,), fetch=True) == cached
+    after = query_cache.stats()
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
+
+
+def test_results_cached_by_others_during_a_session_are_dropped_on_commit(cached_db):
+    seen = []
+    with DatabaseConfig.session():
+        execute_query("DELETE FROM budget_rules WHERE budget_id = %s", (1,))
+        # Another thread still reads (and caches) the committed rules
+        reader = threading.Thread(target=lambda: seen.append(
+            execute_query(RULES, (1,), fetch=True)))
+        reader.start()
+        reader.join()
+    assert seen[0]
+    assert execute_query(RULES, (1,), fetch=True) == []
@@ -0,0 +1,32 @@
+"""
+Tests for the compact tuple-backed result rows (records.py)
+"""
+
+from records import as_records
+
+
+def test_columns_are_reached_by_position_name_and_attribute():
+    row, = as_records(('transaction_id', 'amount'), [(7, '12.50')])
+    assert row[0] == row['transaction_id'] == row.transaction_id == 7
+    assert row.get('amount') == '12.50'
+    assert row.get('missing', 'default') == 'default'
+    assert dict(row.items()) == row.to_dict() == {'transaction_id': 7, 'amount': '12.50'}
+
+
+def test_count_and_index_columns_shadow_the_tuple_methods():
+    row, = as_records(('count', 'index'), [(42, 3)])
+    assert row.count == row['count'] == 42
+    assert row.index == row['index'] == 3
+
+
+def test_tuple_methods_remain_without_such_columns():
+    row, = as_records(('a', 'b'), [(1, 1)])
+    assert row.count(1) == 2
+    assert row.index(1) == 0
+
+
+def test_mapping_method_names_are_reached_by_name():
+    row, = as_records(('keys', 'total'), [('k', 5)])
+    assert row['keys'] == 'k'
+    assert row.keys() == ('keys', 'total')
+    assert dict(zip(row.keys(), row)) == {'keys': 'k', 'total': 5}
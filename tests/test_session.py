@@ -0,0 +1,78 @@
+"""
+Tests for the DatabaseConfig.session() unit of work
+"""
+
+import pytest
+
+from db_config import DatabaseConfig
+from models import Transaction
+from models.monthly_spending import MonthlySpending
+
+
+def test_writes_commit_together_when_the_block_exits(db):
+    before = Transaction.count()
+    with DatabaseConfig.session():
+        first = Transaction.create(1, 1, 10, '2024-03-01', 'first')
+        second = Transaction.create(1, 2, 20, '2024-03-02', 'second')
+    assert Transaction.count() == before + 2
+    assert Transaction.get_by_id(first) and Transaction.get_by_id(second)
+    assert MonthlySpending.check() == []
+
+
+def test_an_exception_rolls_back_every_write_and_the_rollup(db):
+    before = Transaction.count()
+    with pytest.raises(RuntimeError):
+        with DatabaseConfig.session():
+            created = Transaction.create(1, 1, 10, '2024-03-01', 'rolled back')
+            Transaction.delete(1)
+            raise RuntimeError("abort")
+    assert Transaction.count() == before
+    assert Transaction.get_by_id(created) is None
+    assert Transaction.get_by_id(1) is not None
+    assert MonthlySpending.check() == []
+
+
+def test_nested_sessions_join_the_outer_one(db):
+    before = Transaction.count()
+    with pytest.raises(RuntimeError):
+        with DatabaseConfig.session() as outer:
+            with DatabaseConfig.session() as inner:
+                assert inner is outer
+                Transaction.create(1, 1, 10, '2024-03-01', 'inner')
+            raise RuntimeError("abort")
+    assert Transaction.count() == before
+
+
+def test_on_commit_callbacks_run_in_order_after_the_connection_is_returned(db):
+    calls = []
+    with DatabaseConfig.session():
+        DatabaseConfig.on_commit(lambda: calls.append(
+            ('first', DatabaseConfig.get_pool_stats()['in_use'])))
+        DatabaseConfig.on_commit(lambda: calls.append(('second', None)))
+        assert calls == []
+    assert calls == [('first', 0), ('second', None)]
+
+
+def test_on_commit_callbacks_are_dropped_on_rollback(db):
+    calls = []
+    with pytest.raises(RuntimeError):
+        with DatabaseConfig.session():
+            DatabaseConfig.on_commit(lambda: calls.append('committed'))
+            raise RuntimeError("abort")
+    assert calls == []
+
+
+def test_on_commit_outside_a_session_runs_immediately(db):
+    calls = []
+    DatabaseConfig.on_commit(lambda: calls.append('now'))
+    assert calls == ['now']
+
+
+def test_a_failing_callback_does_not_undo_the_commit(db):
+    calls = []
+    with DatabaseConfig.session():
+        created = Transaction.create(1, 1, 10, '2024-03-01', 'kept')
+        DatabaseConfig.on_commit(lambda: 1 / 0)
+        DatabaseConfig.on_commit(lambda: calls.append('after'))
+    assert Transaction.get_by_id(created) is not None
+    assert calls == ['after']
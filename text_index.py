@@ -0,0 +1,274 @@
+"""
+Text Index Module
+In-process inverted index of short texts grouped by key, answering ranked
+word and prefix queries from posting lists instead of scanning the texts
+"""
+
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+# BM25 term frequency saturation and length normalization
+_K1 = 1.2
+_B = 0.75
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Case-folded words of a text, punctuation dropped"""
+    return _NON_WORD.sub(" ", (text or "").casefold()).split()
+
+
+def _varint(value: int, out: bytearray):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_postings(doc_ids: Iterable[int]) -> bytes:
+    """
+    Compress ascending document IDs as varint-encoded gaps
+
+    Gaps between one user's transaction IDs are small, so most take one
+    or two bytes instead of eight.
+    """
+    out = bytearray()
+    previous = 0
+    for doc_id in doc_ids:
+        _varint(doc_id - previous, out)
+        previous = doc_id
+    return bytes(out)
+
+
+def decode_postings(data) -> List[int]:
+    """Inverse of encode_postings"""
+    doc_ids = []
+    current = shift = value = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        current += value
+        doc_ids.append(current)
+        value = shift = 0
+    return doc_ids
+
+
+class _PostingList:
+    """
+    Compressed ascending document IDs of one term
+
+    Appending an ID above the last one writes its gap in place; other
+    changes decode and re-encode the list.
+    """
+
+    __slots__ = ("data", "last", "count")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.last = 0
+        self.count = 0
+
+    def add(self, doc_id: int):
+        if doc_id > self.last:
+            _varint(doc_id - self.last, self.data)
+            self.last = doc_id
+            self.count += 1
+            return
+        doc_ids = decode_postings(self.data)
+        position = bisect_left(doc_ids, doc_id)
+        if position == len(doc_ids) or doc_ids[position] != doc_id:
+            doc_ids.insert(position, doc_id)
+            self._replace(doc_ids)
+
+    def discard(self, doc_id: int):
+        doc_ids = decode_postings(self.data)
+        position = bisect_left(doc_ids, doc_id)
+        if position < len(doc_ids) and doc_ids[position] == doc_id:
+            del doc_ids[position]
+            self._replace(doc_ids)
+
+    def _replace(self, doc_ids: List[int]):
+        self.data = bytearray(encode_postings(doc_ids))
+        self.last = doc_ids[-1] if doc_ids else 0
+        self.count = len(doc_ids)
+
+    def ids(self) -> List[int]:
+        return decode_postings(self.data)
+
+
+class _KeyDocuments:
+    """Posting lists, sorted vocabulary and per-document terms of one key"""
+
+    __slots__ = ("postings", "vocabulary", "docs", "total_terms")
+
+    def __init__(self):
+        self.postings: Dict[str, _PostingList] = {}
+        self.vocabulary: List[str] = []
+        # doc_id -> (terms, payload); the terms are kept for ranking and removal
+        self.docs: Dict[Hashable, Tuple[Tuple[str, ...], Any]] = {}
+        self.total_terms = 0
+
+    def add(self, doc_id: int, terms: Tuple[str, ...], payload):
+        self.docs[doc_id] = (terms, payload)
+        self.total_terms += len(terms)
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = _PostingList()
+                insort(self.vocabulary, term)
+            postings.add(doc_id)
+
+    def remove(self, doc_id: int):
+        terms, _ = self.docs.pop(doc_id)
+        self.total_terms -= len(terms)
+        for term in set(terms):
+            postings = self.postings[term]
+            postings.discard(doc_id)
+            if not postings.count:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+
+    def expand(self, term: str, prefix: bool) -> List[str]:
+        """Indexed terms matching a query term (itself, or every term it starts)"""
+        if not prefix:
+            return [term] if term in self.postings else []
+        start = bisect_left(self.vocabulary, term)
+        end = start
+        while end < len(self.vocabulary) and self.vocabulary[end].startswith(term):
+            end += 1
+        return self.vocabulary[start:end]
+
+
+class TextIndex:
+    """
+    Thread-safe inverted index of short texts keyed by (for example) user ID
+
+    Each document has a unique integer ID, a key, a text and a payload. A
+    query only reads the posting lists of its own key. Keys are loaded
+    whole with load_key(); put() and remove() only touch keys that are
+    loaded, since a key loaded later reads the current documents anyway.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys: Dict[Hashable, _KeyDocuments] = {}
+        self._doc_keys: Dict[int, Hashable] = {}
+
+    def loaded(self, key: Hashable) -> bool:
+        """Whether a key's documents are in the index"""
+        with self._lock:
+            return key in self._keys
+
+    def load_key(self, key: Hashable, documents: Iterable[Tuple[int, Optional[str], Any]]):
+        """
+        Replace every document of one key
+
+        Args:
+            key: The key
+            documents: (doc_id, text, payload) tuples, ideally in ascending ID order
+        """
+        documents_of_key = _KeyDocuments()
+        for doc_id, text, payload in documents:
+            documents_of_key.add(doc_id, tuple(tokenize(text)), payload)
+        with self._lock:
+            self.remove_key(key)
+            self._keys[key] = documents_of_key
+            for doc_id in documents_of_key.docs:
+                self._doc_keys[doc_id] = key
+
+    def put(self, doc_id: int, key: Hashable, text: Optional[str], payload=None):
+        """Add a document, or replace the document with the same ID"""
+        with self._lock:
+            self.remove(doc_id)
+            documents = self._keys.get(key)
+            if documents is not None:
+                documents.add(doc_id, tuple(tokenize(text)), payload)
+                self._doc_keys[doc_id] = key
+
+    def remove(self, doc_id: int):
+        """Remove a document if present"""
+        with self._lock:
+            key = self._doc_keys.pop(doc_id, None)
+            if key is not None:
+                self._keys[key].remove(doc_id)
+
+    def remove_key(self, key: Hashable):
+        """Remove every document of a key and mark the key as not loaded"""
+        with self._lock:
+            documents = self._keys.pop(key, None)
+            if documents is not None:
+                for doc_id in documents.docs:
+                    del self._doc_keys[doc_id]
+
+    def search(self, key: Hashable, text: str, prefix: bool = True,
+               where: Optional[Callable[[Any], bool]] = None) -> List[Tuple[float, int]]:
+        """
+        Documents of a key containing every word of a query, best match first
+
+        Matches are ranked by BM25: rarer words and shorter texts score
+        higher. Ties go to the higher (newer) document ID.
+
+        Args:
+            key: The key to search
+            text: Query text
+            prefix: Let each query word match indexed words it starts
+            where: Keep only documents whose payload passes this test (optional)
+
+        Returns:
+            List of (score, doc_id) tuples
+        """
+        query = list(dict.fromkeys(tokenize(text)))
+        if not query:
+            return []
+        with self._lock:
+            documents = self._keys.get(key)
+            if documents is None or not documents.docs:
+                return []
+            expansions = [documents.expand(term, prefix) for term in query]
+            if not all(expansions):
+                return []
+            # Intersect the rarest term's matches with the others
+            order = sorted(range(len(query)), key=lambda position: sum(
+                documents.postings[term].count for term in expansions[position]))
+            matched = {}
+            candidates = None
+            for position in order:
+                found = set()
+                for term in expansions[position]:
+                    found.update(documents.postings[term].ids())
+                matched[position] = len(found)
+                candidates = found if candidates is None else candidates & found
+                if not candidates:
+                    return []
+
+            count = len(documents.docs)
+            average = documents.total_terms / count or 1.0
+            weights = [math.log(1 + (count - matched[position] + 0.5) / (matched[position] + 0.5))
+                       for position in range(len(query))]
+            expanded = [set(terms) for terms in expansions]
+            results = []
+            for doc_id in candidates:
+                terms, payload = documents.docs[doc_id]
+                if where is not None and not where(payload):
+                    continue
+                norm = _K1 * (1 - _B + _B * len(terms) / average)
+                score = 0.0
+                for weight, matching in zip(weights, expanded):
+                    frequency = 0
+                    for term in terms:
+                        if term in matching:
+                            frequency += 1
+                    score += weight * frequency * (_K1 + 1) / (frequency + norm)
+                results.append((score, doc_id))
+        results.sort(key=lambda result: (-result[0], -result[1]))
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._doc_keys)